@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from dotenv import load_dotenv
 from urllib.parse import urlparse, parse_qsl
 from pathlib import Path
@@ -65,6 +66,8 @@ CKEDITOR_CONFIGS = {
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'main.middleware.StaticSiteMiddleware',
+    'main.middleware.RequestTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,9 +78,32 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'PI6_backend.urls'
 
+# Per-request Server-Timing header and log line (main.request_timing).
+# A sampled request records queries, cache hits/misses, template and chrome
+# time; any request over the thresholds is logged at WARNING.
+REQUEST_TIMING_SAMPLE_RATE = float(os.getenv('REQUEST_TIMING_SAMPLE_RATE', '1.0' if DEBUG else '0.05'))
+REQUEST_TIMING_SLOW_MS = int(os.getenv('REQUEST_TIMING_SLOW_MS', 500))
+REQUEST_TIMING_SLOW_QUERIES = int(os.getenv('REQUEST_TIMING_SLOW_QUERIES', 40))
+REQUEST_TIMING_HEADER = os.getenv('REQUEST_TIMING_HEADER', 'True') == 'True'
+
+# Prometheus metrics at /metrics (main.metrics). Every request is counted
+# in-process; set METRICS_DIR to a directory shared by the gunicorn workers
+# to merge their counters on scrape, and METRICS_TOKEN to require
+# "Authorization: Bearer <token>".
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.getenv('METRICS_DIR') or None
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 5))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Readiness probe (/api/health/ready, main.health): per-check time limit and
+# how long a worker reuses its last result before checking again
+HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', 2))
+HEALTH_CHECK_CACHE_SECONDS = float(os.getenv('HEALTH_CHECK_CACHE_SECONDS', 5))
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to main.request_timing
+        'BACKEND': 'main.template_backends.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -122,14 +148,53 @@ else:
     }
 
 # Caching
+# 'default' is a small per-worker LRU (L1) in front of 'shared' (L2), which all
+# gunicorn workers see. L2 is Redis when REDIS_URL is set (recommended in
+# production; needs the redis package), otherwise a file-based cache on local
+# disk. The file cache holds up to CACHE_MAX_ENTRIES entries (one file each)
+# and only checks its size every CACHE_CULL_EVERY sets, since each check lists
+# the whole directory (main.cache_backends.FileCache).
+redis_url = os.getenv('REDIS_URL')
+
+if redis_url:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': redis_url,
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'main.cache_backends.FileCache',
+        'LOCATION': os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'pi6-cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 50000)),
+            'CULL_EVERY': int(os.getenv('CACHE_CULL_EVERY', 100)),
+        },
+    }
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'main.cache_backends.TieredCache',
         'LOCATION': 'pi6-cache',
         'TIMEOUT': 300,
-    }
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_MAX_ENTRIES': int(os.getenv('CACHE_L1_MAX_ENTRIES', 500)),
+            'L1_TIMEOUT': int(os.getenv('CACHE_L1_TIMEOUT', 30)),
+            'READ_THROUGH': True,
+            'WRITE_THROUGH': True,
+        },
+    },
+    'shared': dict(SHARED_CACHE, TIMEOUT=300),
 }
 
+# Lifetime of content-derived cache entries (home, navbar, footer, site config).
+# They are invalidated on save via generation keys (main.content_cache), so this
+# only bounds memory use, not staleness.
+CONTENT_CACHE_TIMEOUT = int(os.getenv('CONTENT_CACHE_TIMEOUT', 6 * 60 * 60))
+
+# Generated placeholder images (main.placeholders)
+PLACEHOLDER_CACHE_DIR = os.getenv('PLACEHOLDER_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'pi6-placeholders'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -168,7 +233,47 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Hashed, compressed static files served by WhiteNoise with far-future
+# caching. (Django 5.1 dropped STATICFILES_STORAGE; only STORAGES takes
+# effect. 'default' is the filesystem storage that was already in use.)
+# The manifest storage needs `collectstatic` to have run, as the deploy build
+# does: with DEBUG=False and no manifest, every {% static %} raises "Missing
+# staticfiles manifest entry". WHITENOISE_MANIFEST_STRICT=False doesn't avoid
+# that (unlisted files are then hashed from the empty STATIC_ROOT), so local
+# DEBUG=False runs without collectstatic set STATIC_MANIFEST=False instead.
+STATIC_MANIFEST = os.getenv('STATIC_MANIFEST', 'True') == 'True'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage' if STATIC_MANIFEST
+        else 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Pre-rendered public pages (manage.py render_static). With SERVE_STATIC_SITE=True
+# main.middleware.StaticSiteMiddleware answers anonymous requests for a rendered
+# path from STATIC_SITE_ROOT ahead of the views; requests with a query string
+# always reach the views. Each request checks the disk, so re-rendering needs
+# no restart.
+STATIC_SITE_ROOT = Path(os.getenv('STATIC_SITE_ROOT', BASE_DIR / 'static_site'))
+STATIC_SITE_BASE_URL = os.getenv('STATIC_SITE_BASE_URL', 'http://localhost')
+STATIC_SITE_SERVE = os.getenv('SERVE_STATIC_SITE', 'False') == 'True'
+
+# Logging: the request timing lines go to stdout as one JSON object each
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'stream': 'ext://sys.stdout'},
+    },
+    'loggers': {
+        'main.request_timing': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_TIMING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
 
 # Cloudinary Configuration
 import cloudinary
@@ -182,9 +287,9 @@ cloudinary.config(
     secure=True
 )
 
-# Media files configuration - using Cloudinary
+# Media files configuration - images are CloudinaryFields; plain FileFields
+# (BlogPost.video_file) use STORAGES['default']
 MEDIA_URL = '/media/'
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
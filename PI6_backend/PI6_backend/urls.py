@@ -23,14 +23,23 @@ from main import views
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.home, name='home'),
-    path('start/', views.start, name='start'),
-    path('start-auto/', views.start_auto, name='start_auto'),
+    # Quote wizards (main.wizard.WIZARDS)
+    path('start/', views.quote_wizard, {'product': 'home'}, name='start'),
+    path('start-auto/', views.quote_wizard, {'product': 'auto'}, name='start_auto'),
     path('companies/', views.companies, name='companies'),
     path('companies/<int:brand_id>/', views.company_blogs, name='company_blogs'),
     path('api/health/', views.api_health, name='api_health'),
+    # No trailing slash: a probe must not get an APPEND_SLASH redirect (3xx counts as healthy)
+    path('api/health/live', views.health_live, name='health_live'),
+    path('api/health/ready', views.health_ready, name='health_ready'),
+    # Prometheus' default metrics_path, hence no trailing slash
+    path('metrics', views.metrics_view, name='metrics'),
+    path('api/blog/search/', views.api_blog_search, name='api_blog_search'),
+    path('placeholders/v<int:version>/<slug:theme>/<int:lock>.svg', views.placeholder_image, name='placeholder_image'),
     
     # Blog URLs
     path('blog/', views.blog_list, name='blog_list'),
+    path('blog/search/', views.blog_search, name='blog_search'),
     path('blog/category/<slug:category_slug>/', views.blog_category_list, name='blog_category_list'),
     path('blog/<slug:slug>/', views.blog_detail, name='blog_detail'),
     
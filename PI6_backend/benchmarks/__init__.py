@@ -0,0 +1,9 @@
+"""
+Latency benchmarks for every public route.
+
+`manage.py run_benchmarks` seeds a synthetic dataset (main.seeding) into a
+throwaway database at each requested size (1k, 10k and 100k posts by
+default), drives every route through the full middleware stack and writes
+p50/p95/p99 latency, throughput, query counts and cache hits per route to
+JSON. Pass --baseline with an earlier result file to compare two commits.
+"""
@@ -0,0 +1,161 @@
+"""
+Query and cache-miss budgets per route (checked by main.tests).
+
+Each route in benchmarks.routes declares the most queries and cache misses
+one request may cost, cold (every cache cleared first) and warm (the same
+anonymous request repeated). A request over budget fails with its SQL
+grouped by statement and attributed to the template line and view code
+that issued it, so an N+1 shows up as one statement repeated from a loop.
+"""
+import os
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.template.base import Node, TokenType
+from django.test import Client
+from django.test.utils import override_settings
+
+from main import middleware, request_timing, template_backends
+
+
+class Budget:
+    def __init__(self, queries, misses):
+        self.queries = queries
+        self.misses = misses
+
+
+# route: (cold, warm)
+BUDGETS = {
+    'home': (Budget(8, 12), Budget(0, 0)),
+    'blog_list': (Budget(10, 12), Budget(0, 0)),
+    'blog_list_page_5': (Budget(10, 12), Budget(0, 0)),
+    'blog_category': (Budget(12, 12), Budget(0, 0)),
+    'blog_detail': (Budget(11, 11), Budget(1, 0)),
+    'blog_search': (Budget(11, 9), Budget(5, 0)),
+    'api_blog_search': (Budget(3, 0), Budget(3, 0)),
+    'companies': (Budget(10, 11), Budget(0, 0)),
+    'companies_brand': (Budget(12, 11), Budget(0, 0)),
+    'companies_category': (Budget(13, 12), Budget(0, 0)),
+    'company_blogs': (Budget(10, 9), Budget(4, 0)),
+    'start': (Budget(7, 9), Budget(1, 0)),
+    'start_submit': (Budget(0, 0), Budget(0, 0)),
+    'start_quotes': (Budget(12, 12), Budget(3, 0)),
+    'start_auto': (Budget(7, 9), Budget(1, 0)),
+    'contact': (Budget(6, 9), Budget(0, 0)),
+    'contact_submit': (Budget(1, 0), Budget(1, 0)),
+    'page_detail': (Budget(8, 11), Budget(1, 0)),
+    'api_health': (Budget(1, 0), Budget(1, 0)),
+    'health_live': (Budget(0, 0), Budget(0, 0)),
+    'health_ready': (Budget(3, 0), Budget(0, 0)),
+    'placeholder_image': (Budget(0, 0), Budget(0, 0)),
+    'metrics': (Budget(0, 0), Budget(0, 0)),
+}
+
+_SKIPPED_FILES = (__file__, middleware.__file__, request_timing.__file__, template_backends.__file__)
+_DB_PACKAGE = os.path.join('django', 'db', '')
+# Savepoints come from the test case's wrapping transaction, not the view
+_SAVEPOINT_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+def _project_frame(frame):
+    filename = frame.f_code.co_filename
+    return (
+        filename.startswith(str(settings.BASE_DIR))
+        and filename not in _SKIPPED_FILES
+        and f'{os.sep}site-packages{os.sep}' not in filename
+    )
+
+
+def _tag(token):
+    contents = token.contents[:60]
+    if token.token_type == TokenType.BLOCK:
+        return f'{{% {contents} %}}'
+    return f'{{{{ {contents} }}}}'
+
+
+def attribution():
+    """
+    Where the current query comes from: the innermost template tag or
+    variable being rendered and the innermost project code frame (or, for
+    queries Django makes on its own, e.g. sessions, its innermost frame
+    outside django.db).
+    """
+    template = code = fallback = None
+    frame = sys._getframe(1)
+    while frame is not None and (template is None or code is None):
+        node = frame.f_locals.get('self')
+        # type(), not isinstance(): the latter would evaluate a lazy object mid-setup
+        if template is None and issubclass(type(node), Node) and getattr(node, 'origin', None) and getattr(node, 'token', None):
+            template = f'{node.origin.template_name}:{node.token.lineno} {_tag(node.token)}'
+        if code is None and _project_frame(frame):
+            path = os.path.relpath(frame.f_code.co_filename, settings.BASE_DIR)
+            code = f'{path}:{frame.f_lineno} in {frame.f_code.co_name}()'
+        elif fallback is None and _DB_PACKAGE not in frame.f_code.co_filename and frame.f_code.co_filename not in _SKIPPED_FILES:
+            fallback = f'{frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}()'
+        frame = frame.f_back
+    return ' via '.join(part for part in (template, code or fallback) if part) or 'unknown'
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper keeping each statement with its attribution.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith(_SAVEPOINT_PREFIXES):
+            self.queries.append((sql, attribution()))
+        return execute(sql, params, many, context)
+
+    def report(self, limit=15):
+        lines = []
+        for (sql, where), count in Counter(self.queries).most_common(limit):
+            lines.append(f'  {count}x {sql[:300]}')
+            lines.append(f'      at {where}')
+        return '\n'.join(lines)
+
+
+def request(route, cold):
+    """
+    Makes one measured request; a warm one is preceded by an unmeasured
+    identical request. Returns (response, QueryRecorder, RequestTimings).
+    """
+    client = Client()
+    cache.clear()
+    if not cold:
+        route.request(client)
+        client.cookies.clear()
+    recorder = QueryRecorder()
+    # A request RequestTimingMiddleware samples or counts for metrics would
+    # collect into its own RequestTimings
+    with override_settings(REQUEST_TIMING_SAMPLE_RATE=0, METRICS_ENABLED=False):
+        with connection.execute_wrapper(recorder), request_timing.collect() as timings:
+            response = route.request(client)
+    return response, recorder, timings
+
+
+def check(route, cold):
+    """
+    Returns a failure message, or None when the route is within budget.
+    """
+    budget = BUDGETS[route.name][0 if cold else 1]
+    response, recorder, timings = request(route, cold)
+    label = f"{route.name} [{'cold' if cold else 'warm'}] {route.method} {route.path}"
+    if response.status_code != route.status:
+        return f'{label}: status {response.status_code}, expected {route.status}'
+    problems = []
+    queries = len(recorder.queries)
+    if queries > budget.queries:
+        problems.append(f'{queries} queries (budget {budget.queries}):\n{recorder.report()}')
+    _, misses = timings.cache_totals()
+    if misses > budget.misses:
+        families = ', '.join(f'{family}={m}' for family, (_, m) in sorted(timings.cache.items()) if m)
+        problems.append(f'{misses} cache misses (budget {budget.misses}): {families}')
+    if problems:
+        return f'{label}: ' + '\n'.join(problems)
+    return None
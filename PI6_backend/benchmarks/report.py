@@ -0,0 +1,69 @@
+"""
+JSON result files and comparison between two of them.
+"""
+import json
+
+COMPARED = ('p50_ms', 'p95_ms', 'p99_ms', 'queries_mean')
+
+
+def write(path, meta, datasets, runs):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'datasets': datasets, 'runs': runs}, f, indent=2)
+        f.write('\n')
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _key(run):
+    return run['posts'], run['route'], run['mode']
+
+
+def compare(baseline, current):
+    """
+    Returns one row per (posts, route, mode) present in both results, with
+    the baseline value, current value and relative change of each metric.
+    """
+    before = {_key(run): run for run in baseline['runs']}
+    rows = []
+    for run in current['runs']:
+        old = before.get(_key(run))
+        if old is None:
+            continue
+        row = {'posts': run['posts'], 'route': run['route'], 'mode': run['mode']}
+        for metric in COMPARED:
+            a, b = old.get(metric, 0), run.get(metric, 0)
+            row[metric] = (a, b, (b - a) / a if a else None)
+        rows.append(row)
+    return rows
+
+
+def format_runs(runs):
+    lines = [
+        f"{'posts':>7}  {'route':<20} {'mode':<8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+        f"{'req/s':>8} {'queries':>8} {'errors':>6}"
+    ]
+    for run in runs:
+        lines.append(
+            f"{run['posts']:>7}  {run['route']:<20} {run['mode']:<8} {run['p50_ms']:>9.2f} {run['p95_ms']:>9.2f} "
+            f"{run['p99_ms']:>9.2f} {run['throughput_rps']:>8.1f} {run['queries_mean']:>8.1f} {run['errors']:>6}"
+        )
+    return '\n'.join(lines)
+
+
+def format_comparison(rows):
+    def change(value):
+        return '     n/a' if value is None else f'{value:+8.1%}'
+
+    lines = [f"{'posts':>7}  {'route':<20} {'mode':<8} {'p50 ms':>26} {'p95 ms':>26} {'queries':>18}"]
+    for row in rows:
+        cells = []
+        for metric in ('p50_ms', 'p95_ms'):
+            a, b, delta = row[metric]
+            cells.append(f'{a:>8.2f}->{b:<8.2f}{change(delta)}')
+        a, b, _ = row['queries_mean']
+        cells.append(f'{a:>7.1f} -> {b:<7.1f}')
+        lines.append(f"{row['posts']:>7}  {row['route']:<20} {row['mode']:<8} " + ' '.join(cells))
+    return '\n'.join(lines)
@@ -0,0 +1,78 @@
+"""
+The requests a benchmark run makes, one per route in PI6_backend/urls.py
+(listings also get a filtered or deeper variant).
+"""
+from django.urls import reverse
+
+from main import placeholders
+from main.wizard import WIZARDS
+from main.models import BlogCategory, BlogPost, InsurerBrand, Page
+from main.seeding import COMPANIES_CATEGORY
+
+SEARCH_QUERY = 'deductible'
+WIZARD_ANSWERS = {
+    'address': '708 Main Street, Houston', 'coverage_tier': 'standard', 'first_name': 'Bench',
+    'last_name': 'Mark', 'email': 'bench@example.com', 'phone': '(713) 555-0100',
+}
+
+
+class Route:
+    def __init__(self, name, path, method='GET', data=None, status=200):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.data = data
+        self.status = status  # expected response status
+
+    def request(self, client, **extra):
+        if self.method == 'POST':
+            return client.post(self.path, self.data or {}, **extra)
+        return client.get(self.path, **extra)
+
+
+def _sample_post():
+    # The middle published post: old enough to be off the first listing page
+    posts = BlogPost.objects.filter(is_published=True).order_by('id')
+    return posts[posts.count() // 2]
+
+
+def build_routes():
+    """
+    Returns the routes, with URLs resolved against the current dataset.
+    """
+    post = _sample_post()
+    category = BlogCategory.objects.filter(parent__isnull=True).exclude(slug=COMPANIES_CATEGORY).order_by('id').first()
+    brand = InsurerBrand.objects.filter(is_active=True, show_in_companies=True).order_by('ranking', 'id').first()
+    page = Page.objects.filter(is_active=True).order_by('id').first()
+    companies = reverse('companies')
+    home_wizard = WIZARDS['home']
+    lead = home_wizard.complete(WIZARD_ANSWERS, run_id='benchmark')
+    return [
+        Route('home', reverse('home')),
+        Route('blog_list', reverse('blog_list')),
+        Route('blog_list_page_5', f"{reverse('blog_list')}?page=5"),
+        Route('blog_category', reverse('blog_category_list', args=[category.slug])),
+        Route('blog_detail', reverse('blog_detail', args=[post.slug])),
+        Route('blog_search', f"{reverse('blog_search')}?q={SEARCH_QUERY}"),
+        Route('api_blog_search', f"{reverse('api_blog_search')}?q={SEARCH_QUERY}"),
+        Route('companies', companies),
+        Route('companies_brand', f'{companies}?brand={brand.pk}'),
+        Route('companies_category', f'{companies}?category={category.slug}'),
+        Route('company_blogs', reverse('company_blogs', args=[brand.pk])),
+        Route('start', reverse('start')),
+        Route('start_submit', reverse('start'), 'POST', {'step': 'address', 'address': '708 Main Street, Houston'}, 302),
+        # The quotes page of a finished wizard, which reads its lead
+        Route('start_quotes', home_wizard.result_url(home_wizard.step('quotes'), lead)),
+        Route('start_auto', reverse('start_auto')),
+        Route('contact', reverse('contact')),
+        Route('contact_submit', reverse('contact'), 'POST', {
+            'name': 'Bench Mark', 'email': 'bench@example.com',
+            'subject': 'Quote question', 'message': 'How much is flood coverage in Houston?',
+        }, 302),
+        Route('page_detail', reverse('page_detail', args=[page.slug])),
+        Route('api_health', reverse('api_health')),
+        Route('health_live', reverse('health_live')),
+        Route('health_ready', reverse('health_ready')),
+        Route('placeholder_image', reverse('placeholder_image', args=[placeholders.VERSION, 'business', 7])),
+        Route('metrics', reverse('metrics')),
+    ]
@@ -0,0 +1,252 @@
+"""
+Seeds, requests and measures. See the package docstring.
+"""
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import cloudinary
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from main import request_timing, seeding
+from main.models import BlogCategory, BlogGalleryImage, BlogPost, BrandMention, ContactMessage, InsurerBrand
+from .routes import build_routes
+
+SIZES = (1000, 10000, 100000)
+ITERATIONS = 50
+WARMUP = 3
+
+# cold:    every cache cleared before each request (first hit after a deploy or save)
+# warm:    anonymous visitor, so the page cache answers repeat requests
+# session: a cookie bypasses the page cache; fragment and content caches stay warm
+MODES = ('cold', 'warm', 'session')
+SESSION_COOKIE = 'csrftoken=bench'
+
+
+def percentile(sorted_values, q):
+    """
+    Linear-interpolated percentile (0-100) of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies, queries, db_times):
+    """
+    Stats (milliseconds) for one route in one mode.
+    """
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    return {
+        'requests': len(ordered),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'mean_ms': round(total / len(ordered) * 1000, 3) if ordered else 0.0,
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        'throughput_rps': round(len(ordered) / total, 1) if total else 0.0,
+        'queries_mean': round(sum(queries) / len(queries), 2) if queries else 0.0,
+        'queries_max': max(queries, default=0),
+        'db_ms_mean': round(sum(db_times) / len(db_times) * 1000, 3) if db_times else 0.0,
+    }
+
+
+class QueryCounter:
+    """
+    connection.execute_wrapper that counts queries and their time; far
+    cheaper than CaptureQueriesContext, which keeps every SQL string.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def _cache_stats():
+    return cache.stats() if hasattr(cache, 'stats') else {}
+
+
+def _cache_delta(before, after):
+    return {name: after[name] - before.get(name, 0) for name in after if name.endswith(('_hits', '_misses'))}
+
+
+def measure(route, mode, iterations=ITERATIONS, warmup=WARMUP):
+    """
+    Requests `route` warmup + iterations times and returns its stats.
+    """
+    client = Client()
+    latencies, queries, db_times, errors = [], [], [], []
+    cache_before = None
+    for n in range(warmup + iterations):
+        if n == warmup:
+            cache_before = _cache_stats()
+        if mode == 'cold':
+            cache.clear()
+        # Fresh cookies each time: the wizard and contact POSTs set wizard and
+        # message cookies that would otherwise bypass the page cache.
+        client.cookies.clear()
+        if mode == 'session':
+            client.cookies.load(SESSION_COOKIE)
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = route.request(client)
+            elapsed = time.perf_counter() - started
+        if n < warmup:
+            continue
+        if response.status_code != route.status:
+            errors.append(response.status_code)
+        latencies.append(elapsed)
+        queries.append(counter.count)
+        db_times.append(counter.seconds)
+
+    stats = summarize(latencies, queries, db_times)
+    stats['errors'] = len(errors)
+    if errors:
+        stats['error_status'] = errors[0]
+    cache_delta = _cache_delta(cache_before, _cache_stats())
+    if cache_delta:
+        stats['cache_per_request'] = {name: round(value / iterations, 2) for name, value in cache_delta.items()}
+    return stats
+
+
+def dataset_counts():
+    return {
+        'posts': BlogPost.objects.count(),
+        'categories': BlogCategory.objects.count(),
+        'brands': InsurerBrand.objects.count(),
+        'brand_mentions': BrandMention.objects.count(),
+        'gallery_images': BlogGalleryImage.objects.count(),
+        'contact_messages': ContactMessage.objects.count(),
+    }
+
+
+def run(sizes=SIZES, modes=MODES, iterations=ITERATIONS, warmup=WARMUP, only=None, seed=seeding.DEFAULT_SEED, progress=None):
+    """
+    Seeds up to each size in turn (each size extends the previous dataset)
+    and measures every route. Expects an empty, migrated database, normally
+    the one benchmark_database() provides. Returns (datasets, runs).
+    """
+    datasets, runs = [], []
+    for size in sorted(sizes):
+        started = time.perf_counter()
+        seeding.seed_site(seed)
+        seeding.seed_posts(size, seed)
+        seeding.seed_contact_messages(size // 10, seed)
+        datasets.append({
+            'posts': size,
+            'seed_seconds': round(time.perf_counter() - started, 2),
+            'counts': dataset_counts(),
+        })
+        for route in build_routes():
+            if only and route.name not in only:
+                continue
+            for mode in modes:
+                cache.clear()
+                stats = measure(route, mode, iterations, warmup)
+                runs.append(dict(posts=size, route=route.name, mode=mode, method=route.method, path=route.path, **stats))
+                if progress:
+                    progress(runs[-1])
+    return datasets, runs
+
+
+@contextmanager
+def benchmark_settings():
+    """
+    Isolates a run from the real caches and static manifest: the shared L2
+    cache moves to a scratch directory (cold mode clears it), and static
+    files use the plain storage so pages render without collectstatic.
+    Seeded gallery images need a Cloudinary cloud name to build their URLs
+    (nothing is fetched), so a placeholder one is set when none is configured.
+    Request timing log lines are muted; their cost is still measured. The
+    test client's host is allowed by name so its pages are cached as the
+    site's own host names would be.
+    """
+    config = cloudinary.config()
+    cloud_name = config.cloud_name
+    if not cloud_name:
+        config.cloud_name = 'benchmark'
+    timing_logger = logging.getLogger(request_timing.__name__)
+    timing_logger.disabled = True
+    try:
+        with _isolated_settings():
+            yield
+    finally:
+        config.cloud_name = cloud_name
+        timing_logger.disabled = False
+
+
+@contextmanager
+def _isolated_settings():
+    with tempfile.TemporaryDirectory(prefix='pi6-benchmark-cache-') as cache_dir:
+        caches = {alias: dict(config) for alias, config in settings.CACHES.items()}
+        caches['shared'] = {
+            'BACKEND': 'main.cache_backends.FileCache',
+            'LOCATION': cache_dir,
+            'TIMEOUT': caches['shared'].get('TIMEOUT', 300),
+        }
+        storages = dict(settings.STORAGES, staticfiles={'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'})
+        allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(CACHES=caches, STORAGES=storages, DEBUG=False, ALLOWED_HOSTS=allowed_hosts):
+            yield
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """
+    Creates a throwaway test database (an on-disk file for SQLite, since
+    100k posts do not fit comfortably in memory) and drops it afterwards.
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+        test_settings['NAME'] = os.path.join(tempfile.gettempdir(), 'pi6-benchmark.sqlite3')
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ['git', *args], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(**options):
+    return {
+        'revision': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'machine': platform.machine(),
+        **options,
+    }
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+
+from django.test import TestCase
+
+from main import seeding
+from main.models import BlogCategory, BlogPost
+from . import report, runner
+from .routes import build_routes
+
+
+class StatsTests(TestCase):
+    def test_percentile_interpolates(self):
+        values = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.assertEqual(runner.percentile(values, 50), 3.0)
+        self.assertEqual(runner.percentile(values, 100), 5.0)
+        self.assertAlmostEqual(runner.percentile(values, 95), 4.8)
+        self.assertEqual(runner.percentile([], 50), 0.0)
+
+    def test_summarize(self):
+        stats = runner.summarize([0.01, 0.02, 0.03, 0.04], [2, 4, 4, 6], [0.001] * 4)
+        self.assertEqual(stats['requests'], 4)
+        self.assertEqual(stats['p50_ms'], 25.0)
+        self.assertEqual(stats['throughput_rps'], 40.0)
+        self.assertEqual(stats['queries_mean'], 4.0)
+        self.assertEqual(stats['queries_max'], 6)
+
+
+class SeedingTests(TestCase):
+    def test_posts_are_deterministic(self):
+        a = seeding.build_post(1, 42, [1, 2, 3], ['Allstate', 'USAA', 'GEICO'])
+        b = seeding.build_post(1, 42, [1, 2, 3], ['Allstate', 'USAA', 'GEICO'])
+        c = seeding.build_post(2, 42, [1, 2, 3], ['Allstate', 'USAA', 'GEICO'])
+        self.assertEqual((a.title, a.content, a.published_at), (b.title, b.content, b.published_at))
+        self.assertNotEqual(a.content, c.content)
+
+    def test_category_tree_depth(self):
+        seeding.seed_site(categories=60, depth=5)
+        depths = set(BlogCategory.objects.exclude(
+            path__startswith=BlogCategory.objects.get(slug=seeding.COMPANIES_CATEGORY).path,
+        ).values_list('depth', flat=True))
+        self.assertEqual(depths, {0, 1, 2, 3, 4})
+
+    def test_extending_matches_a_single_run(self):
+        seeding.seed_site()
+        seeding.seed_posts(20)
+        seeding.seed_posts(35)
+        self.assertEqual(BlogPost.objects.count(), 35)
+        self.assertFalse(seeding.seed_site())
+        slugs = list(BlogPost.objects.order_by('published_at').values_list('slug', flat=True))
+        self.assertEqual([int(slug.rsplit('-', 1)[1]) for slug in slugs], list(range(35)))
+
+
+class RunTests(TestCase):
+    def test_every_route_is_measured(self):
+        with runner.benchmark_settings():
+            datasets, runs = runner.run(sizes=[30], modes=['cold', 'warm'], iterations=2, warmup=1)
+            routes = {route.name for route in build_routes()}
+        self.assertEqual(datasets[0]['counts']['posts'], 30)
+        self.assertEqual({run['route'] for run in runs}, routes)
+        self.assertEqual(len(runs), len(routes) * 2)
+        for run in runs:
+            self.assertEqual(run['errors'], 0, run)
+            self.assertEqual(run['requests'], 2)
+
+        path = os.path.join(tempfile.mkdtemp(), 'results.json')
+        report.write(path, runner.metadata(), datasets, runs)
+        with open(path) as f:
+            saved = json.load(f)
+        rows = report.compare(saved, saved)
+        self.assertEqual(len(rows), len(runs))
+        self.assertTrue(all(row['p50_ms'][2] in (0, None) for row in rows))
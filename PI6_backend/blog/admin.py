@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import BlogPost, BlogCategory
 from main.models import BlogGalleryImage
+from main import search
 
 class BlogGalleryImageInline(admin.TabularInline):
     model = BlogGalleryImage
@@ -19,9 +20,16 @@ class BlogCategoryAdmin(admin.ModelAdmin):
 class BlogPostAdmin(admin.ModelAdmin):
     list_display = ('title', 'category', 'is_published', 'published_at', 'updated_at')
     list_filter = ('category', 'is_published', 'published_at')
-    search_fields = ('title', 'content', 'excerpt')
+    # Searches go through the full-text index (see get_search_results),
+    # search_fields only needs to be set for the changelist search box.
+    search_fields = ('title',)
     prepopulated_fields = {'slug': ('title',)}
     inlines = [BlogGalleryImageInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search.filter_queryset(queryset, search_term), False
     
     fieldsets = (
         ('Article Info', {
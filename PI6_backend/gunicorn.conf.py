@@ -0,0 +1,14 @@
+"""
+Gunicorn settings, read automatically from the working directory by
+`gunicorn PI6_backend.wsgi:application` (see render.yaml).
+"""
+import os
+
+
+def child_exit(server, worker):
+    # Retire the worker's /metrics snapshot (main.metrics); runs in the
+    # master, which has not loaded Django settings, hence the env var
+    directory = os.getenv('METRICS_DIR')
+    if directory:
+        from main import metrics
+        metrics.mark_process_dead(worker.pid, directory)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.safestring import mark_safe
-from .models import SiteConfiguration, Page, ContactMessage, InsurerBrand, QuoteOffer
+from .models import SiteConfiguration, Page, ContactMessage, InsurerBrand, QuoteOffer, QuoteOfferFactor, QuoteLead
  
 
 class SingletonModelAdmin(admin.ModelAdmin):
@@ -70,6 +70,16 @@ class ContactMessageAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         return False
     
+@admin.register(QuoteLead)
+class QuoteLeadAdmin(admin.ModelAdmin):
+    list_display = ('product', 'first_name', 'last_name', 'email', 'phone', 'created_at')
+    list_filter = ('product', 'created_at')
+    search_fields = ('first_name', 'last_name', 'email', 'phone', 'address')
+    readonly_fields = ('product', 'first_name', 'last_name', 'email', 'phone', 'address', 'answers', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
 admin.site.site_header = "Texas Insurance Ratings Admin"
 admin.site.site_title = "Texas Insurance Ratings Admin"
 admin.site.index_title = "Administration"
@@ -95,10 +105,15 @@ class InsurerBrandAdmin(admin.ModelAdmin):
         return "—"
     rating_stars.short_description = 'Rating'
 
+class QuoteOfferFactorInline(admin.TabularInline):
+    model = QuoteOfferFactor
+    extra = 1
+
 @admin.register(QuoteOffer)
 class QuoteOfferAdmin(admin.ModelAdmin):
-    list_display = ('title', 'premium', 'phone', 'order', 'is_active')
+    list_display = ('title', 'base_premium', 'premium', 'phone', 'order', 'is_active')
     list_filter = ('is_active',)
     search_fields = ('title', 'premium', 'phone')
     list_editable = ('order', 'is_active')
     filter_horizontal = ('brands',)
+    inlines = [QuoteOfferFactorInline]
@@ -0,0 +1,97 @@
+from django.db import transaction
+from . import content_cache
+from .models import BlogPost, InsurerBrand, BrandMention
+
+
+def mentioned_brand_ids(title, content, brands):
+    """
+    Returns the ids of brands whose name appears in the title or content.
+    Matches the old `title__icontains | content__icontains` lookup.
+    `brands` is an iterable of (id, name) pairs.
+    """
+    text = f'{title or ""}\n{content or ""}'.lower()
+    return {pk for pk, name in brands if name and name.lower() in text}
+
+
+def _brand_names():
+    return list(InsurerBrand.objects.values_list('id', 'name'))
+
+
+def index_post(post, brands=None):
+    """
+    Syncs the BrandMention rows of a single post.
+    """
+    if brands is None:
+        brands = _brand_names()
+    wanted = mentioned_brand_ids(post.title, post.content, brands)
+    existing = set(BrandMention.objects.filter(post=post).values_list('brand_id', flat=True))
+    with transaction.atomic():
+        if existing - wanted:
+            BrandMention.objects.filter(post=post, brand_id__in=existing - wanted).delete()
+        if wanted - existing:
+            BrandMention.objects.bulk_create(
+                [BrandMention(post=post, brand_id=pk) for pk in wanted - existing],
+                ignore_conflicts=True,
+            )
+
+
+def index_posts(posts):
+    """
+    Syncs the BrandMention rows of a batch of posts, e.g. after bulk_create
+    which skips the post_save handler.
+    """
+    brands = _brand_names()
+    posts = list(posts)
+    mentions = [
+        BrandMention(post_id=post.pk, brand_id=pk)
+        for post in posts
+        for pk in mentioned_brand_ids(post.title, post.content, brands)
+    ]
+    with transaction.atomic():
+        BrandMention.objects.filter(post_id__in=[p.pk for p in posts]).delete()
+        BrandMention.objects.bulk_create(mentions, batch_size=500)
+    return len(mentions)
+
+
+def index_brand(brand, chunk_size=500):
+    """
+    Rebuilds the BrandMention rows of a single brand by scanning every post once.
+    """
+    brands = [(brand.pk, brand.name)]
+    posts = BlogPost.objects.only('id', 'title', 'content').order_by('id').iterator(chunk_size=chunk_size)
+    post_ids = [p.pk for p in posts if mentioned_brand_ids(p.title, p.content, brands)]
+    with transaction.atomic():
+        BrandMention.objects.filter(brand=brand).delete()
+        BrandMention.objects.bulk_create(
+            [BrandMention(post_id=pk, brand=brand) for pk in post_ids],
+            batch_size=chunk_size,
+        )
+    return len(post_ids)
+
+
+def rebuild_all(batch_size=500, progress=None):
+    """
+    Rebuilds the whole BrandMention table in batches.
+    Returns (posts_scanned, mentions_written).
+    """
+    brands = _brand_names()
+    scanned = written = 0
+    batch = []
+    with transaction.atomic():
+        BrandMention.objects.all().delete()
+        posts = BlogPost.objects.only('id', 'title', 'content').order_by('id').iterator(chunk_size=batch_size)
+        for post in posts:
+            scanned += 1
+            batch.extend(BrandMention(post_id=post.pk, brand_id=pk) for pk in mentioned_brand_ids(post.title, post.content, brands))
+            if len(batch) >= batch_size:
+                BrandMention.objects.bulk_create(batch, batch_size=batch_size)
+                written += len(batch)
+                batch = []
+                if progress:
+                    progress(scanned, written)
+        if batch:
+            BrandMention.objects.bulk_create(batch, batch_size=batch_size)
+            written += len(batch)
+    # Brand pages list their mentions
+    content_cache.bump_on_commit(content_cache.PAGES)
+    return scanned, written
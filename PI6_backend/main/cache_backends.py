@@ -0,0 +1,261 @@
+"""
+Two-tier cache backend: a small per-process LRU (L1) in front of a shared
+cache (L2) that every gunicorn worker talks to.
+
+Configure L2 as a regular entry in settings.CACHES and point the tiered
+backend at it by alias:
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'main.cache_backends.TieredCache',
+            'OPTIONS': {'L2': 'shared', 'L1_MAX_ENTRIES': 500, 'L1_TIMEOUT': 30},
+        },
+        'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', ...},
+    }
+
+OPTIONS:
+    L2                 alias of the shared cache (required)
+    L1_MAX_ENTRIES     LRU size cap per process
+    L1_TIMEOUT         upper bound, in seconds, on how long L1 keeps an entry
+    L1_BYPASS_PREFIXES keys never held in L1 (generation counters must always
+                       come from L2, or one worker's invalidation would not
+                       reach the others)
+    READ_THROUGH       populate L1 from L2 hits
+    WRITE_THROUGH      on set, also write L1; otherwise L1 is only dropped
+                       (write-around) and refilled by the next read
+
+FileCache is the L2 used when no Redis is configured (see settings.CACHES).
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+
+from . import request_timing
+
+
+class LRUStore:
+    """
+    Bounded, thread-safe LRU map of key -> (expires_at, pickled value).
+    Values are pickled so callers can't mutate what other requests read.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False, None
+            expires_at, payload = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+        return True, pickle.loads(payload)
+
+    def set(self, key, value, ttl):
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, payload)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class FileCache(FileBasedCache):
+    """
+    FileBasedCache that only checks its size every CULL_EVERY sets.
+
+    Django's FileBasedCache lists the whole cache directory on every set to
+    decide whether to cull, which gets slow with tens of thousands of
+    entries. Checking every Nth set per process bounds that cost; the cache
+    may overshoot MAX_ENTRIES by up to CULL_EVERY sets per process between
+    checks.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self.cull_every = max(1, int(params.get('OPTIONS', {}).get('CULL_EVERY', 100)))
+        self._sets = 0
+        self._sets_lock = threading.Lock()
+
+    def _cull(self):
+        with self._sets_lock:
+            self._sets += 1
+            if self._sets < self.cull_every:
+                return
+            self._sets = 0
+        super()._cull()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options['L2']
+        self.l1_timeout = options.get('L1_TIMEOUT', 30)
+        self.bypass_prefixes = tuple(options.get('L1_BYPASS_PREFIXES', ('gen:',)))
+        self.read_through = options.get('READ_THROUGH', True)
+        self.write_through = options.get('WRITE_THROUGH', True)
+        self.l1 = LRUStore(options.get('L1_MAX_ENTRIES', 500))
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    # Stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {'l1_hits': 0, 'l1_misses': 0, 'l2_hits': 0, 'l2_misses': 0}
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                self._stats[name] += delta
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats, l1_size=len(self.l1))
+
+    # Helpers
+
+    def _l1_key(self, key, version):
+        return self.make_and_validate_key(key, version=version)
+
+    def _in_l1(self, key):
+        return not str(key).startswith(self.bypass_prefixes)
+
+    def _l1_ttl(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self.l1_timeout
+        return max(0, min(timeout - time.time(), self.l1_timeout))
+
+    def _remember(self, key, value, version, timeout=DEFAULT_TIMEOUT):
+        if self._in_l1(key):
+            self.l1.set(self._l1_key(key, version), value, self._l1_ttl(timeout))
+
+    def _forget(self, key, version):
+        if self._in_l1(key):
+            self.l1.delete(self._l1_key(key, version))
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        if self._in_l1(key):
+            found, value = self.l1.get(self._l1_key(key, version))
+            if found:
+                self._count(l1_hits=1)
+                request_timing.record_cache((key,), ())
+                return value
+            self._count(l1_misses=1)
+        sentinel = object()
+        value = self.l2.get(key, sentinel, version=version)
+        if value is sentinel:
+            self._count(l2_misses=1)
+            request_timing.record_cache((), (key,))
+            return default
+        self._count(l2_hits=1)
+        request_timing.record_cache((key,), ())
+        if self.read_through:
+            self._remember(key, value, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        result, missing = {}, []
+        for key in keys:
+            if self._in_l1(key):
+                found, value = self.l1.get(self._l1_key(key, version))
+                if found:
+                    result[key] = value
+                    continue
+            missing.append(key)
+        l1_lookups = sum(1 for key in keys if self._in_l1(key))
+        l1_misses = sum(1 for key in missing if self._in_l1(key))
+        self._count(l1_hits=l1_lookups - l1_misses, l1_misses=l1_misses)
+        if missing:
+            fetched = self.l2.get_many(missing, version=version)
+            self._count(l2_hits=len(fetched), l2_misses=len(missing) - len(fetched))
+            if self.read_through:
+                for key, value in fetched.items():
+                    self._remember(key, value, version)
+            result.update(fetched)
+        request_timing.record_cache(result, [key for key in keys if key not in result])
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        if self.write_through:
+            self._remember(key, value, version, timeout)
+        else:
+            self._forget(key, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if self.write_through and key not in failed:
+                self._remember(key, value, version, timeout)
+            else:
+                self._forget(key, version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added and self.write_through:
+            self._remember(key, value, version, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._forget(key, version)
+        return self.l2.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self._forget(key, version)
+        return self.l2.decr(key, delta, version=version)
+
+    def delete(self, key, version=None):
+        self._forget(key, version)
+        return self.l2.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._forget(key, version)
+        self.l2.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        if self._in_l1(key) and self.l1.get(self._l1_key(key, version))[0]:
+            return True
+        return self.l2.has_key(key, version=version)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
@@ -0,0 +1,153 @@
+"""
+Versioned cache namespaces for content-derived data.
+
+Every namespace has a generation number stored in the cache. Entries are
+keyed as "<namespace>:<generation>:<name>", so bumping the generation (done
+from model signals in main.signals) makes every entry of that namespace
+unreachable at once. Entries can therefore live for hours and still never
+be served stale after an editor saves.
+
+Generations are millisecond timestamps of the namespace's last change, so
+they also serve as a Last-Modified value (see changed_at()).
+"""
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+HOME = 'home'
+SITE = 'site'
+NAVBAR = 'navbar'
+FOOTER = 'footer'
+QUOTES = 'quotes'
+PAGES = 'pages'  # rendered public pages (main.page_cache)
+CATEGORIES = 'categories'
+
+# Which namespaces each model's changes invalidate
+MODEL_NAMESPACES = {
+    'BlogPost': (NAVBAR, FOOTER, PAGES),
+    'BlogCategory': (HOME, NAVBAR, FOOTER, PAGES, CATEGORIES),
+    'InsurerBrand': (HOME, QUOTES, PAGES),
+    'QuoteOffer': (QUOTES,),
+    'QuoteOfferFactor': (QUOTES,),
+    'Page': (FOOTER, PAGES),
+    'SiteConfiguration': (SITE, PAGES),
+}
+
+
+def _timeout(timeout=None):
+    if timeout is not None:
+        return timeout
+    return getattr(settings, 'CONTENT_CACHE_TIMEOUT', 6 * 60 * 60)
+
+
+def _generation_key(namespace):
+    return f'gen:{namespace}'
+
+
+def _new_generation():
+    # Seeded from the clock rather than 1 so a generation key that was
+    # evicted never comes back as a number older entries were written with.
+    return int(time.time() * 1000)
+
+
+def generations(*namespaces):
+    """
+    Returns {namespace: generation} for the given namespaces in one cache round-trip.
+    """
+    keys = {_generation_key(ns): ns for ns in namespaces}
+    found = cache.get_many(list(keys))
+    result = {}
+    for key, ns in keys.items():
+        gen = found.get(key)
+        if gen is None:
+            cache.add(key, _new_generation(), None)
+            gen = cache.get(key)
+        result[ns] = gen
+    return result
+
+
+def generation(namespace):
+    return generations(namespace)[namespace]
+
+
+def make_key(namespace, name, gen=None):
+    if gen is None:
+        gen = generation(namespace)
+    return f'{namespace}:{gen}:{name}'
+
+
+def get(namespace, name, default=None, gen=None):
+    return cache.get(make_key(namespace, name, gen), default)
+
+
+def set(namespace, name, value, timeout=None, gen=None):
+    cache.set(make_key(namespace, name, gen), value, _timeout(timeout))
+
+
+def get_or_set(namespace, name, default, timeout=None):
+    """
+    Like cache.get_or_set(); `default` may be a callable that builds the value.
+    """
+    key = make_key(namespace, name)
+    value = cache.get(key)
+    if value is None:
+        value = default() if callable(default) else default
+        cache.set(key, value, _timeout(timeout))
+    return value
+
+
+def get_bundle(name, namespaces, build, timeout=None):
+    """
+    Returns a value derived from several namespaces, stored under one key
+    together with the generations it was built from. The generations and the
+    bundle are read with a single get_many; `build()` runs only when any of
+    the namespaces has been bumped since.
+    """
+    key = f'bundle:{name}'
+    gen_keys = [_generation_key(ns) for ns in namespaces]
+    found = cache.get_many(gen_keys + [key])
+    current = tuple(found.get(k) for k in gen_keys)
+    cached = found.get(key)
+    if cached is not None and None not in current and cached[0] == current:
+        return cached[1]
+    if None in current:
+        current = tuple(generations(*namespaces)[ns] for ns in namespaces)
+    value = build()
+    cache.set(key, (current, value), _timeout(timeout))
+    return value
+
+
+def changed_at(gen):
+    """
+    Returns the (UTC) time a generation was created.
+    """
+    return datetime.fromtimestamp(gen / 1000, tz=timezone.utc)
+
+
+def bump(*namespaces):
+    """
+    Invalidates every entry in the given namespaces.
+    """
+    now = _new_generation()
+    current = cache.get_many([_generation_key(ns) for ns in namespaces])
+    cache.set_many({
+        _generation_key(ns): max(now, current.get(_generation_key(ns), 0) + 1)
+        for ns in namespaces
+    }, None)
+
+
+def bump_on_commit(*namespaces, using=None):
+    """
+    Like bump(), but deferred until the current transaction commits (run at
+    once outside a transaction). Bumping earlier lets a concurrent request
+    cache the pre-commit rows under the new generation, where they would
+    stay until the next bump.
+    """
+    transaction.on_commit(lambda: bump(*namespaces), using=using)
+
+
+def bump_for_model(model, using=None):
+    bump_on_commit(*MODEL_NAMESPACES.get(model.__name__, ()), using=using)
@@ -0,0 +1,304 @@
+"""
+Streaming bulk import/export of blog content (categories, posts, gallery
+images) as JSONL or CSV. Used by the import_content / export_content
+management commands.
+
+Records reference each other by slug: a category's `parent`, a post's
+`category` and a gallery image's `post`. In a mixed JSONL stream categories
+must come before the posts that use them, and posts before their images,
+which is the order export_content writes.
+
+bulk_create/bulk_update skip the post_save receivers in main.signals, so the
+importer maintains what they would: the search index and brand mentions of
+each batch of posts, then related posts and the content cache at the end.
+"""
+import csv
+import json
+import time
+
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import BlogCategory, BlogPost, BlogGalleryImage, allocate_slugs
+from . import brand_index, content_cache, related, search
+
+CATEGORY = 'category'
+POST = 'post'
+GALLERY_IMAGE = 'gallery_image'
+TYPES = (CATEGORY, POST, GALLERY_IMAGE)
+
+FIELDS = {
+    CATEGORY: [
+        'name', 'slug', 'parent', 'description', 'show_in_navbar', 'has_dropdown',
+        'is_featured_on_home', 'home_title', 'home_description', 'home_cta_text',
+        'home_cta_url', 'home_sort_order', 'icon_svg',
+    ],
+    POST: [
+        'title', 'slug', 'category', 'excerpt', 'content', 'featured_image', 'video_url',
+        'video_file', 'button_text', 'button_url', 'meta_title', 'meta_description',
+        'is_published', 'published_at',
+    ],
+    GALLERY_IMAGE: ['post', 'image', 'caption', 'order'],
+}
+
+# Fields that are references by slug rather than model columns
+REFERENCES = {
+    CATEGORY: {'parent': 'parent__slug'},
+    POST: {'category': 'category__slug'},
+    GALLERY_IMAGE: {'post': 'blog_post__slug'},
+}
+
+MODELS = {CATEGORY: BlogCategory, POST: BlogPost, GALLERY_IMAGE: BlogGalleryImage}
+
+
+# Reading / writing
+
+def read_jsonl(stream):
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        record_type = record.pop('type', None)
+        if record_type not in TYPES:
+            raise ValueError(f"Line {line_no}: unknown record type {record_type!r}")
+        yield record_type, record
+
+
+def read_csv(stream, record_type):
+    for row in csv.DictReader(stream):
+        yield record_type, row
+
+
+def _plain(value):
+    if value is None:
+        return None
+    if hasattr(value, 'get_prep_value'):  # CloudinaryResource
+        return value.get_prep_value()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, models.fields.files.FieldFile):
+        return value.name or None
+    return value
+
+
+def export_records(record_type, chunk_size=500):
+    """
+    Yields one dict per row, streamed with iterator(chunk_size=...).
+    """
+    model = MODELS[record_type]
+    refs = REFERENCES[record_type]
+    columns = [refs.get(name, name) for name in FIELDS[record_type]]
+    rows = model.objects.order_by('id').values_list(*columns).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield dict(zip(FIELDS[record_type], (_plain(v) for v in row)))
+
+
+def write_jsonl(stream, record_type, records):
+    count = 0
+    for record in records:
+        stream.write(json.dumps({'type': record_type, **record}, ensure_ascii=False))
+        stream.write('\n')
+        count += 1
+    return count
+
+
+def write_csv(stream, record_type, records):
+    writer = csv.DictWriter(stream, fieldnames=FIELDS[record_type])
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow({k: '' if v is None else v for k, v in record.items()})
+        count += 1
+    return count
+
+
+# Importing
+
+def _coerce(model, name, value):
+    field = model._meta.get_field(name)
+    if isinstance(value, str) and value == '' and (field.null or isinstance(field, (models.BooleanField, models.IntegerField, models.DateTimeField))):
+        return None
+    if isinstance(field, models.BooleanField):
+        if isinstance(value, str):
+            return value.strip().lower() in ('1', 'true', 'yes', 'y', 't')
+        return bool(value)
+    if isinstance(field, models.IntegerField):
+        return int(value)
+    if isinstance(field, models.DateTimeField):
+        parsed = parse_datetime(value) if isinstance(value, str) else value
+        if parsed is None and value is not None:
+            raise ValueError(f"{name}: invalid date/time {value!r}")
+        if parsed is not None and timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+    return value
+
+
+class ContentImporter:
+    """
+    Imports a stream of (record_type, dict) in batches with bulk_create /
+    bulk_update. With update=True, records whose slug already exists update
+    that row instead of creating a copy under a new slug.
+    """
+
+    def __init__(self, batch_size=500, update=False, progress=None):
+        self.batch_size = batch_size
+        self.update = update
+        self.progress = progress
+        self.counts = {t: 0 for t in TYPES}
+        self.started = time.monotonic()
+        self._pending = {t: [] for t in TYPES}
+        self._category_ids = None  # slug -> id
+        self._post_ids = {}  # file slug -> id
+
+    def run(self, records):
+        for record_type, record in records:
+            if record_type != CATEGORY and self._pending[CATEGORY]:
+                self._flush_categories()
+            if record_type == GALLERY_IMAGE and self._pending[POST]:
+                self._flush(POST)
+            self._pending[record_type].append(record)
+            # Categories are few and need every parent in view, so they are
+            # resolved in one pass rather than in batches.
+            if record_type != CATEGORY and len(self._pending[record_type]) >= self.batch_size:
+                self._flush(record_type)
+        if self._pending[CATEGORY]:
+            self._flush_categories()
+        for record_type in (POST, GALLERY_IMAGE):
+            if self._pending[record_type]:
+                self._flush(record_type)
+        self._refresh()
+        return self.counts
+
+    def _refresh(self):
+        # Related posts depend on every post's text and category, so they are
+        # rebuilt once rather than per batch
+        if self.counts[POST] or self.counts[CATEGORY]:
+            related.rebuild_all()
+        for model in MODELS.values():
+            content_cache.bump_for_model(model)
+        # Gallery images have no namespace of their own but show on post pages
+        content_cache.bump_on_commit(content_cache.PAGES)
+
+    def _report(self, record_type):
+        if self.progress:
+            self.progress(record_type, self.counts[record_type], time.monotonic() - self.started)
+
+    def _values(self, record_type, record):
+        model = MODELS[record_type]
+        refs = REFERENCES[record_type]
+        return {
+            name: _coerce(model, name, record[name])
+            for name in FIELDS[record_type]
+            if name in record and name not in refs and name != 'slug'
+        }
+
+    def _existing_by_slug(self, model, records):
+        if not self.update:
+            return {}
+        slugs = [r['slug'] for r in records if r.get('slug')]
+        return model.objects.in_bulk(slugs, field_name='slug') if slugs else {}
+
+    def _category_map(self):
+        if self._category_ids is None:
+            self._category_ids = dict(BlogCategory.objects.values_list('slug', 'id'))
+        return self._category_ids
+
+    def _flush(self, record_type):
+        records, self._pending[record_type] = self._pending[record_type], []
+        with transaction.atomic():
+            if record_type == POST:
+                self._import_posts(records)
+            else:
+                self._import_gallery_images(records)
+        self.counts[record_type] += len(records)
+        self._report(record_type)
+
+    @transaction.atomic
+    def _flush_categories(self):
+        records, self._pending[CATEGORY] = self._pending[CATEGORY], []
+        existing = self._existing_by_slug(BlogCategory, records)
+        new_records = [r for r in records if r.get('slug') not in existing]
+        new_slugs = iter(allocate_slugs(BlogCategory, [r.get('slug') or r['name'] for r in new_records]))
+
+        objs = []
+        for record in records:
+            obj = existing.get(record.get('slug')) or BlogCategory(slug=next(new_slugs))
+            for name, value in self._values(CATEGORY, record).items():
+                setattr(obj, name, value)
+            objs.append(obj)
+        BlogCategory.objects.bulk_create([obj for obj in objs if obj.pk is None], batch_size=self.batch_size)
+
+        # Single pass over parents once every category in the file has an id
+        category_ids = dict(BlogCategory.objects.values_list('slug', 'id'))
+        category_ids.update({record.get('slug') or obj.slug: obj.pk for record, obj in zip(records, objs)})
+        for record, obj in zip(records, objs):
+            parent = record.get('parent')
+            obj.parent_id = category_ids.get(parent) if parent else None
+        fields = [name for name in FIELDS[CATEGORY] if name != 'slug']
+        BlogCategory.objects.bulk_update(objs, fields, batch_size=self.batch_size)
+        BlogCategory.rebuild_tree()
+
+        self._category_ids = category_ids
+        self.counts[CATEGORY] += len(records)
+        self._report(CATEGORY)
+
+    def _import_posts(self, records):
+        categories = self._category_map()
+        existing = self._existing_by_slug(BlogPost, records)
+        new_records = [r for r in records if r.get('slug') not in existing]
+        slugs = allocate_slugs(BlogPost, [r.get('slug') or r['title'] for r in new_records])
+
+        def build(obj, record):
+            for name, value in self._values(POST, record).items():
+                if value is None and name in ('content', 'excerpt'):
+                    value = ''
+                setattr(obj, name, value)
+            category = record.get('category')
+            obj.category_id = categories.get(category) if category else None
+            return obj
+
+        created = [build(BlogPost(slug=slug), record) for record, slug in zip(new_records, slugs)]
+        BlogPost.objects.bulk_create(created, batch_size=self.batch_size)
+        # published_at is auto_now_add, which bulk_create overwrites; put the
+        # archive's dates back with a bulk_update (it skips pre_save).
+        dated = [(obj, r) for obj, r in zip(created, new_records) if r.get('published_at')]
+        for obj, record in dated:
+            obj.published_at = _coerce(BlogPost, 'published_at', record['published_at'])
+        if dated:
+            BlogPost.objects.bulk_update([obj for obj, _ in dated], ['published_at'], batch_size=self.batch_size)
+
+        updated = [build(existing[r['slug']], r) for r in records if r.get('slug') in existing]
+        if updated:
+            fields = [f for f in FIELDS[POST] if f not in ('slug', 'published_at')]
+            fields.append('updated_at')
+            now = timezone.now()
+            for obj in updated:
+                obj.updated_at = now
+            BlogPost.objects.bulk_update(updated, fields, batch_size=self.batch_size)
+
+        for record, obj in zip(new_records, created):
+            self._post_ids[record.get('slug') or obj.slug] = obj.pk
+        for obj in updated:
+            self._post_ids[obj.slug] = obj.pk
+
+        touched = created + updated
+        search.index_posts(touched)
+        brand_index.index_posts(touched)
+
+    def _import_gallery_images(self, records):
+        missing = {r['post'] for r in records if r.get('post') and r['post'] not in self._post_ids}
+        if missing:
+            self._post_ids.update(BlogPost.objects.filter(slug__in=missing).values_list('slug', 'id'))
+        images = []
+        for record in records:
+            post_id = self._post_ids.get(record.get('post'))
+            if post_id is None:
+                raise ValueError(f"Gallery image references unknown post {record.get('post')!r}")
+            values = self._values(GALLERY_IMAGE, record)
+            if values.get('order') is None:
+                values['order'] = 0
+            images.append(BlogGalleryImage(blog_post_id=post_id, **values))
+        BlogGalleryImage.objects.bulk_create(images, batch_size=self.batch_size)
@@ -1,65 +1,91 @@
-from django.core.cache import cache
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject, cached_property
+
 from .models import SiteConfiguration, Page, BlogCategory, BlogPost
+from . import content_cache, request_timing
 
-def site_config(request):
+# Everything the site chrome (header, navbar, footer) renders from the database
+CHROME_NAMESPACES = (content_cache.SITE, content_cache.NAVBAR, content_cache.FOOTER)
+
+
+def build_chrome():
     try:
-        config = cache.get('site_config')
-        if config is None:
-            config = SiteConfiguration.objects.first()
-            cache.set('site_config', config, 300)
+        config = SiteConfiguration.objects.first()
     except Exception:
         config = None
-    
-    # Fetch active footer pages
+
+    # Active footer pages, grouped by category
+    footer_pages = {'company': [], 'legal': []}
     try:
-        active_pages = Page.objects.filter(is_active=True, show_in_footer=True)
+        for page in Page.objects.filter(is_active=True, show_in_footer=True, category__in=footer_pages):
+            footer_pages[page.category].append(page)
     except Exception:
-        active_pages = Page.objects.none()
-    
-    # Fetch navbar categories (only top-level)
+        pass
+
+    # Navbar categories (only top-level) with their dropdown posts
     try:
-        navbar_categories = cache.get('navbar_categories')
-        if navbar_categories is None:
-            navbar_qs = BlogCategory.objects.filter(show_in_navbar=True, parent__isnull=True).prefetch_related('subcategories')
-            navbar_categories = list(navbar_qs)
-            cache.set('navbar_categories', navbar_categories, 300)
-        for c in navbar_categories:
-            if c.has_dropdown:
-                key = f'navbar_posts_{c.slug}'
-                posts = cache.get(key)
-                if posts is None:
-                    try:
-                        posts = list(c.get_family_posts())
-                    except Exception:
-                        posts = []
-                    cache.set(key, posts, 300)
-                c.family_posts = posts
+        navbar_categories = list(BlogCategory.objects.filter(show_in_navbar=True, parent__isnull=True))
+        dropdowns = [c for c in navbar_categories if c.has_dropdown]
+        try:
+            family_posts = BlogCategory.get_family_posts_for(dropdowns)
+        except Exception:
+            family_posts = {}
+        for c in dropdowns:
+            c.family_posts = family_posts.get(c.pk, [])
     except Exception:
         navbar_categories = []
 
-    # Fetch 'Texas Insurance Resources' category and posts for footer
+    # 'Texas Insurance Resources' category and posts for footer
     try:
-        resources_category = cache.get('resources_category')
-        resources_posts = cache.get('resources_posts')
-        if resources_posts is None or resources_category is None:
-            resources_category = BlogCategory.objects.get(name='Texas Insurance Resources')
-            resources_posts = list(BlogPost.objects.filter(category=resources_category, is_published=True).order_by('-published_at')[:5])
-            cache.set('resources_category', resources_category, 300)
-            cache.set('resources_posts', resources_posts, 300)
+        resources_category = BlogCategory.objects.get(name='Texas Insurance Resources')
+        resources_posts = list(BlogPost.objects.filter(category=resources_category, is_published=True).order_by('-published_at')[:5])
     except Exception:
         resources_category = None
         resources_posts = []
-    
-    # Group by category
-    footer_links = {
-        'company': active_pages.filter(category='company') if active_pages is not None else [],
-        'legal': active_pages.filter(category='legal') if active_pages is not None else [],
-        'resources_posts': resources_posts,
-        'resources_category': resources_category,
-    }
-    
+
     return {
         'site_config': config,
-        'footer_links': footer_links,
+        'footer_links': {
+            'company': footer_pages['company'],
+            'legal': footer_pages['legal'],
+            'resources_posts': resources_posts,
+            'resources_category': resources_category,
+        },
         'navbar_categories': navbar_categories,
     }
+
+
+class SiteChrome:
+    """
+    Loads the chrome bundle on first access, once per request.
+    """
+
+    @cached_property
+    def bundle(self):
+        with request_timing.span('chrome'):
+            try:
+                return content_cache.get_bundle('chrome', CHROME_NAMESPACES, build_chrome)
+            except Exception:
+                return build_chrome()
+
+    @cached_property
+    def version(self):
+        # Vary-on value for the navbar/footer {% cache %} fragments in base.html
+        with request_timing.span('chrome'):
+            gens = content_cache.generations(*CHROME_NAMESPACES)
+        return '.'.join(str(gens[ns]) for ns in CHROME_NAMESPACES)
+
+    def lazy(self, name):
+        return SimpleLazyObject(lambda: self.bundle[name])
+
+
+def site_config(request):
+    # Nothing is fetched until a template actually uses one of these
+    chrome = SiteChrome()
+    return {
+        'site_config': chrome.lazy('site_config'),
+        'footer_links': chrome.lazy('footer_links'),
+        'navbar_categories': chrome.lazy('navbar_categories'),
+        'chrome_version': SimpleLazyObject(lambda: chrome.version),
+        'chrome_cache_timeout': getattr(settings, 'CONTENT_CACHE_TIMEOUT', 6 * 60 * 60),
+    }
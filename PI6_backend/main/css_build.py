@@ -0,0 +1,137 @@
+"""
+Build-time Tailwind CSS (build_css / check_css commands).
+
+build_css runs the Tailwind v3 standalone CLI over the templates, JS and the
+classes editors used inside CKEditor content, and writes one minified
+static/css/site.css; collectstatic then hashes and compresses it. Templates
+link it through {% tailwind_css %}, which falls back to the CDN compiler
+while no build exists.
+
+check_css compares the classes the site uses with the selectors in the
+built file, to catch anything the build missed (e.g. a class assembled in
+JS or pasted into a post after the last build).
+"""
+import os
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+
+from .models import BlogPost, Page
+
+BUILT_CSS = 'css/site.css'
+TAILWIND_VERSION = 'v3.4.17'
+
+_CLASS_ATTR_RE = re.compile(r'class="([^"]*)"')
+_CLASS_LIST_RE = re.compile(r'classList\.(?:add|remove|toggle|contains)\(([^)]*)\)')
+_STRING_RE = re.compile(r"""['"]([^'"]+)['"]""")
+_TEMPLATE_TAG_RE = re.compile(r'{%.*?%}|{{.*?}}', re.S)
+_SELECTOR_CLASS_RE = re.compile(r'\.((?:\\.|[A-Za-z0-9_-])+)')
+_STYLE_BLOCK_RE = re.compile(r'<style[^>]*>(.*?)</style>', re.S)
+
+
+def tailwind_dir():
+    return Path(settings.BASE_DIR) / 'tailwind'
+
+
+def output_path():
+    return Path(settings.STATICFILES_DIRS[0]) / BUILT_CSS
+
+
+def classes_in_html(text):
+    classes = set()
+    for attr in _CLASS_ATTR_RE.findall(text):
+        classes.update(_TEMPLATE_TAG_RE.sub(' ', attr).split())
+    for args in _CLASS_LIST_RE.findall(text):
+        for value in _STRING_RE.findall(args):
+            classes.update(value.split())
+    return classes
+
+
+def _templates():
+    for directory in settings.TEMPLATES[0]['DIRS']:
+        for path in sorted(Path(directory).rglob('*.html')):
+            yield path.read_text(encoding='utf-8')
+
+
+def template_classes():
+    classes = set()
+    for text in _templates():
+        classes |= classes_in_html(text)
+    return classes
+
+
+def inline_style_classes():
+    """
+    Classes defined by <style> blocks in the templates themselves.
+    """
+    classes = set()
+    for text in _templates():
+        for css in _STYLE_BLOCK_RE.findall(text):
+            classes |= built_classes(css)
+    return classes
+
+
+def content_classes():
+    """
+    Classes used inside rich-text content (CKEditor output) stored in the database.
+    """
+    classes = set()
+    for model, fields in ((BlogPost, ('content', 'excerpt')), (Page, ('content',))):
+        rows = model.objects.filter(content__contains='class=').values_list(*fields)
+        for row in rows.iterator(chunk_size=500):
+            for value in row:
+                classes |= classes_in_html(value or '')
+    return classes
+
+
+def write_content_classes(classes):
+    """
+    Writes the CKEditor classes where the Tailwind content globs pick them up.
+    """
+    path = tailwind_dir() / 'content-classes.html'
+    path.write_text(''.join(f'<div class="{name}"></div>\n' for name in sorted(classes)), encoding='utf-8')
+    return path
+
+
+def find_cli(cli=None):
+    cli = cli or os.getenv('TAILWIND_CLI') or shutil.which('tailwindcss')
+    if not cli:
+        raise FileNotFoundError(
+            "Tailwind CLI not found. Install pytailwindcss (requirements.txt) or set TAILWIND_CLI."
+        )
+    return cli
+
+
+def build(cli=None, minify=True):
+    """
+    Runs the Tailwind CLI and returns the path of the built stylesheet.
+    """
+    output = output_path()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    command = [
+        find_cli(cli),
+        '--config', str(tailwind_dir() / 'tailwind.config.js'),
+        '--input', str(tailwind_dir() / 'input.css'),
+        '--output', str(output),
+    ]
+    if minify:
+        command.append('--minify')
+    # pytailwindcss downloads "latest" (v4) unless pinned; the config is v3
+    env = dict(os.environ, TAILWINDCSS_VERSION=os.getenv('TAILWINDCSS_VERSION', TAILWIND_VERSION))
+    subprocess.run(command, check=True, cwd=tailwind_dir(), env=env)
+    return output
+
+
+def built_classes(css):
+    return {re.sub(r'\\(.)', r'\1', name) for name in _SELECTOR_CLASS_RE.findall(css)}
+
+
+def missing_classes(css, used, ignored=()):
+    """
+    Returns the used classes with no selector in the built CSS or in the
+    templates' own <style> blocks.
+    """
+    return sorted(used - built_classes(css) - inline_style_classes() - set(ignored))
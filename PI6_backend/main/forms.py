@@ -1,7 +1,38 @@
 from django import forms
-from .models import ContactMessage
+from .models import ContactMessage, QuoteOfferFactor
 
 class ContactForm(forms.ModelForm):
     class Meta:
         model = ContactMessage
         fields = ['name', 'email', 'subject', 'message']
+
+
+# Quote wizard steps (main.wizard). Every answer may be left blank; what is
+# given must be well formed.
+
+class AddressStepForm(forms.Form):
+    address = forms.CharField(max_length=255, required=False)
+
+
+class CoverageStepForm(forms.Form):
+    # Blank prices at the standard tier (main.quote_pricing)
+    coverage_tier = forms.ChoiceField(choices=QuoteOfferFactor.TIER_CHOICES, required=False)
+
+
+class NameStepForm(forms.Form):
+    first_name = forms.CharField(max_length=100, required=False)
+    last_name = forms.CharField(max_length=100, required=False)
+
+
+class EmailStepForm(forms.Form):
+    email = forms.EmailField(required=False)
+
+
+class PhoneStepForm(forms.Form):
+    phone = forms.CharField(max_length=30, required=False)
+
+    def clean_phone(self):
+        phone = self.cleaned_data['phone']
+        if phone and not 7 <= sum(c.isdigit() for c in phone) <= 15:
+            raise forms.ValidationError('Enter a valid phone number.')
+        return phone
@@ -0,0 +1,139 @@
+"""
+Liveness and readiness checks behind /api/health/live and /api/health/ready.
+
+Liveness only says the process is serving requests. Readiness checks what a
+request needs: the database answers `SELECT 1` (with a server-side statement
+timeout on Postgres), the shared cache completes a set/get round-trip, and
+no migrations are pending. The result is kept in process for
+HEALTH_CHECK_CACHE_SECONDS and only one thread re-checks at a time, so a
+burst of probes costs at most one query per worker per interval.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.utils.module_loading import import_string
+
+_lock = threading.Lock()
+# One thread, so a hung cache backs probes up behind it instead of piling up threads
+_cache_probe = ThreadPoolExecutor(max_workers=1, thread_name_prefix='health-cache')
+_result = None  # (checked_at, report)
+# Pending migrations can't appear without a deploy, i.e. a new process
+_migrations_applied = False
+
+
+def _timeout():
+    return getattr(settings, 'HEALTH_CHECK_TIMEOUT', 2.0)
+
+
+def check_database():
+    connection = connections[DEFAULT_DB_ALIAS]
+    with transaction.atomic(using=DEFAULT_DB_ALIAS), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL statement_timeout = %s', [int(_timeout() * 1000)])
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+    return {}
+
+
+def _probe_cache():
+    """
+    A private instance of the shared cache (not the per-worker L1 in front
+    of it). On Redis its connect and socket operations time out after
+    HEALTH_CHECK_TIMEOUT, which the app's own cache connections don't.
+    """
+    alias = getattr(settings, 'HEALTH_CHECK_CACHE', 'shared')
+    params = dict(settings.CACHES[alias if alias in settings.CACHES else 'default'])
+    backend = params.pop('BACKEND')
+    if backend == 'django.core.cache.backends.redis.RedisCache':
+        params['OPTIONS'] = dict(params.get('OPTIONS', {}), socket_timeout=_timeout(), socket_connect_timeout=_timeout())
+    return import_string(backend)(params.pop('LOCATION', ''), params)
+
+
+def _cache_round_trip():
+    cache = _probe_cache()
+    try:
+        key, token = 'health:ready', uuid.uuid4().hex
+        cache.set(key, token, 30)
+        if cache.get(key) != token:
+            raise RuntimeError('value read back does not match')
+    finally:
+        cache.close()
+    return {}
+
+
+def check_cache():
+    # Waits at most HEALTH_CHECK_TIMEOUT even for backends without socket timeouts
+    try:
+        return _cache_probe.submit(_cache_round_trip).result(timeout=_timeout())
+    except FutureTimeout:
+        raise RuntimeError(f'no answer within {_timeout()}s') from None
+
+
+def check_migrations():
+    global _migrations_applied
+    if _migrations_applied:
+        return {'pending': 0}
+    executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+    pending = len(executor.migration_plan(executor.loader.graph.leaf_nodes()))
+    if pending:
+        raise RuntimeError(f'{pending} unapplied migration(s)')
+    _migrations_applied = True
+    return {'pending': 0}
+
+
+CHECKS = {
+    'database': check_database,
+    'cache': check_cache,
+    'migrations': check_migrations,
+}
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def run_checks():
+    checks = {}
+    for name, check in CHECKS.items():
+        started = time.perf_counter()
+        try:
+            result = {'ok': True, **check()}
+        except Exception as exc:
+            result = {'ok': False, 'error': f'{type(exc).__name__}: {exc}'[:200]}
+        elapsed = time.perf_counter() - started
+        if result['ok'] and elapsed > _timeout():
+            result = {'ok': False, 'error': f'took longer than {_timeout()}s'}
+        result['ms'] = _ms(elapsed)
+        checks[name] = result
+    return {'ok': all(c['ok'] for c in checks.values()), 'checks': checks}
+
+
+def readiness():
+    """
+    Returns the readiness report, re-running the checks at most once per
+    HEALTH_CHECK_CACHE_SECONDS in this process.
+    """
+    global _result
+    ttl = getattr(settings, 'HEALTH_CHECK_CACHE_SECONDS', 5)
+    with _lock:
+        now = time.monotonic()
+        if _result is None or now - _result[0] >= ttl:
+            _result = (now, run_checks())
+            now = time.monotonic()
+        checked_at, report = _result
+    return dict(report, age_ms=_ms(now - checked_at))
+
+
+def reset():
+    """
+    Forgets the cached readiness report and migration state (for tests).
+    """
+    global _result, _migrations_applied
+    with _lock:
+        _result = None
+        _migrations_applied = False
@@ -0,0 +1,75 @@
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives a running server with concurrent clients and reports throughput and latency, "
+        "to compare server settings (worker counts, worker classes) against the same dataset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help="e.g. http://127.0.0.1:8000")
+        parser.add_argument('--path', action='append', dest='paths',
+                            help="Path to request (repeatable); defaults to the home, blog list and health views")
+        parser.add_argument('--concurrency', type=int, action='append', dest='levels',
+                            help="Concurrent clients (repeatable, default 1, 8, 32)")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per concurrency level")
+        parser.add_argument('--cookie', default='csrftoken=bench',
+                            help="Cookie sent with every request (the default bypasses the page cache)")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/', '/blog/', '/api/health/']
+        for level in options['levels'] or [1, 8, 32]:
+            for path in paths:
+                url = options['base_url'].rstrip('/') + path
+                result = self.run(url, level, options['requests'], options['cookie'])
+                self.stdout.write(
+                    f"{path:<28} c={level:<4} {result['rps']:8.1f} req/s  "
+                    f"p50 {result['p50']:7.1f} ms  p95 {result['p95']:7.1f} ms  errors {result['errors']}"
+                )
+
+    def run(self, url, concurrency, total, cookie):
+        latencies, errors = [], []
+        remaining = iter(range(total))
+        lock = threading.Lock()
+
+        def client():
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                request = urllib.request.Request(url, headers={'Cookie': cookie} if cookie else {})
+                started = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(request, timeout=60) as response:
+                        response.read()
+                except (urllib.error.URLError, OSError) as exc:
+                    with lock:
+                        errors.append(exc)
+                    continue
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies.append(elapsed)
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+        return {
+            'rps': len(latencies) / wall if wall else 0.0,
+            'p50': statistics.median(latencies) if latencies else 0.0,
+            'p95': p95,
+            'errors': len(errors),
+        }
@@ -0,0 +1,43 @@
+import subprocess
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from main import css_build
+
+
+class Command(BaseCommand):
+    help = "Builds the purged, minified Tailwind stylesheet (static/css/site.css). Run before collectstatic."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cli', help="Path to the Tailwind v3 CLI (default: TAILWIND_CLI or tailwindcss on PATH)")
+        parser.add_argument('--no-minify', action='store_true', help="Keep the output readable")
+        parser.add_argument('--skip-content', action='store_true',
+                            help="Don't scan CKEditor content in the database for classes")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        classes = set()
+        if not options['skip_content']:
+            try:
+                classes = css_build.content_classes()
+            except DatabaseError as exc:
+                self.stderr.write(f"Skipping CKEditor content classes (database unavailable: {exc})")
+        css_build.write_content_classes(classes)
+
+        try:
+            output = css_build.build(options['cli'], minify=not options['no_minify'])
+        except (FileNotFoundError, subprocess.CalledProcessError) as exc:
+            raise CommandError(f"Tailwind build failed: {exc}")
+
+        css = output.read_text(encoding='utf-8')
+        missing = css_build.missing_classes(css, css_build.template_classes() | classes)
+        if missing:
+            self.stderr.write(self.style.WARNING(
+                f"{len(missing)} classes in use have no CSS: {' '.join(missing)}"
+            ))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Built {output} ({len(css) / 1024:.1f} KB, {len(classes)} content classes) in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main import css_build
+
+
+class Command(BaseCommand):
+    help = "Lists classes used by templates and CKEditor content that the built stylesheet doesn't define."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ignore', action='append', default=[], help="Class to ignore (repeatable)")
+        parser.add_argument('--skip-content', action='store_true', help="Only check the templates")
+        parser.add_argument('--strict', action='store_true', help="Exit with an error when classes are missing")
+
+    def handle(self, *args, **options):
+        path = css_build.output_path()
+        if not path.exists():
+            raise CommandError(f"{path} does not exist; run build_css first")
+        used = css_build.template_classes()
+        if not options['skip_content']:
+            used |= css_build.content_classes()
+
+        missing = css_build.missing_classes(path.read_text(encoding='utf-8'), used, options['ignore'])
+        for name in missing:
+            self.stdout.write(name)
+        summary = f"{len(missing)} of {len(used)} classes missing from {path.name}"
+        if missing and options['strict']:
+            raise CommandError(summary)
+        self.stdout.write(self.style.WARNING(summary) if missing else self.style.SUCCESS(summary))
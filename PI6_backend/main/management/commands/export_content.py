@@ -0,0 +1,38 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main import content_io
+
+
+class Command(BaseCommand):
+    help = "Streams blog categories, posts and gallery images out as JSONL or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help="File to write, or '-' for stdout")
+        parser.add_argument('--format', choices=['jsonl', 'csv'], help="Defaults to the file extension")
+        parser.add_argument('--type', choices=content_io.TYPES, action='append',
+                            help="Record type(s) to export; all by default. CSV takes exactly one.")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Rows fetched per database round-trip")
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = options['format'] or ('csv' if output.endswith('.csv') else 'jsonl')
+        types = options['type'] or list(content_io.TYPES)
+        if fmt == 'csv' and len(types) != 1:
+            raise CommandError("CSV export needs exactly one --type")
+
+        stream = sys.stdout if output == '-' else open(output, 'w', newline='', encoding='utf-8')
+        log = self.stderr if output == '-' else self.stdout
+        started = time.monotonic()
+        try:
+            for record_type in types:
+                records = content_io.export_records(record_type, chunk_size=options['chunk_size'])
+                write = content_io.write_csv if fmt == 'csv' else content_io.write_jsonl
+                count = write(stream, record_type, records)
+                elapsed = time.monotonic() - started
+                log.write(f"  {record_type}: {count} rows ({elapsed:.1f}s)")
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main import placeholders
+
+
+class Command(BaseCommand):
+    help = "Pre-generates every placeholder image variant into PLACEHOLDER_CACHE_DIR."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--theme', action='append', choices=sorted(placeholders.THEMES),
+                            help="Theme to generate (repeatable, default: all)")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = placeholders.pregenerate(options['theme'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {count} placeholder images in {placeholders.cache_dir()} in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main import content_io
+
+
+class Command(BaseCommand):
+    help = "Bulk-imports blog categories, posts and gallery images from JSONL or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or '-' for stdin")
+        parser.add_argument('--format', choices=['jsonl', 'csv'], help="Defaults to the file extension")
+        parser.add_argument('--type', choices=content_io.TYPES, help="Record type of a CSV file")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per bulk write")
+        parser.add_argument('--update', action='store_true', help="Update rows whose slug already exists instead of adding copies")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        if fmt == 'csv' and not options['type']:
+            raise CommandError("--type is required for CSV input")
+
+        def progress(record_type, count, elapsed):
+            rate = count / elapsed if elapsed else 0
+            self.stdout.write(f"  {record_type}: {count} rows ({rate:.0f} rows/s)")
+
+        importer = content_io.ContentImporter(
+            batch_size=options['batch_size'], update=options['update'], progress=progress
+        )
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            if fmt == 'csv':
+                records = content_io.read_csv(stream, options['type'])
+            else:
+                records = content_io.read_jsonl(stream)
+            try:
+                counts = importer.run(records)
+            except (KeyError, ValueError) as e:
+                raise CommandError(f"Import failed: {e}")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        summary = ', '.join(f"{count} {record_type}" for record_type, count in counts.items() if count)
+        self.stdout.write(self.style.SUCCESS(f"Imported {summary or 'nothing'}"))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main import brand_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the BrandMention index used by the company/brand blog pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Posts read and mentions written per batch")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(scanned, written):
+            self.stdout.write(f"  {scanned} posts scanned, {written} mentions written")
+
+        scanned, written = brand_index.rebuild_all(batch_size=options['batch_size'], progress=progress)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {written} brand mentions across {scanned} posts in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main import search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the blog full-text search index (Postgres search_vector or SQLite FTS5 table)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Posts indexed per batch")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = search.rebuild_index(chunk_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} posts in {elapsed:.1f}s"))
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main import static_site
+
+
+class Command(BaseCommand):
+    help = "Pre-renders the public blog, page and company URLs to static HTML, re-rendering only what changed since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=str(settings.STATIC_SITE_ROOT), help="Output directory")
+        parser.add_argument('--base-url', default=settings.STATIC_SITE_BASE_URL,
+                            help="Scheme and host the pages are rendered for, e.g. https://example.com")
+        parser.add_argument('--full', action='store_true', help="Re-render every page")
+        parser.add_argument('--workers', type=int, default=0, help="Render processes (default: one per CPU, 1 renders in-process)")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(done, total):
+            if done % 100 == 0 or done == total:
+                self.stdout.write(f"  {done}/{total} pages rendered")
+
+        summary = static_site.build(
+            options['output'],
+            base_url=options['base_url'],
+            full=options['full'],
+            workers=options['workers'] or None,
+            progress=progress if options['verbosity'] > 1 else None,
+        )
+        for path in summary['failed']:
+            self.stderr.write(f"Skipped {path} (did not render with 200)")
+        elapsed = time.monotonic() - started
+        mode = "full" if summary['full'] else "incremental"
+        self.stdout.write(self.style.SUCCESS(
+            f"{mode.capitalize()} build: rendered {summary['rendered']} of {summary['total']} pages, "
+            f"removed {summary['removed']} in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import report, runner
+from main import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a synthetic dataset into a throwaway database at each size, requests every route "
+        "in-process and reports latency percentiles, throughput and query counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, action='append', dest='sizes',
+                            help="Number of posts (repeatable, default 1000, 10000, 100000)")
+        parser.add_argument('--mode', action='append', dest='modes', choices=runner.MODES,
+                            help="Cache mode (repeatable, default all)")
+        parser.add_argument('--route', action='append', dest='routes', help="Only benchmark this route (repeatable)")
+        parser.add_argument('--iterations', type=int, default=runner.ITERATIONS, help="Timed requests per route and mode")
+        parser.add_argument('--warmup', type=int, default=runner.WARMUP, help="Untimed requests before each measurement")
+        parser.add_argument('--seed', type=int, default=seeding.DEFAULT_SEED, help="Dataset seed")
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--baseline', help="Compare against an earlier JSON result file")
+        parser.add_argument('--keepdb', action='store_true', help="Keep the benchmark database between runs")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1")
+        baseline = report.load(options['baseline']) if options['baseline'] else None
+        sizes = options['sizes'] or runner.SIZES
+        modes = options['modes'] or runner.MODES
+
+        def progress(run):
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f"  {run['posts']} posts  {run['route']} [{run['mode']}]  p50 {run['p50_ms']:.2f} ms"
+                )
+
+        with runner.benchmark_settings(), runner.benchmark_database(keepdb=options['keepdb']):
+            datasets, runs = runner.run(
+                sizes=sizes,
+                modes=modes,
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                only=set(options['routes'] or ()),
+                seed=options['seed'],
+                progress=progress,
+            )
+            meta = runner.metadata(
+                sizes=sorted(sizes), modes=list(modes), iterations=options['iterations'],
+                warmup=options['warmup'], seed=options['seed'],
+            )
+
+        for dataset in datasets:
+            self.stdout.write(f"Seeded {dataset['posts']} posts in {dataset['seed_seconds']}s")
+        self.stdout.write(report.format_runs(runs))
+        if options['output']:
+            report.write(options['output'], meta, datasets, runs)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        if baseline:
+            self.stdout.write('')
+            self.stdout.write(report.format_comparison(report.compare(baseline, {'runs': runs})))
+        failed = sum(run['errors'] for run in runs)
+        if failed:
+            self.stderr.write(self.style.WARNING(f"{failed} requests returned an unexpected status"))
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main import seeding
+from main.models import BlogCategory, BlogGalleryImage, BlogPost, BrandMention, ContactMessage, InsurerBrand, QuoteOffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generates a large deterministic dataset (category tree, brands, quote offers, posts "
+        "mentioning brands, gallery images, contact messages) for scale testing. Re-running with "
+        "bigger numbers extends the existing dataset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000, help="Total blog posts")
+        parser.add_argument('--categories', type=int, default=100, help="Generated blog categories")
+        parser.add_argument('--depth', type=int, default=3, help="Levels in the category tree")
+        parser.add_argument('--brands', type=int, default=50, help="Total insurer brands")
+        parser.add_argument('--offers', type=int, help="Quote offers (default: one per five brands)")
+        parser.add_argument('--gallery-images', type=int, default=3, help="Maximum gallery images per post")
+        parser.add_argument('--contact-messages', type=int, help="Total contact messages (default: posts / 10)")
+        parser.add_argument('--seed', type=int, default=seeding.DEFAULT_SEED, help="Random seed")
+        parser.add_argument('--batch-size', type=int, default=seeding.BATCH_SIZE, help="Rows per bulk insert")
+
+    def handle(self, *args, **options):
+        for name in ('posts', 'categories', 'depth', 'brands', 'batch_size'):
+            if options[name] < (1 if name in ('depth', 'batch_size') else 0):
+                raise CommandError(f"--{name.replace('_', '-')} is out of range")
+        seed = options['seed']
+        offers = options['offers'] if options['offers'] is not None else max(options['brands'] // 5, 1)
+        contacts = options['contact_messages'] if options['contact_messages'] is not None else options['posts'] // 10
+        started = time.monotonic()
+
+        if seeding.seed_site(seed, brands=options['brands'], categories=options['categories'],
+                             depth=options['depth'], offers=offers):
+            self.stdout.write(f"Seeded site: {options['categories']} categories, {options['depth']} levels deep")
+        else:
+            self.stdout.write("Site already seeded; categories, brands and offers are left as they are")
+
+        def progress(done, total):
+            self.stdout.write(f"  {done}/{total} posts")
+
+        added = seeding.seed_posts(
+            options['posts'], seed,
+            gallery_images=options['gallery_images'],
+            batch_size=options['batch_size'],
+            progress=progress if options['verbosity'] > 1 else None,
+        )
+        messages = seeding.seed_contact_messages(contacts, seed, batch_size=options['batch_size'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Added {added} posts and {messages} contact messages in {elapsed:.1f}s"
+        ))
+        counts = [
+            ('categories', BlogCategory), ('brands', InsurerBrand), ('quote offers', QuoteOffer),
+            ('posts', BlogPost), ('gallery images', BlogGalleryImage), ('brand mentions', BrandMention),
+            ('contact messages', ContactMessage),
+        ]
+        for label, model in counts:
+            self.stdout.write(f"  {label:<17} {model.objects.count()}")
@@ -0,0 +1,352 @@
+"""
+Prometheus metrics served at /metrics (text exposition format 0.0.4).
+
+Counters and histograms are pre-aggregated in process: recording one is a
+dict update under a lock, fed by RequestTimingMiddleware from the same
+main.request_timing collector that builds the Server-Timing header, so
+every request (sampled or not) adds its latency, query count and time,
+cache hits and misses by key family and template time, labelled by URL
+name.
+
+Under gunicorn each worker has its own registry. With METRICS_DIR set,
+every worker writes a JSON snapshot of its registry to that directory (at
+most every METRICS_FLUSH_SECONDS, atomically) and a scrape answered by any
+worker merges all the snapshots, so the totals cover the whole server.
+
+Like prometheus_client's multiprocess mode, a dead worker's file has to be
+retired: mark_process_dead() (called from gunicorn's child_exit hook in
+gunicorn.conf.py, and by collect() for any worker that is gone) folds it
+into archive.json, so counters keep their totals but a scrape only parses
+one file per live worker plus the archive.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: no gunicorn workers to retire
+    fcntl = None
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name: (type, help, label names, buckets)
+METRICS = {
+    'pi6_http_requests_total': (
+        COUNTER, 'Requests served, by URL name, method and status.', ('route', 'method', 'status'), None),
+    'pi6_http_request_duration_seconds': (
+        HISTOGRAM, 'Request latency by URL name.', ('route',), LATENCY_BUCKETS),
+    'pi6_db_queries_total': (
+        COUNTER, 'Database queries, by URL name.', ('route',), None),
+    'pi6_db_query_seconds_total': (
+        COUNTER, 'Time spent in database queries, by URL name.', ('route',), None),
+    'pi6_cache_requests_total': (
+        COUNTER, 'Cache lookups by key family and result (hit or miss).', ('family', 'result'), None),
+    'pi6_template_render_seconds': (
+        HISTOGRAM, 'Template render time per request, by URL name.', ('route',), LATENCY_BUCKETS),
+    'pi6_wizard_steps_total': (
+        COUNTER, 'Quote wizard steps completed, by product and step.', ('product', 'step'), None),
+    'pi6_contact_messages_total': (
+        COUNTER, 'Contact messages stored.', (), None),
+}
+
+# Derived at exposition time from pi6_cache_requests_total
+CACHE_HIT_RATIO = 'pi6_cache_hit_ratio'
+
+
+class Registry:
+    """
+    Counter values and histogram bucket counts keyed by (name, label values).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def inc(self, name, amount=1, labels=()):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        buckets = METRICS[name][3]
+        key = (name, labels)
+        with self._lock:
+            state = self.histograms.get(key)
+            if state is None:
+                state = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(buckets)] += 1
+            state[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(state)] for (name, labels), state in self.histograms.items()],
+            }
+
+    def merge(self, snapshot):
+        for name, labels, value in snapshot.get('counters', ()):
+            if name in METRICS:
+                self.inc(name, value, tuple(labels))
+        for name, labels, state in snapshot.get('histograms', ()):
+            if name not in METRICS or len(state) != len(METRICS[name][3]) + 2:
+                continue
+            key = (name, tuple(labels))
+            with self._lock:
+                current = self.histograms.setdefault(key, [0] * (len(state) - 1) + [0.0])
+                for i, value in enumerate(state):
+                    current[i] += value
+
+
+registry = Registry()
+
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, _label_values(name, labels))
+    _maybe_flush()
+
+
+def observe(name, value, **labels):
+    registry.observe(name, value, _label_values(name, labels))
+    _maybe_flush()
+
+
+def _label_values(name, labels):
+    return tuple(str(labels[label]) for label in METRICS[name][2])
+
+
+def enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    # Unresolved paths (404s) share one label so scanners can't inflate the series count
+    return match.view_name if match is not None and match.url_name else 'unmatched'
+
+
+def record_request(request, response, timings):
+    """
+    Adds one finished request (and the RequestTimings collected for it).
+    """
+    route = route_name(request)
+    registry.inc('pi6_http_requests_total', 1, (route, request.method, str(response.status_code)))
+    registry.observe('pi6_http_request_duration_seconds', timings.elapsed(), (route,))
+    registry.inc('pi6_db_queries_total', timings.queries, (route,))
+    registry.inc('pi6_db_query_seconds_total', timings.db_seconds, (route,))
+    for family, (hits, misses) in timings.cache.items():
+        if hits:
+            registry.inc('pi6_cache_requests_total', hits, (family, 'hit'))
+        if misses:
+            registry.inc('pi6_cache_requests_total', misses, (family, 'miss'))
+    if 'tpl' in timings.spans:
+        registry.observe('pi6_template_render_seconds', timings.spans['tpl'], (route,))
+    _maybe_flush()
+
+
+# Multi-worker aggregation (METRICS_DIR)
+
+_process_id = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+_last_flush = 0.0
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def _maybe_flush():
+    if not metrics_dir():
+        return
+    if time.monotonic() - _last_flush >= getattr(settings, 'METRICS_FLUSH_SECONDS', 5):
+        flush()
+
+
+def _write_json(directory, filename, data):
+    """
+    Write-then-rename, so a scrape never reads a partial file.
+    """
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as handle:
+            json.dump(data, handle, separators=(',', ':'))
+        os.replace(tmp, os.path.join(directory, filename))
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def _read_into(target, path):
+    try:
+        with open(path) as handle:
+            target.merge(json.load(handle))
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def flush():
+    """
+    Writes this process's snapshot to METRICS_DIR.
+    """
+    global _last_flush, _process_id
+    directory = metrics_dir()
+    if not directory:
+        return
+    _last_flush = time.monotonic()
+    if not _process_id.startswith(f'{os.getpid()}-'):
+        # Forked after import (gunicorn --preload): the child gets its own file
+        _process_id = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+    os.makedirs(directory, exist_ok=True)
+    _write_json(directory, f'{_process_id}.json', registry.snapshot())
+
+
+ARCHIVE_FILE = 'archive.json'
+
+
+def _snapshot_pid(filename):
+    head = filename.split('-', 1)[0]
+    return int(head) if head.isdigit() and filename.endswith('.json') else None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def _locked(directory, mode):
+    """
+    Serializes archiving (LOCK_EX) against scrapes (LOCK_SH), so a scrape
+    never counts a dead worker both in its file and in the archive.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, '.lock'), 'a') as handle:
+        fcntl.flock(handle, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def mark_process_dead(pid, directory=None):
+    """
+    Folds worker `pid`'s snapshots into the archive and removes them.
+    Safe to call from the gunicorn master, before Django settings load.
+    """
+    directory = directory or metrics_dir()
+    if not directory or fcntl is None or not os.path.isdir(directory):
+        return
+    with _locked(directory, fcntl.LOCK_EX):
+        dead = [name for name in os.listdir(directory) if _snapshot_pid(name) == pid]
+        if not dead:
+            return
+        archive = Registry()
+        _read_into(archive, os.path.join(directory, ARCHIVE_FILE))
+        for name in dead:
+            _read_into(archive, os.path.join(directory, name))
+        _write_json(directory, ARCHIVE_FILE, archive.snapshot())
+        for name in dead:
+            try:
+                os.unlink(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def collect():
+    """
+    The registry to expose: this process's own, or with METRICS_DIR the
+    merge of the archive and every live worker's snapshot (this one
+    flushed first). Snapshots of workers that are gone are archived first.
+    """
+    directory = metrics_dir()
+    if not directory:
+        return registry
+    flush()
+    pids = {_snapshot_pid(name) for name in os.listdir(directory)} - {None, os.getpid()}
+    for pid in pids:
+        if not _pid_alive(pid):
+            mark_process_dead(pid, directory)
+    merged = Registry()
+    with _locked(directory, fcntl.LOCK_SH if fcntl else None):
+        for filename in sorted(os.listdir(directory)):
+            if not filename.startswith('.') and filename.endswith('.json'):
+                _read_into(merged, os.path.join(directory, filename))
+    return merged
+
+
+# Exposition
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render(source=None):
+    source = collect() if source is None else source
+    with source._lock:
+        counters = dict(source.counters)
+        histograms = {key: list(state) for key, state in source.histograms.items()}
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == COUNTER:
+            for (metric, values), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(label_names, values)} {_number(value)}')
+            continue
+        for (metric, values), state in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + (float('inf'),), state):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                lines.append(f'{name}_bucket{_labels(label_names, values, [("le", le)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(label_names, values)} {_number(state[-1])}')
+            lines.append(f'{name}_count{_labels(label_names, values)} {cumulative}')
+    lines.append(f'# HELP {CACHE_HIT_RATIO} Share of cache lookups that hit, by key family.')
+    lines.append(f'# TYPE {CACHE_HIT_RATIO} gauge')
+    families = {}
+    for (metric, values), value in counters.items():
+        if metric == 'pi6_cache_requests_total':
+            family, result = values
+            families.setdefault(family, [0, 0])[result == 'miss'] += value
+    for family, (hits, misses) in sorted(families.items()):
+        if hits + misses:
+            lines.append(f'{CACHE_HIT_RATIO}{_labels(("family",), (family,))} {_number(hits / (hits + misses))}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,119 @@
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from . import metrics, page_cache, request_timing
+
+
+class RequestTimingMiddleware:
+    """
+    Server-Timing header and structured log line for a sample of requests
+    (REQUEST_TIMING_SAMPLE_RATE), plus a log line for any slow request.
+    See main.request_timing.
+
+    With METRICS_ENABLED every request is collected, so main.metrics can
+    count it; only sampled ones get the header and full log line.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        sampled = request_timing.sampled()
+        if not sampled and not metrics.enabled():
+            started = time.perf_counter()
+            response = self.get_response(request)
+            request_timing.finish_unsampled(request, response, time.perf_counter() - started)
+            return response
+        with request_timing.collect() as timings:
+            response = self.get_response(request)
+        self.finish(request, response, timings, sampled)
+        return response
+
+    async def __acall__(self, request):
+        sampled = request_timing.sampled()
+        if not sampled and not metrics.enabled():
+            started = time.perf_counter()
+            response = await self.get_response(request)
+            request_timing.finish_unsampled(request, response, time.perf_counter() - started)
+            return response
+        with request_timing.collect() as timings:
+            response = await self.get_response(request)
+        self.finish(request, response, timings, sampled)
+        return response
+
+    def finish(self, request, response, timings, sampled):
+        if metrics.enabled():
+            metrics.record_request(request, response, timings)
+        if sampled:
+            request_timing.finish(request, response, timings)
+        else:
+            request_timing.finish_unsampled(request, response, timings.elapsed())
+
+
+class StaticSiteMiddleware:
+    """
+    Serves the pages written by render_static (main.static_site) from
+    STATIC_SITE_ROOT when STATIC_SITE_SERVE is on.
+
+    Only anonymous GET/HEAD requests without a query string are answered
+    from disk; the rendered files stand for the bare path, so "?page=",
+    "?cursor=", "?brand=" and friends reach the views. Files are looked up
+    per request, so a new render_static run shows up without a restart.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        # A stat and a read of one small local file; not worth a thread hop
+        return self.serve(request) or await self.get_response(request)
+
+    def serve(self, request):
+        if not settings.STATIC_SITE_SERVE or request.META.get('QUERY_STRING'):
+            return None
+        if not request.path_info.endswith('/') or not page_cache.is_cacheable_request(request):
+            return None
+        try:
+            filename = safe_join(settings.STATIC_SITE_ROOT, request.path_info.lstrip('/'), 'index.html')
+            stat = os.stat(filename)
+        except (OSError, SuspiciousFileOperation):
+            return None
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+        if response is None:
+            try:
+                with open(filename, 'rb') as f:
+                    content = f.read()
+            except OSError:
+                return None
+            response = HttpResponse(content, content_type='text/html; charset=utf-8')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['X-Static-Site'] = 'hit'
+        patch_vary_headers(response, ['Cookie'])
+        return response
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:12
+
+from django.db import migrations, models
+
+
+def build_paths(apps, schema_editor):
+    BlogCategory = apps.get_model('main', 'BlogCategory')
+    children = {}
+    for pk, parent_id in BlogCategory.objects.values_list('id', 'parent_id'):
+        children.setdefault(parent_id, []).append(pk)
+    updates = []
+    stack = [(pk, '', 0) for pk in children.get(None, [])]
+    while stack:
+        pk, prefix, depth = stack.pop()
+        path = f'{prefix}{pk}/'
+        updates.append(BlogCategory(pk=pk, path=path, depth=depth))
+        stack.extend((child, path, depth + 1) for child in children.get(pk, []))
+    BlogCategory.objects.bulk_update(updates, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0029_alter_bloggalleryimage_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogcategory',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogcategory',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
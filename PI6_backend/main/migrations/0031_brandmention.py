@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_mentions(apps, schema_editor):
+    BlogPost = apps.get_model('main', 'BlogPost')
+    InsurerBrand = apps.get_model('main', 'InsurerBrand')
+    BrandMention = apps.get_model('main', 'BrandMention')
+    brands = [(pk, name.lower()) for pk, name in InsurerBrand.objects.values_list('id', 'name') if name]
+    mentions = []
+    for post in BlogPost.objects.only('id', 'title', 'content').iterator(chunk_size=500):
+        text = f'{post.title or ""}\n{post.content or ""}'.lower()
+        mentions.extend(BrandMention(post_id=post.pk, brand_id=pk) for pk, name in brands if name in text)
+    BrandMention.objects.bulk_create(mentions, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0030_blogcategory_path_depth'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BrandMention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('brand', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='main.insurerbrand')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='brand_mentions', to='main.blogpost')),
+            ],
+            options={
+                'verbose_name': 'Brand Mention',
+                'verbose_name_plural': 'Brand Mentions',
+                'constraints': [models.UniqueConstraint(fields=('brand', 'post'), name='unique_brand_mention')],
+            },
+        ),
+        migrations.RunPython(backfill_mentions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:20
+
+import html
+
+import django.contrib.postgres.search
+from django.db import migrations, OperationalError
+from django.utils.html import strip_tags
+
+FTS_TABLE = 'main_blogpost_fts'
+
+
+def plain_text(value):
+    # Frozen copy of main.search.plain_text as of this migration
+    return ' '.join(html.unescape(strip_tags(value or '')).split())
+
+
+def backfill_fts(BlogPost, connection, chunk_size=500):
+    rows = (
+        BlogPost.objects.using(connection.alias).order_by('id')
+        .values_list('id', 'title', 'excerpt', 'content').iterator(chunk_size=chunk_size)
+    )
+    insert = f"INSERT INTO {FTS_TABLE} (rowid, title, excerpt, body) VALUES (%s, %s, %s, %s)"
+    batch = []
+    with connection.cursor() as cursor:
+        for pk, title, excerpt, content in rows:
+            batch.append((pk, title or '', excerpt or '', plain_text(content)))
+            if len(batch) >= chunk_size:
+                cursor.executemany(insert, batch)
+                batch = []
+        if batch:
+            cursor.executemany(insert, batch)
+
+
+def create_search_index(apps, schema_editor):
+    BlogPost = apps.get_model('main', 'BlogPost')
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS main_blogpost_search_vector_gin "
+            "ON main_blogpost USING GIN (search_vector)"
+        )
+        # Backfilled by 0037 with the same cleaned text as every later write
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                    f"USING fts5(title, excerpt, body, tokenize='porter unicode61')"
+                )
+            except OperationalError:
+                # SQLite built without FTS5: main.search falls back to icontains
+                return
+        backfill_fts(BlogPost, schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS main_blogpost_search_vector_gin")
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0031_brandmention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
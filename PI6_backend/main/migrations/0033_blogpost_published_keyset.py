@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0032_blogpost_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['is_published', '-published_at', '-id'], name='blogpost_published_keyset'),
+        ),
+    ]
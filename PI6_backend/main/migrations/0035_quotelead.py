@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0034_relatedpost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuoteLead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product', models.CharField(max_length=30)),
+                ('first_name', models.CharField(blank=True, max_length=100)),
+                ('last_name', models.CharField(blank=True, max_length=100)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('phone', models.CharField(blank=True, max_length=30)),
+                ('address', models.CharField(blank=True, max_length=255)),
+                ('answers', models.JSONField(blank=True, default=dict, help_text="Every step's answers, including product-specific ones")),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Quote Lead',
+                'verbose_name_plural': 'Quote Leads',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0035_quotelead'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quoteoffer',
+            name='base_premium',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Monthly premium before factors; offers with one are ranked by estimated premium', max_digits=8, null=True),
+        ),
+        migrations.AlterField(
+            model_name='quoteoffer',
+            name='premium',
+            field=models.CharField(blank=True, help_text='Shown as-is when no base premium is set, e.g. "From $89/mo"', max_length=50),
+        ),
+        migrations.CreateModel(
+            name='QuoteOfferFactor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Product'), ('zip', 'ZIP code or prefix'), ('tier', 'Coverage tier')], max_length=10)),
+                ('key', models.CharField(help_text='Product (home, auto, ...), ZIP code or prefix (e.g. 770), or tier (basic, standard, premium)', max_length=30)),
+                ('multiplier', models.DecimalField(decimal_places=3, default=1, max_digits=6)),
+                ('offer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='factors', to='main.quoteoffer')),
+            ],
+            options={
+                'verbose_name': 'Quote Offer Factor',
+                'verbose_name_plural': 'Quote Offer Factors',
+                'constraints': [models.UniqueConstraint(fields=('offer', 'kind', 'key'), name='unique_quote_offer_factor')],
+            },
+        ),
+    ]
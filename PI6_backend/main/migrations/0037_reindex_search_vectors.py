@@ -0,0 +1,59 @@
+import html
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+SEARCH_CONFIG = 'english'
+CHUNK_SIZE = 500
+
+# Same statement as main.search at the time of this migration
+UPDATE = (
+    "UPDATE main_blogpost AS p SET search_vector = "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', v.title), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', v.excerpt), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', v.body), 'C') "
+    "FROM (VALUES {values}) AS v(id, title, excerpt, body) WHERE p.id = v.id"
+)
+
+
+def plain_text(value):
+    # Frozen copy of main.search.plain_text as of this migration
+    return ' '.join(html.unescape(strip_tags(value or '')).split())
+
+
+def update_vectors(cursor, batch):
+    values = ', '.join(['(%s::bigint, %s::text, %s::text, %s::text)'] * len(batch))
+    cursor.execute(UPDATE.format(values=values), [value for row in batch for value in row])
+
+
+def reindex_search_vectors(apps, schema_editor):
+    # 0032 used to backfill Postgres with regexp_replace, which left HTML
+    # entities in place; re-index with the cleaned text that saves store
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    BlogPost = apps.get_model('main', 'BlogPost')
+    rows = (
+        BlogPost.objects.using(connection.alias).order_by('id')
+        .values_list('id', 'title', 'excerpt', 'content').iterator(chunk_size=CHUNK_SIZE)
+    )
+    batch = []
+    with connection.cursor() as cursor:
+        for pk, title, excerpt, content in rows:
+            batch.append((pk, title or '', excerpt or '', plain_text(content)))
+            if len(batch) >= CHUNK_SIZE:
+                update_vectors(cursor, batch)
+                batch = []
+        if batch:
+            update_vectors(cursor, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0036_quote_offer_pricing'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0037_reindex_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quotelead',
+            name='run_id',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
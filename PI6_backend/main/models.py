@@ -1,22 +1,108 @@
-from django.db import models
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, F, IntegerField, Prefetch, Q, Value, When, Window
+from django.db.models.functions import Concat, RowNumber, Substr
 from django.utils.text import slugify
 from ckeditor.fields import RichTextField
 from cloudinary.models import CloudinaryField
+from django.contrib.postgres.search import SearchVectorField
+
+from . import content_cache
+
+SLUG_SUFFIX_RE = re.compile(r'^(?P<base>.+)-(?P<num>\d+)$')
+# Room kept at the end of a slug field for a "-N" suffix
+SLUG_SUFFIX_ROOM = 6
+# Bases looked up per query in allocate_slugs (keeps the OR clause small)
+SLUG_QUERY_CHUNK = 200
+
+
+def _slug_base(source_value, max_length):
+    return slugify(source_value)[:max_length - SLUG_SUFFIX_ROOM].rstrip('-')
+
+
+def allocate_slugs(model, source_values, slug_field_name='slug', exclude_pk=None):
+    """
+    Returns a unique slug for each of `source_values`, unique against the
+    table and against each other, so a batch of new rows can be bulk
+    inserted. Existing `slug` / `slug-N` values are fetched in one query
+    (per SLUG_QUERY_CHUNK distinct bases) and the lowest free suffix is used.
+    """
+    max_length = model._meta.get_field(slug_field_name).max_length
+    bases = [_slug_base(value, max_length) for value in source_values]
+    taken = {base: set() for base in bases}
+    distinct = list(taken)
+    for i in range(0, len(distinct), SLUG_QUERY_CHUNK):
+        condition = models.Q()
+        for base in distinct[i:i + SLUG_QUERY_CHUNK]:
+            # Only `base` and `base-N`: a prefix match would also fetch every
+            # longer slug that starts with the base (e.g. "home-insurance-tips")
+            condition |= models.Q(**{f'{slug_field_name}__regex': rf'^{re.escape(base)}(-[0-9]+)?$'})
+        existing = model._default_manager.filter(condition)
+        if exclude_pk is not None:
+            existing = existing.exclude(pk=exclude_pk)
+        for slug in existing.values_list(slug_field_name, flat=True):
+            if slug in taken:
+                taken[slug].add(slug)
+            match = SLUG_SUFFIX_RE.match(slug)
+            if match and match.group('base') in taken:
+                taken[match.group('base')].add(slug)
+
+    next_suffix = {}
+    slugs = []
+    for base in bases:
+        used = taken[base]
+        slug = base
+        num = next_suffix.get(base, 1)
+        while slug in used:
+            slug = f'{base}-{num}'
+            num += 1
+        next_suffix[base] = num
+        used.add(slug)
+        slugs.append(slug)
+    return slugs
+
 
 def generate_unique_slug(instance, source_value, slug_field_name='slug'):
     """
     Generates a unique slug for a model instance.
     """
-    slug = slugify(source_value)
-    unique_slug = slug
-    ModelClass = instance.__class__
-    num = 1
-    
-    while ModelClass.objects.filter(**{slug_field_name: unique_slug}).exclude(pk=instance.pk).exists():
-        unique_slug = f'{slug}-{num}'
-        num += 1
-        
-    return unique_slug
+    return allocate_slugs(instance.__class__, [source_value], slug_field_name, exclude_pk=instance.pk)[0]
+
+
+class UniqueSlugMixin:
+    """
+    Keeps `slug` unique on save. The uniqueness check is skipped when the
+    slug is unchanged since the row was loaded, and a save that loses a race
+    on the unique constraint re-allocates the slug and retries.
+    """
+    SLUG_SAVE_ATTEMPTS = 3
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_slug = instance.__dict__.get('slug')
+        return instance
+
+    def _save_with_unique_slug(self, source_value, *args, **kwargs):
+        # Always ensure a slug is generated from the source if missing,
+        # or from the existing slug if present (to handle edits safely)
+        source_value = self.slug or source_value
+        unchanged = self.pk and self.slug and self.slug == getattr(self, '_loaded_slug', None)
+        if not unchanged:
+            self.slug = generate_unique_slug(self, source_value)
+        for attempt in range(self.SLUG_SAVE_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                break
+            except IntegrityError:
+                clash = type(self)._default_manager.filter(slug=self.slug).exclude(pk=self.pk).exists()
+                if not clash or attempt == self.SLUG_SAVE_ATTEMPTS - 1:
+                    raise
+                self.slug = generate_unique_slug(self, source_value)
+        self._loaded_slug = self.slug
 
 class SiteConfiguration(models.Model):
     site_name = models.CharField(max_length=255, default="Texas Insurance Ratings")
@@ -45,7 +131,7 @@ class SiteConfiguration(models.Model):
         verbose_name = "Site Configuration"
         verbose_name_plural = "Site Configuration"
 
-class Page(models.Model):
+class Page(UniqueSlugMixin, models.Model):
     class Meta:
         verbose_name = "Company & Legal Page"
         verbose_name_plural = "Company & Legal Pages"
@@ -77,14 +163,7 @@ class Page(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        # Always ensure a slug is generated from the title if missing,
-        # or from the existing slug if present (to handle edits safely)
-        if not self.slug:
-            self.slug = generate_unique_slug(self, self.title)
-        else:
-            # Re-verify uniqueness even if slug exists (e.g. manual edit conflict)
-            self.slug = generate_unique_slug(self, self.slug)
-        super().save(*args, **kwargs)
+        self._save_with_unique_slug(self.title, *args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -105,8 +184,31 @@ class ContactMessage(models.Model):
     def __str__(self):
         return f"{self.subject} - {self.name}"
 
+class QuoteLead(models.Model):
+    """
+    A completed quote wizard (main.wizard), saved once on its last step.
+    """
+    product = models.CharField(max_length=30)
+    first_name = models.CharField(max_length=100, blank=True)
+    last_name = models.CharField(max_length=100, blank=True)
+    email = models.EmailField(blank=True)
+    phone = models.CharField(max_length=30, blank=True)
+    address = models.CharField(max_length=255, blank=True)
+    answers = models.JSONField(default=dict, blank=True, help_text="Every step's answers, including product-specific ones")
+    # The wizard run that saved it, so a resubmitted last step updates it
+    run_id = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Quote Lead"
+        verbose_name_plural = "Quote Leads"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.product} - {self.first_name} {self.last_name}".strip()
+
 # Blog Models
-class BlogCategory(models.Model):
+class BlogCategory(UniqueSlugMixin, models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='subcategories', help_text="Select a parent category if this is a sub-category")
@@ -127,47 +229,191 @@ class BlogCategory(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Materialized hierarchy, e.g. "1/7/12/" for a category two levels deep.
+    # Kept in sync by save() so tree lookups are a single indexed query.
+    path = models.CharField(max_length=255, db_index=True, blank=True, editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         verbose_name = "Blog Category"
         verbose_name_plural = "Blog Categories"
 
+    def clean(self):
+        super().clean()
+        if self._parent_creates_cycle(self._stored_path()[0]):
+            raise ValidationError({'parent': "A category cannot be moved under itself or one of its sub-categories."})
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = generate_unique_slug(self, self.name)
+        with transaction.atomic():
+            # The in-memory path is stale if an ancestor moved since this
+            # instance was loaded; start from the stored one, locked until commit
+            self.path, self.depth = self._stored_path(lock=True)
+            if self._parent_creates_cycle(self.path):
+                raise ValidationError("A category cannot be moved under itself or one of its sub-categories.")
+            self._save_with_unique_slug(self.name, *args, **kwargs)
+            self._sync_path()
+
+    def _stored_path(self, lock=False):
+        """
+        The (path, depth) saved for this row, or ('', 0) if it isn't saved yet.
+        """
+        if not self.pk:
+            return '', 0
+        rows = BlogCategory.objects.filter(pk=self.pk)
+        if lock:
+            rows = rows.select_for_update()
+        return rows.values_list('path', 'depth').first() or ('', 0)
+
+    def _parent_path(self, lock=False):
+        if not self.parent_id:
+            return '', -1
+        rows = BlogCategory.objects.filter(pk=self.parent_id)
+        if lock:
+            rows = rows.select_for_update()
+        return rows.values_list('path', 'depth').get()
+
+    def _parent_creates_cycle(self, path):
+        if not (path and self.parent_id):
+            return False
+        return self._parent_path()[0].startswith(path)
+
+    def _sync_path(self):
+        """
+        Recompute this category's path/depth from its parent and, if it moved,
+        rewrite the path prefix of the whole subtree in one UPDATE.
+        """
+        parent_path, parent_depth = self._parent_path(lock=True)
+        new_path, new_depth = f'{parent_path}{self.pk}/', parent_depth + 1
+        old_path, old_depth = self.path, self.depth
+        if new_path == old_path and new_depth == old_depth:
+            return
+        if old_path:
+            BlogCategory.objects.filter(path__startswith=old_path).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + (new_depth - old_depth),
+            )
         else:
-            self.slug = generate_unique_slug(self, self.slug)
-        super().save(*args, **kwargs)
+            BlogCategory.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+        self.path, self.depth = new_path, new_depth
+        self.__dict__.pop('_ancestors_cache', None)
+
+    @classmethod
+    def rebuild_tree(cls):
+        """
+        Recomputes path/depth for every category from `parent`, e.g. after
+        bulk_create/bulk_update, which bypass save().
+        """
+        children = {}
+        for pk, parent_id in cls.objects.values_list('id', 'parent_id'):
+            children.setdefault(parent_id, []).append(pk)
+        updates = []
+        stack = [(pk, '', 0) for pk in children.get(None, [])]
+        while stack:
+            pk, prefix, depth = stack.pop()
+            path = f'{prefix}{pk}/'
+            updates.append(cls(pk=pk, path=path, depth=depth))
+            stack.extend((child, path, depth + 1) for child in children.get(pk, []))
+        cls.objects.bulk_update(updates, ['path', 'depth'], batch_size=500)
+        return len(updates)
 
     def __str__(self):
-        full_path = [self.name]
-        k = self.parent
-        while k is not None:
-            full_path.append(k.name)
-            k = k.parent
-        return ' -> '.join(full_path[::-1])
+        # Labelled from `path` and the cached name map, so listing categories
+        # (admin changelists, filters, select widgets) costs no query per row
+        ids = self.get_ancestor_ids()
+        names = self.names() if ids else {}
+        if any(pk not in names for pk in ids):
+            names = {c.pk: c.name for c in self.get_ancestors()}
+        return ' -> '.join([names[pk] for pk in ids if pk in names] + [self.name])
+
+    @classmethod
+    def names(cls):
+        """
+        Returns {id: name} for every category, cached until a category changes.
+        """
+        return content_cache.get_or_set(
+            content_cache.CATEGORIES, 'names', lambda: dict(cls.objects.values_list('id', 'name')),
+        )
+
+    def get_ancestor_ids(self):
+        return [int(pk) for pk in self.path.split('/')[:-2] if pk]
+
+    def get_ancestors(self):
+        """
+        Returns the ancestors of this category, root first, in one query.
+        """
+        if not hasattr(self, '_ancestors_cache'):
+            ids = self.get_ancestor_ids()
+            if ids:
+                by_id = BlogCategory.objects.only('id', 'name').in_bulk(ids)
+                self._ancestors_cache = [by_id[pk] for pk in ids if pk in by_id]
+            else:
+                self._ancestors_cache = []
+        return self._ancestors_cache
 
     def get_descendants(self):
         """
-        Recursively get all descendant categories.
+        Returns all descendant categories (any depth) in one query.
         """
-        descendants = []
-        children = self.subcategories.all()
-        for child in children:
-            descendants.append(child)
-            descendants.extend(child.get_descendants())
-        return descendants
+        return BlogCategory.objects.filter(path__startswith=self.path, depth__gt=self.depth).order_by('path')
 
     def get_family_posts(self):
         """
         Returns the latest 5 published posts from this category AND its subcategories (recursive).
         """
-        categories = [self] + self.get_descendants()
         return BlogPost.objects.filter(
-            category__in=categories,
+            category__path__startswith=self.path,
             is_published=True
-        ).order_by('-published_at')[:5]
+        ).select_related('category').order_by('-published_at')[:5]
 
-class BlogPost(models.Model):
+    @classmethod
+    def sidebar_categories(cls):
+        """
+        Top-level categories with their subcategories prefetched, each
+        annotated with `post_count`, for the blog sidebar (two queries).
+        """
+        subcategories = cls.objects.annotate(post_count=Count('posts'))
+        return cls.objects.filter(parent__isnull=True).annotate(
+            post_count=Count('posts'),
+        ).prefetch_related(Prefetch('subcategories', queryset=subcategories))
+
+    @classmethod
+    def get_family_posts_for(cls, categories, limit=5):
+        """
+        Batch version of get_family_posts(): returns {category_id: [posts]}.
+        Posts are ranked per family with ROW_NUMBER() OVER (PARTITION BY
+        family), so this is one query for any number of disjoint families
+        (e.g. the navbar's top-level categories), plus one per extra level
+        when a requested category sits inside another requested one.
+        """
+        result = {c.pk: [] for c in categories}
+        groups = []
+        for category in sorted((c for c in categories if c.path), key=lambda c: c.path):
+            # A post can only land in one partition, so nested families go to separate queries
+            for group in groups:
+                if not any(category.path.startswith(other.path) for other in group):
+                    group.append(category)
+                    break
+            else:
+                groups.append([category])
+
+        for group in groups:
+            family = Case(
+                *[When(category__path__startswith=c.path, then=Value(c.pk)) for c in group],
+                output_field=IntegerField(),
+            )
+            in_group = Q()
+            for c in group:
+                in_group |= Q(category__path__startswith=c.path)
+            posts = BlogPost.objects.filter(in_group, is_published=True).annotate(
+                family=family,
+            ).annotate(
+                family_rank=Window(RowNumber(), partition_by=[F('family')], order_by=[F('published_at').desc(), F('id').desc()]),
+            ).filter(family_rank__lte=limit).select_related('category').order_by('family', 'family_rank')
+            for post in posts:
+                result[post.family].append(post)
+        return result
+
+class BlogPost(UniqueSlugMixin, models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, blank=True)
     category = models.ForeignKey(BlogCategory, on_delete=models.SET_NULL, null=True, related_name='posts')
@@ -192,20 +438,20 @@ class BlogPost(models.Model):
     published_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Full-text search (PostgreSQL only, maintained by main.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         verbose_name = "Blog Post"
         verbose_name_plural = "Blog Posts"
         ordering = ['-published_at']
+        indexes = [
+            # Keyset pagination seeks (main.pagination)
+            models.Index(fields=['is_published', '-published_at', '-id'], name='blogpost_published_keyset'),
+        ]
 
     def save(self, *args, **kwargs):
-        # Always ensure a slug is generated from the title if missing,
-        # or from the existing slug if present (to handle edits safely)
-        if not self.slug:
-            self.slug = generate_unique_slug(self, self.title)
-        else:
-            # Re-verify uniqueness even if slug exists (e.g. manual edit conflict)
-            self.slug = generate_unique_slug(self, self.slug)
-        super().save(*args, **kwargs)
+        self._save_with_unique_slug(self.title, *args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -245,10 +491,50 @@ class InsurerBrand(models.Model):
     def __str__(self):
         return self.name
 
+class RelatedPost(models.Model):
+    """
+    Precomputed "related articles" for blog_detail, ranked by a blend of
+    TF-IDF content similarity and category affinity (see main.related).
+    """
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='related_entries')
+    related_post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name = "Related Post"
+        verbose_name_plural = "Related Posts"
+        ordering = ['post', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'rank'], name='unique_related_post_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} -> {self.related_post_id} (#{self.rank})"
+
+class BrandMention(models.Model):
+    """
+    Precomputed "post mentions brand" link, maintained by main.brand_index.
+    Lets brand pages use an indexed join instead of icontains over content.
+    """
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='brand_mentions')
+    brand = models.ForeignKey(InsurerBrand, on_delete=models.CASCADE, related_name='mentions')
+
+    class Meta:
+        verbose_name = "Brand Mention"
+        verbose_name_plural = "Brand Mentions"
+        constraints = [
+            models.UniqueConstraint(fields=['brand', 'post'], name='unique_brand_mention'),
+        ]
+
+    def __str__(self):
+        return f"{self.brand.name} in {self.post.title}"
+
 class QuoteOffer(models.Model):
     brands = models.ManyToManyField(InsurerBrand, blank=True, related_name='offers')
     title = models.CharField(max_length=200)
-    premium = models.CharField(max_length=50)
+    premium = models.CharField(max_length=50, blank=True, help_text="Shown as-is when no base premium is set, e.g. \"From $89/mo\"")
+    base_premium = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, help_text="Monthly premium before factors; offers with one are ranked by estimated premium")
     phone = models.CharField(max_length=50, blank=True)
     cta_text = models.CharField(max_length=100, default='Call Now')
     cta_url = models.URLField(blank=True)
@@ -266,3 +552,37 @@ class QuoteOffer(models.Model):
     
     def __str__(self):
         return self.title
+
+class QuoteOfferFactor(models.Model):
+    """
+    A premium multiplier for one product, ZIP prefix or coverage tier
+    (see main.quote_pricing).
+    """
+    PRODUCT = 'product'
+    ZIP = 'zip'
+    TIER = 'tier'
+    KIND_CHOICES = [
+        (PRODUCT, 'Product'),
+        (ZIP, 'ZIP code or prefix'),
+        (TIER, 'Coverage tier'),
+    ]
+    TIER_CHOICES = [
+        ('basic', 'Basic'),
+        ('standard', 'Standard'),
+        ('premium', 'Premium'),
+    ]
+
+    offer = models.ForeignKey(QuoteOffer, on_delete=models.CASCADE, related_name='factors')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=30, help_text="Product (home, auto, ...), ZIP code or prefix (e.g. 770), or tier (basic, standard, premium)")
+    multiplier = models.DecimalField(max_digits=6, decimal_places=3, default=1)
+
+    class Meta:
+        verbose_name = "Quote Offer Factor"
+        verbose_name_plural = "Quote Offer Factors"
+        constraints = [
+            models.UniqueConstraint(fields=['offer', 'kind', 'key'], name='unique_quote_offer_factor'),
+        ]
+
+    def __str__(self):
+        return f"{self.offer.title}: {self.kind} {self.key} x{self.multiplier}"
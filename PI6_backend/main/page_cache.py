@@ -0,0 +1,107 @@
+"""
+Full-page cache for anonymous GET/HEAD requests.
+
+Rendered pages are stored under the PAGES content-cache generation, which
+every content model's save bumps (main.signals), so a cached page is never
+served after its source rows change. Responses carry a strong ETag and a
+Last-Modified derived from that generation and, for detail views, the
+row's own updated_at; conditional GETs get a 304 without rendering.
+
+Only requests for one of the site's own host names are cached (see
+cache_hosts()). ALLOWED_HOSTS defaults to '*', so any other Host header
+still gets an uncached render rather than a cache entry of its own.
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, urlencode
+
+from . import content_cache
+
+MESSAGES_COOKIE_NAME = 'messages'
+
+
+def is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    cookies = request.COOKIES
+    if settings.SESSION_COOKIE_NAME in cookies or settings.CSRF_COOKIE_NAME in cookies:
+        return False
+    if MESSAGES_COOKIE_NAME in cookies:
+        return False
+    return True
+
+
+def cache_hosts():
+    """
+    The exact host names in ALLOWED_HOSTS (not '*' or '.domain' patterns),
+    or the STATIC_SITE_BASE_URL host when there are none.
+    """
+    hosts = {host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')}
+    return hosts or {urlsplit(settings.STATIC_SITE_BASE_URL).netloc}
+
+
+def page_key(request):
+    # Host and scheme are part of the key: templates build absolute URLs
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    raw = f'{request.scheme}://{request.get_host()}{request.path}?{query}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def cache_anonymous_page(last_modified=None):
+    """
+    View decorator. `last_modified(request, *args, **kwargs)` may return the
+    updated_at of the row a detail view renders (or None when not found).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable_request(request) or request.get_host() not in cache_hosts():
+                return view(request, *args, **kwargs)
+
+            gen = content_cache.generation(content_cache.PAGES)
+            modified = content_cache.changed_at(gen)
+            row_modified = last_modified(request, *args, **kwargs) if last_modified else None
+            if last_modified and row_modified is None:
+                # Missing/unpublished row: let the view produce its 404
+                return view(request, *args, **kwargs)
+            if row_modified is not None:
+                modified = max(modified, row_modified)
+            name = page_key(request)
+            etag = '"%s"' % hashlib.sha1(f'{name}:{gen}:{modified.timestamp()}'.encode()).hexdigest()
+
+            validators = HttpResponse()
+            validators['ETag'] = etag
+            validators['Last-Modified'] = http_date(modified.timestamp())
+            patch_vary_headers(validators, ['Cookie'])
+            conditional = get_conditional_response(
+                request, etag=etag, last_modified=int(modified.timestamp()), response=validators
+            )
+            if conditional is not validators:
+                return conditional
+
+            entry = f'{name}:{modified.timestamp()}'
+            cached = content_cache.get(content_cache.PAGES, entry, gen=gen)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Page-Cache'] = 'hit'
+            else:
+                response = view(request, *args, **kwargs)
+                if hasattr(response, 'render') and callable(response.render):
+                    response = response.render()
+                if response.status_code != 200 or response.streaming or response.cookies:
+                    return response
+                content_cache.set(content_cache.PAGES, entry, (response.content, response['Content-Type']), gen=gen)
+                response['X-Page-Cache'] = 'miss'
+
+            response['ETag'] = etag
+            response['Last-Modified'] = validators['Last-Modified']
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,165 @@
+"""
+Keyset (cursor) pagination over (published_at, id), newest first.
+
+Pages after the first are addressed by a signed `?cursor=` token, so a page
+costs one indexed range scan no matter how deep it is, with no COUNT(*) and
+no OFFSET. `?page=N` keeps working for old links through an OFFSET fallback
+capped at MAX_OFFSET_PAGE. The total shown as "Page X of Y" comes from a
+cached count that is refreshed when posts change. Cursors are signed because
+they carry the page number that is displayed, without a timestamp so that a
+page always links to the same URLs (and cached renders of it stay identical).
+"""
+import hashlib
+import math
+from datetime import datetime
+
+from django.core import signing
+from django.db.models import Q
+from django.http import Http404
+
+from . import content_cache
+
+MAX_OFFSET_PAGE = 200
+COUNT_TIMEOUT = 10 * 60
+CURSOR_SALT = 'main.pagination'
+
+
+def encode_cursor(direction, number, published_at, pk):
+    return signing.Signer(salt=CURSOR_SALT).sign_object([direction, number, published_at.isoformat(), pk])
+
+
+def decode_cursor(token):
+    """
+    Returns (direction, number, published_at, pk), or None for a bad or
+    tampered token.
+    """
+    try:
+        direction, number, published_at, pk = signing.Signer(salt=CURSOR_SALT).unsign_object(token)
+        if direction not in ('n', 'p'):
+            return None
+        return direction, max(int(number), 1), datetime.fromisoformat(published_at), int(pk)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+
+
+class KeysetPage:
+    def __init__(self, paginator, object_list, number, has_next, has_previous):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.number = number
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    @property
+    def next_cursor(self):
+        if not (self._has_next and self.object_list):
+            return ''
+        last = self.object_list[-1]
+        return encode_cursor('n', self.number + 1, last.published_at, last.pk)
+
+    @property
+    def previous_cursor(self):
+        if not (self._has_previous and self.object_list):
+            return ''
+        first = self.object_list[0]
+        return encode_cursor('p', self.number - 1, first.published_at, first.pk)
+
+
+class KeysetPaginator:
+    """
+    Paginates a BlogPost queryset newest-first on (published_at, id).
+    Exposes `count` / `num_pages` like Django's Paginator, but they come
+    from a cached (possibly slightly stale) count.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset.order_by('-published_at', '-id')
+        self.per_page = per_page
+
+    def _count_name(self):
+        return 'count:' + hashlib.sha1(str(self.queryset.query).encode()).hexdigest()
+
+    @property
+    def count(self):
+        if not hasattr(self, '_count'):
+            self._count = content_cache.get_or_set(
+                content_cache.PAGES, self._count_name(), self.queryset.count, COUNT_TIMEOUT
+            )
+        return self._count
+
+    @property
+    def num_pages(self):
+        return max(1, math.ceil(self.count / self.per_page))
+
+    def _parse(self, request):
+        token = request.GET.get('cursor')
+        cursor = decode_cursor(token) if token else None
+        if cursor:
+            return cursor
+        try:
+            number = int(request.GET.get('page') or 1)
+        except ValueError:
+            number = 1
+        number = max(number, 1)
+        if number > MAX_OFFSET_PAGE:
+            raise Http404("Page number too deep; follow the pagination links instead.")
+        return number
+
+    def _query(self, direction, number, published_at=None, pk=None):
+        """
+        Returns the queryset fetching one page (plus a lookahead row).
+        """
+        if direction == 'n':
+            return self.queryset.filter(
+                Q(published_at__lt=published_at) | Q(published_at=published_at, id__lt=pk)
+            )[:self.per_page + 1]
+        if direction == 'p':
+            return self.queryset.filter(
+                Q(published_at__gt=published_at) | Q(published_at=published_at, id__gt=pk)
+            ).order_by('published_at', 'id')[:self.per_page + 1]
+        start = (number - 1) * self.per_page
+        return self.queryset[start:start + self.per_page + 1]
+
+    def _page(self, direction, number, rows):
+        if direction == 'n':
+            return KeysetPage(self, rows[:self.per_page], number, len(rows) > self.per_page, True)
+        if direction == 'p':
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return KeysetPage(self, rows, number if has_previous else 1, True, has_previous)
+        return KeysetPage(self, rows[:self.per_page], number, len(rows) > self.per_page, number > 1)
+
+    def get_page(self, request):
+        """
+        Resolves `?cursor=` (preferred) or `?page=N` from the request.
+        """
+        cursor = self._parse(request)
+        if isinstance(cursor, int):
+            # Old links past the end fall back to the last page, like Paginator.get_page
+            number = min(cursor, self.num_pages) if cursor > 1 else 1
+            cursor = ('o', number, None, None)
+        return self._page(cursor[0], cursor[1], list(self._query(*cursor)))
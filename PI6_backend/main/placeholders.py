@@ -0,0 +1,94 @@
+"""
+Deterministic placeholder images for posts and brands without a picture.
+
+A value (post id, slug, ...) hashes to one of VARIANTS locks, exactly like
+the old loremflickr "?lock=" URLs, and each (theme, lock) pair renders to a
+fixed SVG gradient. Files are generated on first request, kept on disk and
+served with immutable cache headers; bump VERSION whenever the artwork
+changes so browsers fetch the new URLs.
+"""
+import hashlib
+import os
+from pathlib import Path
+
+from django.conf import settings
+
+VERSION = 1
+VARIANTS = 1000
+WIDTH, HEIGHT = 800, 600
+
+# (background stops, accent colours) per theme
+THEMES = {
+    'business': (['#0b3b66', '#1d5f9e', '#3b82c4', '#4b5563', '#1f2937'], ['#ffcc00', '#ffffff', '#93c5fd']),
+    'auto': (['#111827', '#374151', '#4b5563', '#1f2937', '#0f172a'], ['#ffcc00', '#e5e7eb', '#9ca3af']),
+}
+
+
+def lock_for(value):
+    """
+    Maps any value to a lock id in 1..VARIANTS (same scheme the loremflickr URLs used).
+    """
+    if not value:
+        return 1
+    return int(hashlib.md5(str(value).encode()).hexdigest(), 16) % VARIANTS + 1
+
+
+def render_svg(theme, lock):
+    backgrounds, accents = THEMES[theme]
+    seed = hashlib.sha256(f'{theme}:{lock}'.encode()).digest()
+    start = backgrounds[seed[0] % len(backgrounds)]
+    end = backgrounds[(seed[0] + 1 + seed[1] % (len(backgrounds) - 1)) % len(backgrounds)]
+    angle = seed[2] % 360
+
+    shapes = []
+    for i in range(3):
+        b = seed[4 + i * 4:8 + i * 4]
+        cx, cy = b[0] * WIDTH // 255, b[1] * HEIGHT // 255
+        r = 80 + b[2] % 220
+        colour = accents[b[3] % len(accents)]
+        opacity = 0.08 + (b[3] % 10) / 50
+        shapes.append(f'<circle cx="{cx}" cy="{cy}" r="{r}" fill="{colour}" fill-opacity="{opacity:.2f}"/>')
+    band_y = HEIGHT // 2 + seed[20] % 160 - 80
+    shapes.append(
+        f'<rect x="0" y="{band_y}" width="{WIDTH}" height="{24 + seed[21] % 40}" '
+        f'fill="{accents[0]}" fill-opacity="0.12" transform="rotate({seed[22] % 30 - 15} {WIDTH // 2} {band_y})"/>'
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{HEIGHT}" viewBox="0 0 {WIDTH} {HEIGHT}">'
+        f'<defs><linearGradient id="g" gradientTransform="rotate({angle} .5 .5)">'
+        f'<stop offset="0" stop-color="{start}"/><stop offset="1" stop-color="{end}"/></linearGradient></defs>'
+        f'<rect width="{WIDTH}" height="{HEIGHT}" fill="url(#g)"/>{"".join(shapes)}</svg>'
+    ).encode()
+
+
+def cache_dir():
+    return Path(settings.PLACEHOLDER_CACHE_DIR) / f'v{VERSION}'
+
+
+def get_image(theme, lock):
+    """
+    Returns the SVG bytes for (theme, lock), rendering and storing them on first use.
+    """
+    path = cache_dir() / theme / f'{lock}.svg'
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        pass
+    content = render_svg(theme, lock)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    tmp.write_bytes(content)
+    os.replace(tmp, path)
+    return content
+
+
+def pregenerate(themes=None):
+    """
+    Writes every variant of the given themes to the disk cache. Returns the count.
+    """
+    count = 0
+    for theme in themes or THEMES:
+        for lock in range(1, VARIANTS + 1):
+            get_image(theme, lock)
+            count += 1
+    return count
@@ -0,0 +1,177 @@
+"""
+Quote offer ranking for the quotes step of the wizards (main.wizard).
+
+An offer's estimated monthly premium for an applicant is
+
+    base_premium x product factor x ZIP factor x coverage tier factor
+
+from its QuoteOfferFactor rows. An offer with product factors is only
+offered for those products; the ZIP factor is the one with the longest
+prefix of the applicant's ZIP code; a missing factor is 1.
+
+Per product, every active offer's base premium, factors and brand
+tie-breakers are loaded into a FactorTable of NumPy arrays, cached in the
+QUOTES content-cache namespace (so saving an offer, factor or brand
+rebuilds it). Ranking an applicant is then one vectorized pass: premiums
+for all candidates at once, sorted by premium, then the best linked
+brand's rating (higher first) and complaint score (lower first), then the
+offer's admin order. Offers without a base premium follow the priced ones
+in admin order. Every eligible offer is listed, as the quotes page always
+did, unless a caller passes a limit.
+"""
+import re
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import Max, Min
+
+from . import content_cache
+from .models import QuoteOffer, QuoteOfferFactor
+
+DEFAULT_TIER = 'standard'
+TIERS = tuple(key for key, _ in QuoteOfferFactor.TIER_CHOICES)
+
+_ZIP_RE = re.compile(r'\b(\d{5})(?:-\d{4})?\b')
+
+
+class Profile:
+    def __init__(self, product, zip_code='', tier=DEFAULT_TIER):
+        self.product = product
+        self.zip_code = zip_code
+        self.tier = tier if tier in TIERS else DEFAULT_TIER
+
+    @classmethod
+    def from_answers(cls, product, answers):
+        """
+        Builds the profile from wizard answers: the last ZIP code in the
+        address and the coverage tier, if the wizard asks for one.
+        """
+        zips = _ZIP_RE.findall(answers.get('address', ''))
+        return cls(product, zips[-1] if zips else '', answers.get('coverage_tier', DEFAULT_TIER))
+
+
+class FactorTable:
+    """
+    Column arrays over the product's candidate offers. Factors an offer
+    doesn't define are NaN in zip_factors and 1 in tier_factors.
+    """
+
+    def __init__(self, offer_ids, base, order, rating, complaint, zip_columns, zip_factors, tier_factors):
+        self.offer_ids = offer_ids
+        self.base = base  # base premium x product factor; NaN when unpriced
+        self.order = order
+        self.rating = rating
+        self.complaint = complaint
+        self.zip_columns = zip_columns  # ZIP prefix -> column of zip_factors
+        self.zip_factors = zip_factors
+        self.tier_factors = tier_factors  # columns in TIERS order
+
+    def __len__(self):
+        return len(self.offer_ids)
+
+    def zip_factor(self, zip_code):
+        factor = np.full(len(self), np.nan)
+        for length in range(len(zip_code), 0, -1):
+            column = self.zip_columns.get(zip_code[:length])
+            if column is not None:
+                factor = np.where(np.isnan(factor), self.zip_factors[:, column], factor)
+        return np.nan_to_num(factor, nan=1.0)
+
+    def premiums(self, profile):
+        return self.base * self.zip_factor(profile.zip_code) * self.tier_factors[:, TIERS.index(profile.tier)]
+
+    def rank(self, profile, limit=None):
+        """
+        Returns [(offer id, estimated premium or None)], best first; all of
+        them, or the first `limit`.
+        """
+        premiums = np.round(self.premiums(profile), 2)
+        unpriced = np.isnan(premiums)
+        # np.lexsort sorts by the last key first
+        order = np.lexsort((
+            self.offer_ids,
+            self.order,
+            np.nan_to_num(self.complaint, nan=np.inf),
+            -np.nan_to_num(self.rating, nan=0.0),
+            np.where(unpriced, np.inf, premiums),
+            unpriced,
+        ))[:limit]
+        return [
+            (int(self.offer_ids[i]), None if unpriced[i] else float(premiums[i]))
+            for i in order
+        ]
+
+
+def build_table(product):
+    offers = {
+        pk: (base, order)
+        for pk, base, order in QuoteOffer.objects.filter(is_active=True).values_list('id', 'base_premium', 'order')
+    }
+    product_factors, zip_factors, tier_factors, restricted = {}, {}, {}, set()
+    factors = QuoteOfferFactor.objects.filter(offer__is_active=True).values_list('offer_id', 'kind', 'key', 'multiplier')
+    for offer_id, kind, key, multiplier in factors:
+        key = key.strip().lower()
+        if kind == QuoteOfferFactor.PRODUCT:
+            restricted.add(offer_id)
+            if key == product:
+                product_factors[offer_id] = float(multiplier)
+        elif kind == QuoteOfferFactor.ZIP:
+            zip_factors[offer_id, key] = float(multiplier)
+        elif kind == QuoteOfferFactor.TIER and key in TIERS:
+            tier_factors[offer_id, key] = float(multiplier)
+    ids = sorted(pk for pk in offers if pk not in restricted or pk in product_factors)
+
+    brands = {
+        row['quoteoffer_id']: row
+        for row in QuoteOffer.brands.through.objects
+        .filter(quoteoffer_id__in=ids, insurerbrand__is_active=True)
+        .values('quoteoffer_id')
+        .annotate(rating=Max('insurerbrand__rating'), complaint=Min('insurerbrand__complaint_score'))
+    }
+    position = {pk: i for i, pk in enumerate(ids)}
+    zip_columns = {}
+    for _, key in zip_factors:
+        zip_columns.setdefault(key, len(zip_columns))
+    zip_matrix = np.full((len(ids), len(zip_columns)), np.nan)
+    for (offer_id, key), multiplier in zip_factors.items():
+        if offer_id in position:
+            zip_matrix[position[offer_id], zip_columns[key]] = multiplier
+    tier_matrix = np.ones((len(ids), len(TIERS)))
+    for (offer_id, key), multiplier in tier_factors.items():
+        if offer_id in position:
+            tier_matrix[position[offer_id], TIERS.index(key)] = multiplier
+
+    def column(values):
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+    return FactorTable(
+        offer_ids=np.array(ids, dtype=np.int64),
+        base=column(offers[pk][0] for pk in ids) * column(product_factors.get(pk, 1.0) for pk in ids),
+        order=np.array([offers[pk][1] for pk in ids], dtype=np.int64),
+        rating=column(brands.get(pk, {}).get('rating') for pk in ids),
+        complaint=column(brands.get(pk, {}).get('complaint') for pk in ids),
+        zip_columns=zip_columns,
+        zip_factors=zip_matrix,
+        tier_factors=tier_matrix,
+    )
+
+
+def factor_table(product):
+    return content_cache.get_or_set(content_cache.QUOTES, f'pricing:{product}', lambda: build_table(product))
+
+
+def top_offers(profile, limit=None):
+    """
+    The offers for `profile`, best first (only the first `limit` if given),
+    each with `estimate` set to its estimated monthly premium (a Decimal,
+    or None when unpriced).
+    """
+    ranked = factor_table(profile.product).rank(profile, limit)
+    offers = QuoteOffer.objects.prefetch_related('brands').in_bulk([pk for pk, _ in ranked])
+    result = []
+    for pk, premium in ranked:
+        offer = offers.get(pk)
+        if offer is not None:
+            offer.estimate = None if premium is None else Decimal(f'{premium:.2f}')
+            result.append(offer)
+    return result
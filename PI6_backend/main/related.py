@@ -0,0 +1,345 @@
+"""
+Related-posts computation for the RelatedPost table.
+
+Each published post is represented by a TF-IDF vector over its title,
+excerpt and HTML-stripped content (title terms counted twice). Candidates
+are scored as
+
+    score = (1 - CATEGORY_WEIGHT) * cosine + CATEGORY_WEIGHT * affinity
+
+where affinity is 1 for the same category, 0.5 for the same top-level
+category and 0 otherwise. rebuild_all() scores the whole archive block by
+block with NumPy; update_for_post() refreshes one post (and lets it into
+its neighbours' lists) against a bounded candidate pool after a save that
+changed its text, category or visibility commits (main.signals).
+
+rebuild_all() streams posts into a sparse (CSR) TF-IDF matrix and only
+densifies BLOCK_SIZE x CANDIDATE_BLOCK_SIZE slices of it at a time, so its
+memory is about the archive's term count x 8 bytes plus a few dense blocks,
+rather than posts x max_features. Rows are written block by block.
+"""
+import re
+from array import array
+from collections import Counter
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from . import content_cache
+from .models import BlogPost, RelatedPost
+from .search import plain_text
+
+LIMIT = 8
+MAX_FEATURES = 4096
+CATEGORY_WEIGHT = 0.3
+BLOCK_SIZE = 256
+CANDIDATE_BLOCK_SIZE = 2048
+POOL_SIZE = 500
+# Saving a post only changes related posts when one of these changed
+SOURCE_FIELDS = ('title', 'excerpt', 'content', 'category_id', 'is_published')
+
+_TOKEN_RE = re.compile(r'[a-z][a-z0-9]{2,}')
+STOP_WORDS = frozenset("""
+    the and for are but not you your with this that from they have has had was were will would
+    can could should their there what when which who how all any our out about into more most
+    other some such than then them these those very just also only over may its it's been being
+    get got one two per use using here where while each does did done yes
+""".split())
+
+
+def tokenize(post):
+    title = _TOKEN_RE.findall((post.title or '').lower())
+    body = _TOKEN_RE.findall(f'{post.excerpt or ""} {plain_text(post.content)}'.lower())
+    return [t for t in title * 2 + body if t not in STOP_WORDS]
+
+
+def _root_id(path):
+    return int(path.split('/', 1)[0]) if path else 0
+
+
+def _load(queryset):
+    posts = list(queryset.only('id', 'title', 'excerpt', 'content', 'category_id', 'category__path'))
+    return posts, [Counter(tokenize(p)) for p in posts]
+
+
+def _vectorize(counts, max_features=MAX_FEATURES):
+    """
+    Returns an L2-normalised (n_docs x n_terms) float32 TF-IDF matrix.
+    """
+    builder = _TermCounts()
+    for c in counts:
+        builder.add(c)
+    return builder.tfidf(max_features).dense(0, len(counts))
+
+
+def _affinity(cats_a, roots_a, cats_b, roots_b):
+    same_cat = (cats_a[:, None] == cats_b[None, :]) & (cats_a[:, None] != 0)
+    same_root = (roots_a[:, None] == roots_b[None, :]) & (roots_a[:, None] != 0)
+    return np.where(same_cat, 1.0, np.where(same_root, 0.5, 0.0)).astype(np.float32)
+
+
+def _category_arrays(posts):
+    cats = np.array([p.category_id or 0 for p in posts], dtype=np.int64)
+    roots = np.array([_root_id(p.category.path) if p.category_id else 0 for p in posts], dtype=np.int64)
+    return cats, roots
+
+
+def _top_k(scores, k):
+    """
+    Indices of the k best scores per row, best first.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.zeros((scores.shape[0], 0), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+def _published():
+    return BlogPost.objects.filter(is_published=True).select_related('category').order_by('id')
+
+
+def _int64(values):
+    return np.frombuffer(values, dtype=np.int64)
+
+
+class _SparseMatrix:
+    """
+    L2-normalised TF-IDF rows in CSR form (indptr, indices, data).
+    """
+
+    def __init__(self, indptr, indices, data, n_terms):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_terms = n_terms
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @classmethod
+    def from_counts(cls, indptr, term_ids, tfs, n_terms, max_features):
+        n = len(indptr) - 1
+        rows = np.repeat(np.arange(n), np.diff(indptr))
+        df = np.bincount(term_ids, minlength=n_terms)
+        # Stable sort on -df keeps first-seen order among ties, like Counter.most_common
+        vocab = np.argsort(-df, kind='stable')[:max_features]
+        columns = np.full(n_terms, -1, dtype=np.int64)
+        columns[vocab] = np.arange(len(vocab))
+        idf = np.log((1 + n) / (1 + df[vocab])) + 1
+
+        keep = columns[term_ids] >= 0
+        rows, indices = rows[keep], columns[term_ids[keep]]
+        data = (1 + np.log(tfs[keep])) * idf[indices]
+        norms = np.sqrt(np.bincount(rows, weights=data ** 2, minlength=n))
+        norms[norms == 0] = 1
+        data = (data / norms[rows]).astype(np.float32)
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n))))
+        return cls(indptr, indices, data, len(vocab))
+
+    def dense(self, start, stop):
+        block = np.zeros((stop - start, self.n_terms), dtype=np.float32)
+        lo, hi = self.indptr[start], self.indptr[stop]
+        rows = np.repeat(np.arange(stop - start), np.diff(self.indptr[start:stop + 1]))
+        block[rows, self.indices[lo:hi]] = self.data[lo:hi]
+        return block
+
+
+class _TermCounts:
+    """
+    Per-document term counts gathered into flat buffers, one add() per
+    document, for _SparseMatrix.from_counts().
+    """
+
+    def __init__(self):
+        self.terms = {}
+        self.indptr, self.term_ids, self.tfs = array('q', [0]), array('q'), array('d')
+
+    def add(self, counts):
+        for term, tf in counts.items():
+            self.term_ids.append(self.terms.setdefault(term, len(self.terms)))
+            self.tfs.append(tf)
+        self.indptr.append(len(self.term_ids))
+
+    def tfidf(self, max_features):
+        return _SparseMatrix.from_counts(
+            _int64(self.indptr), _int64(self.term_ids), np.frombuffer(self.tfs, dtype=np.float64),
+            len(self.terms), max_features,
+        )
+
+
+def _load_sparse(queryset, max_features, chunk_size=2000):
+    """
+    Streams `queryset` into (ids, categories, roots, _SparseMatrix) without
+    keeping the posts themselves.
+    """
+    ids, cats, roots = array('q'), array('q'), array('q')
+    counts = _TermCounts()
+    posts = queryset.only('id', 'title', 'excerpt', 'content', 'category_id', 'category__path')
+    for post in posts.iterator(chunk_size=chunk_size):
+        ids.append(post.pk)
+        cats.append(post.category_id or 0)
+        roots.append(_root_id(post.category.path) if post.category_id else 0)
+        counts.add(Counter(tokenize(post)))
+    return _int64(ids), _int64(cats), _int64(roots), counts.tfidf(max_features)
+
+
+def _block_top_k(matrix, cats, roots, start, stop, limit, category_weight):
+    """
+    (scores, columns) of the best `limit` candidates for rows start..stop,
+    best first, merged over candidate blocks. Missing slots score -inf.
+    """
+    n = len(matrix)
+    queries = matrix.dense(start, stop)
+    best_scores = np.full((stop - start, 0), -np.inf, dtype=np.float32)
+    best_columns = np.zeros((stop - start, 0), dtype=np.int64)
+    for c_start in range(0, n, CANDIDATE_BLOCK_SIZE):
+        c_stop = min(c_start + CANDIDATE_BLOCK_SIZE, n)
+        scores = (1 - category_weight) * (queries @ matrix.dense(c_start, c_stop).T)
+        scores += category_weight * _affinity(cats[start:stop], roots[start:stop], cats[c_start:c_stop], roots[c_start:c_stop])
+        # Never relate a post to itself
+        own = np.arange(max(start, c_start), min(stop, c_stop))
+        scores[own - start, own - c_start] = -np.inf
+        scores = np.concatenate((best_scores, scores), axis=1)
+        columns = np.concatenate((best_columns, np.broadcast_to(np.arange(c_start, c_stop), (stop - start, c_stop - c_start))), axis=1)
+        top = _top_k(scores, limit)
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_columns = np.take_along_axis(columns, top, axis=1)
+    return best_scores, best_columns
+
+
+def rebuild_all(limit=LIMIT, max_features=MAX_FEATURES, category_weight=CATEGORY_WEIGHT, progress=None):
+    """
+    Recomputes the whole RelatedPost table. Returns the number of rows written.
+    """
+    ids, cats, roots, matrix = _load_sparse(_published(), max_features)
+    written = 0
+    # One transaction, so readers keep seeing the old table until the new one is complete
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        for start in range(0, len(ids), BLOCK_SIZE):
+            stop = min(start + BLOCK_SIZE, len(ids))
+            scores, columns = _block_top_k(matrix, cats, roots, start, stop, limit, category_weight)
+            rows = [
+                RelatedPost(post_id=int(ids[start + offset]), related_post_id=int(ids[col]), rank=rank, score=float(score))
+                for offset in range(stop - start)
+                for rank, (score, col) in enumerate(zip(scores[offset], columns[offset]))
+                if np.isfinite(score)
+            ]
+            RelatedPost.objects.bulk_create(rows, batch_size=1000)
+            written += len(rows)
+            if progress:
+                progress(stop, len(ids))
+    # Post pages render their related posts
+    content_cache.bump_on_commit(content_cache.PAGES)
+    return written
+
+
+def _write(write, attempts=3):
+    """
+    Runs write() in a transaction. Two saves that commit together can
+    rewrite the same lists at once; the loser trips the unique (post, rank)
+    constraint and starts again from the rows the winner wrote.
+    """
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                return write()
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
+
+
+def _remove_post(post):
+    # Drop `post` from every list that has it, closing the gap in rank
+    lists = list(RelatedPost.objects.filter(related_post=post).values_list('post_id', flat=True))
+    kept = RelatedPost.objects.filter(post_id__in=lists).exclude(related_post=post).order_by('post_id', 'rank')
+    rows, rank = [], {}
+    for row in kept:
+        rank[row.post_id] = rank.get(row.post_id, -1) + 1
+        rows.append(RelatedPost(post_id=row.post_id, related_post_id=row.related_post_id, rank=rank[row.post_id], score=row.score))
+    RelatedPost.objects.filter(Q(post=post) | Q(post_id__in=lists)).delete()
+    RelatedPost.objects.bulk_create(rows, batch_size=1000)
+
+
+def _merge_post(post, own_rows, candidates, scores, limit):
+    # Merge the post into each candidate's list where it beats the current
+    # tail; lists that had it always get it back at its new score
+    existing = {}
+    for row in RelatedPost.objects.filter(post_id__in=[c.pk for c in candidates]).exclude(related_post=post):
+        existing.setdefault(row.post_id, []).append((row.score, row.related_post_id))
+    merged_rows = []
+    touched = []
+    for col, candidate in enumerate(candidates):
+        current = existing.get(candidate.pk, [])
+        score = float(scores[col])
+        if len(current) >= limit and score <= min(s for s, _ in current):
+            continue
+        ranked = sorted(current + [(score, post.pk)], reverse=True)[:limit]
+        touched.append(candidate.pk)
+        merged_rows.extend(
+            RelatedPost(post_id=candidate.pk, related_post_id=related_id, rank=rank, score=s)
+            for rank, (s, related_id) in enumerate(ranked)
+        )
+    RelatedPost.objects.filter(Q(post=post) | Q(post_id__in=touched)).delete()
+    RelatedPost.objects.bulk_create(own_rows + merged_rows, batch_size=1000)
+
+
+def update_for_post(post, limit=LIMIT, pool_size=POOL_SIZE, category_weight=CATEGORY_WEIGHT):
+    """
+    Incremental refresh after `post` is saved: recomputes its own list
+    against a candidate pool (its category family plus the most recent
+    posts) and inserts it into pool members' lists where it now ranks.
+    Posts that already list it are in the pool too, however old or far
+    away they are, so they keep it at its new score.
+    """
+    if not post.is_published:
+        _write(lambda: _remove_post(post))
+        return
+
+    published = _published().exclude(pk=post.pk)
+    pool_ids = set(published.order_by('-published_at').values_list('id', flat=True)[:pool_size])
+    if post.category_id and post.category.path:
+        root_path = post.category.path.split('/', 1)[0] + '/'
+        pool_ids.update(published.filter(category__path__startswith=root_path)
+                        .order_by('-published_at').values_list('id', flat=True)[:pool_size])
+    pool_ids.update(RelatedPost.objects.filter(related_post=post).values_list('post_id', flat=True))
+    candidates, candidate_counts = _load(published.filter(id__in=pool_ids))
+    if not candidates:
+        RelatedPost.objects.filter(post=post).delete()
+        return
+
+    target = BlogPost.objects.select_related('category').get(pk=post.pk)
+    matrix = _vectorize([Counter(tokenize(target))] + candidate_counts)
+    cats, roots = _category_arrays([target] + candidates)
+    scores = (1 - category_weight) * (matrix[1:] @ matrix[0])
+    scores += category_weight * _affinity(cats[:1], roots[:1], cats[1:], roots[1:])[0]
+
+    best = _top_k(scores[None, :], limit)[0]
+    own_rows = [
+        RelatedPost(post=post, related_post_id=candidates[col].pk, rank=rank, score=float(scores[col]))
+        for rank, col in enumerate(best)
+    ]
+    _write(lambda: _merge_post(post, own_rows, candidates, scores, limit))
+
+
+def related_posts(post, limit=LIMIT):
+    """
+    Returns up to `limit` related published posts for blog_detail in one
+    indexed query, topped up with recent posts when the table has fewer
+    (e.g. before the first rebuild).
+    """
+    related = [
+        row.related_post for row in
+        RelatedPost.objects.filter(post=post, related_post__is_published=True)
+        .select_related('related_post__category').order_by('rank')[:limit]
+    ]
+    if len(related) < limit:
+        exclude = [post.pk] + [p.pk for p in related]
+        related.extend(
+            BlogPost.objects.filter(is_published=True).exclude(pk__in=exclude)
+            .select_related('category').order_by('-published_at')[:limit - len(related)]
+        )
+    return related
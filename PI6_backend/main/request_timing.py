@@ -0,0 +1,202 @@
+"""
+Per-request cost breakdown (main.middleware.RequestTimingMiddleware).
+
+For a sampled request this records DB queries and their time, cache hits
+and misses by key family, template render time and the time spent loading
+the site chrome (the site_config context processor), then emits them as a
+Server-Timing header and one JSON log line. Unsampled requests only pay a
+context-variable lookup per query and cache call, and are still logged
+when they are slow.
+
+The collector lives in a ContextVar, so it follows the request into the
+threads sync_to_async runs ORM calls on under ASGI.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.spans = {}
+        self.cache = {}  # family -> [hits, misses]
+        self._open = set()
+
+    def cache_totals(self):
+        hits = sum(h for h, _ in self.cache.values())
+        misses = sum(m for _, m in self.cache.values())
+        return hits, misses
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def collect():
+    """
+    Records everything the current request (or block) does into a new RequestTimings.
+    """
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name):
+    """
+    Adds the block's duration to the `name` span. Nested blocks of the same
+    name (a template including another) only count once.
+    """
+    timings = _current.get()
+    if timings is None or name in timings._open:
+        yield
+        return
+    timings._open.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings._open.discard(name)
+        timings.spans[name] = timings.spans.get(name, 0.0) + time.perf_counter() - started
+
+
+# Hooks
+
+def query_hook(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_seconds += time.perf_counter() - started
+        timings.queries += 1
+
+
+def install_query_hook(sender, connection, **kwargs):
+    """
+    connection_created receiver: adds query_hook to every new DB connection.
+    """
+    if query_hook not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_hook)
+
+
+def key_family(key):
+    """
+    Groups cache keys for reporting: "navbar:<gen>:x" -> "navbar",
+    "gen:home" -> "gen", "template.cache.site_navbar.<hash>" -> "fragment:site_navbar".
+    """
+    key = str(key)
+    if key.startswith('template.cache.'):
+        return 'fragment:' + key[len('template.cache.'):].rsplit('.', 1)[0]
+    return key.split(':', 1)[0]
+
+
+def record_cache(found, missed):
+    timings = _current.get()
+    if timings is None:
+        return
+    for keys, slot in ((found, 0), (missed, 1)):
+        for key in keys:
+            counts = timings.cache.setdefault(key_family(key), [0, 0])
+            counts[slot] += 1
+
+
+# Reporting
+
+def sample_rate():
+    return getattr(settings, 'REQUEST_TIMING_SAMPLE_RATE', 0.0)
+
+
+def sampled():
+    rate = sample_rate()
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def slow_reasons(total, queries=None):
+    reasons = []
+    if total * 1000 >= getattr(settings, 'REQUEST_TIMING_SLOW_MS', 500):
+        reasons.append('time')
+    if queries is not None and queries >= getattr(settings, 'REQUEST_TIMING_SLOW_QUERIES', 40):
+        reasons.append('queries')
+    return reasons
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def server_timing(timings, total):
+    hits, misses = timings.cache_totals()
+    metrics = [
+        f'total;dur={_ms(total)}',
+        f'db;dur={_ms(timings.db_seconds)};desc="{timings.queries} queries"',
+        f'cache;desc="{hits} hits, {misses} misses"',
+    ]
+    for name, seconds in sorted(timings.spans.items()):
+        metrics.append(f'{name};dur={_ms(seconds)}')
+    return ', '.join(metrics)
+
+
+def _log(record, reasons):
+    record['slow'] = reasons
+    logger.log(logging.WARNING if reasons else logging.INFO, json.dumps(record, separators=(',', ':')))
+
+
+def _base_record(request, response, total):
+    return {
+        'event': 'request_timing',
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'total_ms': _ms(total),
+    }
+
+
+def finish(request, response, timings):
+    """
+    Adds the Server-Timing header and logs a sampled request.
+    """
+    total = timings.elapsed()
+    if getattr(settings, 'REQUEST_TIMING_HEADER', True):
+        response['Server-Timing'] = server_timing(timings, total)
+    record = _base_record(request, response, total)
+    hits, misses = timings.cache_totals()
+    record.update({
+        'db_queries': timings.queries,
+        'db_ms': _ms(timings.db_seconds),
+        'cache_hits': hits,
+        'cache_misses': misses,
+        'cache': {family: {'hits': h, 'misses': m} for family, (h, m) in sorted(timings.cache.items())},
+        **{f'{name}_ms': _ms(seconds) for name, seconds in timings.spans.items()},
+    })
+    _log(record, slow_reasons(total, timings.queries))
+
+
+def finish_unsampled(request, response, total):
+    """
+    Unsampled requests are only logged (with their total time) when slow.
+    """
+    reasons = slow_reasons(total)
+    if reasons:
+        _log(_base_record(request, response, total), reasons)
@@ -0,0 +1,222 @@
+"""
+Blog full-text search.
+
+On PostgreSQL posts carry a stored `search_vector` (GIN indexed) that is
+refreshed on save. On SQLite the same text is mirrored into an FTS5 shadow
+table, `main_blogpost_fts`, keyed by the post id. Any other backend falls
+back to icontains over title/excerpt.
+"""
+import html
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import strip_tags
+
+from .models import BlogPost
+
+FTS_TABLE = 'main_blogpost_fts'
+SEARCH_CONFIG = 'english'
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def plain_text(value):
+    """
+    Strips CKEditor HTML and entities down to searchable text.
+    """
+    return ' '.join(html.unescape(strip_tags(value or '')).split())
+
+
+_fts_ready = False
+
+
+def fts_available():
+    global _fts_ready
+    if not _fts_ready:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            _fts_ready = cursor.fetchone() is not None
+    return _fts_ready
+
+
+def _backend():
+    if connection.vendor == 'postgresql':
+        return 'postgres'
+    if connection.vendor == 'sqlite' and fts_available():
+        return 'fts5'
+    return 'fallback'
+
+
+def _fts_query(query):
+    # Quote every token so user input can't inject FTS5 syntax; the last
+    # token is a prefix match to behave well for search-as-you-type.
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return ''
+    quoted = [f'"{t}"' for t in tokens]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+# Index maintenance
+
+# One statement per batch; the text is cleaned with plain_text() first, so
+# every path that indexes a post (save, bulk import, backfill) stores the
+# same vector.
+_PG_UPDATE = (
+    "UPDATE main_blogpost AS p SET search_vector = "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', v.title), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', v.excerpt), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', v.body), 'C') "
+    "FROM (VALUES {values}) AS v(id, title, excerpt, body) WHERE p.id = v.id"
+)
+
+
+def index_rows(rows):
+    """
+    Indexes (id, title, excerpt, content) tuples, one statement per
+    backend. Migrations pass rows from the historical model.
+    """
+    rows = [(pk, title or '', excerpt or '', plain_text(content)) for pk, title, excerpt, content in rows]
+    if not rows:
+        return
+    backend = _backend()
+    if backend == 'postgres':
+        values = ', '.join(['(%s::bigint, %s::text, %s::text, %s::text)'] * len(rows))
+        with connection.cursor() as cursor:
+            cursor.execute(_PG_UPDATE.format(values=values), [value for row in rows for value in row])
+    elif backend == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(r[0],) for r in rows])
+            cursor.executemany(f"INSERT INTO {FTS_TABLE} (rowid, title, excerpt, body) VALUES (%s, %s, %s, %s)", rows)
+
+
+def index_post(post):
+    index_rows([(post.pk, post.title, post.excerpt, post.content)])
+
+
+def remove_post(post_id):
+    if _backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id])
+
+
+def index_posts(posts, chunk_size=500):
+    """
+    Indexes an iterable of posts, e.g. after bulk_create which skips
+    signals, in one statement per `chunk_size` posts.
+    """
+    batch = []
+    for post in posts:
+        batch.append((post.pk, post.title, post.excerpt, post.content))
+        if len(batch) >= chunk_size:
+            index_rows(batch)
+            batch = []
+    index_rows(batch)
+
+
+def backfill(queryset, chunk_size=500):
+    """
+    Indexes every post in `queryset` (which may come from a migration's
+    historical model), one statement per `chunk_size` posts.
+    """
+    rows = queryset.order_by('id').values_list('id', 'title', 'excerpt', 'content').iterator(chunk_size=chunk_size)
+    batch, total = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            index_rows(batch)
+            total += len(batch)
+            batch = []
+    index_rows(batch)
+    return total + len(batch)
+
+
+def rebuild_index(chunk_size=500):
+    if _backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    return backfill(BlogPost.objects.all(), chunk_size)
+
+
+# Querying
+
+def filter_queryset(queryset, query):
+    """
+    Narrows a BlogPost queryset to posts matching `query` (unranked).
+    Used by the admin changelist search.
+    """
+    backend = _backend()
+    if backend == 'postgres':
+        return queryset.filter(search_vector=SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG))
+    if backend == 'fts5':
+        match = _fts_query(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]))
+    return queryset.filter(Q(title__icontains=query) | Q(excerpt__icontains=query))
+
+
+class _Fts5Results:
+    """
+    Ranked FTS5 results that Paginator can count and slice.
+    """
+    # bm25 column weights: title, excerpt, body
+    RANK = f"bm25({FTS_TABLE}, 10.0, 4.0, 1.0)"
+
+    def __init__(self, match):
+        self.match = match
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM {FTS_TABLE} f JOIN main_blogpost p ON p.id = f.rowid "
+                    f"WHERE {FTS_TABLE} MATCH %s AND p.is_published",
+                    [self.match],
+                )
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        limit = -1 if index.stop is None else max(index.stop - start, 0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT f.rowid FROM {FTS_TABLE} f JOIN main_blogpost p ON p.id = f.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s AND p.is_published "
+                f"ORDER BY {self.RANK}, p.published_at DESC LIMIT %s OFFSET %s",
+                [self.match, limit, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = BlogPost.objects.select_related('category').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def search_posts(query):
+    """
+    Returns published posts matching `query`, best match first, as a
+    sliceable/countable sequence suitable for Paginator.
+    """
+    query = (query or '').strip()
+    published = BlogPost.objects.filter(is_published=True).select_related('category')
+    if not query:
+        return published.none()
+    backend = _backend()
+    if backend == 'postgres':
+        search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+        return published.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-published_at')
+    if backend == 'fts5':
+        match = _fts_query(query)
+        return _Fts5Results(match) if match else published.none()
+    return filter_queryset(published, query).order_by('-published_at')
@@ -0,0 +1,352 @@
+"""
+Deterministic synthetic content for benchmarks and scale testing
+(manage.py seed_scale, manage.py run_benchmarks).
+
+Everything is derived from a seed: the site (brands, quote offers, a
+category tree) from the seed alone, and each post, its gallery images and
+each contact message from (seed, index), so seeding 10k posts and then
+extending to 100k produces exactly the rows a single 100k run would. Rows
+are bulk inserted, so the search index and brand mentions are maintained
+here and the content cache is bumped at the end.
+"""
+import random
+from decimal import Decimal
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from .models import (
+    BlogCategory, BlogGalleryImage, BlogPost, ContactMessage, InsurerBrand, Page,
+    QuoteOffer, QuoteOfferFactor, SiteConfiguration, allocate_slugs,
+)
+from . import brand_index, content_cache, search
+
+DEFAULT_SEED = 6
+BATCH_SIZE = 500
+
+# Post i is published EPOCH + i * POST_INTERVAL (plus jitter), so later
+# extensions are always the newest posts.
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+POST_INTERVAL = timedelta(minutes=37)
+
+BRAND_NAMES = [
+    'State Farm', 'Allstate', 'Progressive', 'GEICO', 'USAA', 'Farmers',
+    'Nationwide', 'Liberty Mutual', 'Travelers', 'American Family', 'Erie',
+    'Auto-Owners', 'Chubb', 'Kemper', 'Safeco', 'Mercury', 'The General',
+    'Root', 'Lemonade', 'Hippo', 'Texas Farm Bureau', 'Germania', 'Branch',
+    'Clearcover', 'Openly',
+]
+_BRAND_PREFIXES = ['Lone Star', 'Gulf Coast', 'Heritage', 'Pioneer', 'Frontier', 'Bluebonnet', 'Summit', 'Keystone']
+_BRAND_SUFFIXES = ['Mutual', 'Casualty', 'Assurance', 'Indemnity', 'Underwriters', 'General']
+
+ROOT_CATEGORIES = ['Home Insurance', 'Auto Insurance', 'Renters Insurance', 'Texas Insurance Resources']
+COMPANIES_CATEGORY = 'companies'  # slug of the category the migrations create
+TOPICS = [
+    'Coverage', 'Discounts', 'Claims', 'Deductibles', 'Flood', 'Hail', 'Hurricanes',
+    'Teen Drivers', 'SR-22', 'Bundling', 'Liability', 'Roof Damage', 'Windstorm',
+    'Credit Scores', 'Rideshare', 'Classic Cars', 'Landlords', 'Condos', 'Mobile Homes',
+]
+CITIES = [
+    'Houston', 'Dallas', 'Austin', 'San Antonio', 'Fort Worth', 'El Paso', 'Arlington',
+    'Corpus Christi', 'Plano', 'Lubbock', 'Laredo', 'Irving', 'Amarillo', 'Galveston',
+]
+_TITLES = [
+    'How {topic} Works for {city} Homeowners',
+    '{brand} vs {brand2}: {topic} Compared',
+    'The {city} Guide to {topic}',
+    'What {brand} Customers Should Know About {topic}',
+    '{topic} Rates in {city} This Year',
+    'Is {brand} Worth It for {topic}?',
+]
+_FIRST_NAMES = ['Maria', 'James', 'Linda', 'Jose', 'Emily', 'David', 'Sofia', 'Michael', 'Ashley', 'Carlos']
+_LAST_NAMES = ['Garcia', 'Smith', 'Johnson', 'Martinez', 'Brown', 'Lopez', 'Davis', 'Nguyen', 'Wilson', 'Hernandez']
+_SENTENCES = [
+    'Drivers in {city} pay very different premiums depending on their ZIP code and claims history.',
+    '{brand} offers a {topic} option that many {city} residents overlook when they compare quotes.',
+    'Compared with {brand2}, {brand} tends to price {topic} policies more aggressively for new customers.',
+    'Before you file a claim, read the {topic} section of your declarations page carefully.',
+    'Texas law sets minimum liability limits, but most agents recommend buying well above them.',
+    'Severe weather seasons in {city} have pushed insurers to raise deductibles for wind and hail.',
+    'Ask {brand} whether your policy pays replacement cost or actual cash value after a loss.',
+    'Bundling home and auto with the same carrier is usually the easiest discount to get.',
+    'Shopping around every renewal can save hundreds of dollars a year on the same coverage.',
+    'Independent agents in {city} can quote {brand}, {brand2} and several regional carriers at once.',
+]
+
+
+def brand_name(index):
+    if index < len(BRAND_NAMES):
+        return BRAND_NAMES[index]
+    extra = index - len(BRAND_NAMES)
+    prefix = _BRAND_PREFIXES[extra % len(_BRAND_PREFIXES)]
+    suffix = _BRAND_SUFFIXES[(extra // len(_BRAND_PREFIXES)) % len(_BRAND_SUFFIXES)]
+    return f'{prefix} {suffix} {extra // (len(_BRAND_PREFIXES) * len(_BRAND_SUFFIXES)) + 1}'
+
+
+def _rng(seed, *parts):
+    # str seeds hash deterministically (unlike hash()), across runs and machines
+    return random.Random(':'.join(str(p) for p in (seed, *parts)))
+
+
+def _words(rng, brands):
+    if len(brands) < 2:
+        brands = (brands or ['your insurer']) * 2
+    brand, brand2 = rng.sample(brands, 2)
+    return {'brand': brand, 'brand2': brand2, 'topic': rng.choice(TOPICS), 'city': rng.choice(CITIES)}
+
+
+def post_content(rng, brands, paragraphs=6):
+    """
+    CKEditor-style HTML body that mentions a couple of brands, roughly
+    0.6 KB per paragraph.
+    """
+    words = _words(rng, brands)
+    parts = []
+    for n in range(paragraphs):
+        if n and n % 3 == 0:
+            parts.append(f'<h2>{rng.choice(TOPICS)} in {words["city"]}</h2>')
+        sentences = ' '.join(rng.choice(_SENTENCES).format(**words) for _ in range(rng.randint(4, 7)))
+        parts.append(f'<p>{sentences}</p>')
+        if n == paragraphs // 2:
+            items = ''.join(f'<li><strong>{t}</strong>: {rng.choice(_SENTENCES).format(**words)}</li>'
+                            for t in rng.sample(TOPICS, 3))
+            parts.append(f'<ul>{items}</ul>')
+        elif n == paragraphs - 2 and rng.random() < 0.3:
+            rows = ''.join(f'<tr><td>{b}</td><td>${rng.randint(80, 320)}/mo</td></tr>' for b in (words['brand'], words['brand2']))
+            parts.append(f'<table class="table-auto"><tbody>{rows}</tbody></table>')
+    return '\n'.join(parts)
+
+
+def build_post(seed, index, categories, brands):
+    """
+    Returns the (unsaved) post `index` of the dataset for `seed`.
+    """
+    rng = _rng(seed, 'post', index)
+    words = _words(rng, brands)
+    title = rng.choice(_TITLES).format(**words)
+    content = post_content(rng, brands, paragraphs=rng.randint(4, 14))
+    published_at = EPOCH + POST_INTERVAL * index + timedelta(seconds=rng.randrange(600))
+    return BlogPost(
+        title=title,
+        slug=f'{slugify(title)[:180]}-{index}',
+        category_id=rng.choice(categories) if categories else None,
+        excerpt=f'{words["topic"]} advice for {words["city"]} drivers and homeowners, including what {words["brand"]} offers.',
+        content=content,
+        meta_title=title[:200],
+        meta_description=f'Compare {words["topic"].lower()} options from {words["brand"]} and {words["brand2"]}.'[:160],
+        is_published=rng.random() > 0.03,
+        published_at=published_at,
+    )
+
+
+def build_gallery_images(seed, index, post, max_images):
+    rng = _rng(seed, 'gallery', index)
+    return [
+        BlogGalleryImage(
+            blog_post_id=post.pk,
+            image=f'blog_gallery/seed-{index}-{n}',
+            caption=f'{rng.choice(TOPICS)} in {rng.choice(CITIES)}' if rng.random() < 0.7 else '',
+            order=n,
+        )
+        for n in range(rng.randint(0, max_images))
+    ]
+
+
+def _category_nodes(rng, categories, depth):
+    """
+    Plans the generated part of the category tree: (name, parent index,
+    level) per node, where parents are earlier nodes and roots come first.
+    """
+    nodes = [(name, None, 0) for name in ROOT_CATEGORIES]
+    for _ in range(max(categories - len(nodes), 0)):
+        parents = [i for i, node in enumerate(nodes) if node[2] < depth - 1] or [0]
+        parent = rng.choice(parents)
+        nodes.append((f'{rng.choice(TOPICS)} {rng.choice(CITIES)}', parent, nodes[parent][2] + 1))
+    return nodes
+
+
+def _seed_categories(rng, categories, depth):
+    nodes = _category_nodes(rng, categories, depth)
+    slugs = allocate_slugs(BlogCategory, [name for name, _, _ in nodes])
+    objs = []
+    for n, ((name, parent, level), slug) in enumerate(zip(nodes, slugs)):
+        root = level == 0
+        objs.append(BlogCategory(
+            name=name,
+            slug=slug,
+            show_in_navbar=root and name != 'Texas Insurance Resources',
+            has_dropdown=root,
+            is_featured_on_home=root and n < 3,
+            home_sort_order=n if root else 0,
+            description=f'Articles about {name.lower()}.',
+            home_description=f'Compare {name.lower()} rates across Texas.' if root else '',
+        ))
+    # A level at a time, so every parent has its id before its children are inserted
+    for level in range(max(node[2] for node in nodes) + 1):
+        batch = []
+        for obj, (_, parent, node_level) in zip(objs, nodes):
+            if node_level == level:
+                obj.parent_id = objs[parent].pk if parent is not None else None
+                batch.append(obj)
+        BlogCategory.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+    BlogCategory.rebuild_tree()
+    return len(objs)
+
+
+def _seed_brands(rng, brands):
+    existing = set(InsurerBrand.objects.values_list('name', flat=True))
+    ranking = InsurerBrand.objects.count()
+    new_brands, n = [], 0
+    while ranking + len(new_brands) < brands:
+        name = brand_name(n)
+        n += 1
+        if name in existing:
+            continue
+        new_brands.append(InsurerBrand(
+            name=name,
+            ranking=ranking + len(new_brands) + 1,
+            rating=rng.randint(2, 5),
+            complaint_score=round(rng.uniform(0.3, 2.5), 2),
+        ))
+    InsurerBrand.objects.bulk_create(new_brands, batch_size=BATCH_SIZE)
+    return len(new_brands)
+
+
+# Offer kind: products it is sold for
+OFFER_PRODUCTS = {'Home': ['home'], 'Auto': ['auto'], 'Home & Auto': ['home', 'auto'], 'Renters': ['renters']}
+# Houston, Dallas, Austin and San Antonio ZIP prefixes
+ZIP_PREFIXES = ['770', '772', '773', '752', '787', '782']
+
+
+def _offer_factors(rng, offer, products):
+    factors = [QuoteOfferFactor(offer=offer, kind=QuoteOfferFactor.PRODUCT, key=p,
+                                multiplier=Decimal(f'{rng.uniform(0.8, 1.2):.3f}')) for p in products]
+    factors += [QuoteOfferFactor(offer=offer, kind=QuoteOfferFactor.ZIP, key=prefix,
+                                 multiplier=Decimal(f'{rng.uniform(0.85, 1.4):.3f}'))
+                for prefix in rng.sample(ZIP_PREFIXES, rng.randint(1, 3))]
+    factors += [QuoteOfferFactor(offer=offer, kind=QuoteOfferFactor.TIER, key=tier, multiplier=Decimal(multiplier))
+                for tier, multiplier in (('basic', '0.850'), ('premium', '1.300'))]
+    return factors
+
+
+def _seed_offers(rng, offers):
+    brand_ids = list(InsurerBrand.objects.filter(is_active=True).order_by('ranking', 'id').values_list('id', 'name'))
+    objs, links, products = [], [], []
+    for n in range(offers):
+        linked = rng.sample(brand_ids, min(len(brand_ids), rng.randint(1, 4)))
+        kind = rng.choice(list(OFFER_PRODUCTS))
+        base = rng.randint(60, 240)
+        products.append(OFFER_PRODUCTS[kind])
+        objs.append(QuoteOffer(
+            title=f'{linked[0][1] if linked else "Texas"} {kind}',
+            premium=f'From ${base}/mo',
+            base_premium=Decimal(base),
+            phone=f'(800) 555-{rng.randint(1000, 9999)}',
+            highlight=rng.choice(['Best Value', 'Top Rated', 'Fastest Claims', '']),
+            notes=rng.choice(_SENTENCES).format(**_words(rng, [name for _, name in brand_ids])),
+            order=n + 1,
+        ))
+        links.append([pk for pk, _ in linked])
+    QuoteOffer.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    Link = QuoteOffer.brands.through
+    Link.objects.bulk_create([
+        Link(quoteoffer_id=offer.pk, insurerbrand_id=pk)
+        for offer, brand_pks in zip(objs, links)
+        for pk in brand_pks
+    ], batch_size=BATCH_SIZE)
+    QuoteOfferFactor.objects.bulk_create([
+        factor
+        for offer, offer_products in zip(objs, products)
+        for factor in _offer_factors(rng, offer, offer_products)
+    ], batch_size=BATCH_SIZE)
+    return len(objs)
+
+
+@transaction.atomic
+def seed_site(seed=DEFAULT_SEED, brands=50, categories=30, depth=3, offers=8):
+    """
+    Adds the site configuration, footer pages, brands (on top of the ones the
+    migrations create), quote offers linked to brands and a category tree
+    `depth` levels deep with navbar and home page sections. Does nothing if
+    the dataset was already seeded.
+    """
+    if BlogCategory.objects.filter(name=ROOT_CATEGORIES[0], parent__isnull=True).exists():
+        return False
+    SiteConfiguration.objects.get_or_create(pk=1)
+    for title, category in [
+        ('About Us', 'company'), ('Our Team', 'company'), ('Advertise', 'company'),
+        ('Privacy Policy', 'legal'), ('Terms of Use', 'legal'),
+    ]:
+        Page.objects.create(title=title, category=category, content=f'<p>{title} for Texas Insurance Ratings.</p>' * 20)
+    _seed_brands(_rng(seed, 'brands'), brands)
+    _seed_offers(_rng(seed, 'offers'), offers)
+    _seed_categories(_rng(seed, 'categories'), categories, max(depth, 1))
+    _bump_all()
+    return True
+
+
+def seed_posts(total, seed=DEFAULT_SEED, gallery_images=3, batch_size=BATCH_SIZE, progress=None):
+    """
+    Extends the dataset to `total` posts, each with up to `gallery_images`
+    gallery images. Returns the number of posts added.
+    """
+    # Posts go to the seeded categories; the companies tree (from the
+    # migrations) is reached through brand mentions instead
+    categories = list(BlogCategory.objects.exclude(
+        path__startswith=_companies_path(),
+    ).order_by('id').values_list('id', flat=True))
+    brands = list(InsurerBrand.objects.order_by('id').values_list('name', flat=True))
+    start = BlogPost.objects.count()
+    for first in range(start, total, batch_size):
+        batch = [build_post(seed, i, categories, brands) for i in range(first, min(first + batch_size, total))]
+        dates = [post.published_at for post in batch]
+        with transaction.atomic():
+            BlogPost.objects.bulk_create(batch)
+            # published_at is auto_now_add, which bulk_create overwrites
+            for post, published_at in zip(batch, dates):
+                post.published_at = published_at
+            BlogPost.objects.bulk_update(batch, ['published_at'])
+            BlogGalleryImage.objects.bulk_create([
+                image
+                for index, post in enumerate(batch, first)
+                for image in build_gallery_images(seed, index, post, gallery_images)
+            ])
+            search.index_posts(batch)
+            brand_index.index_posts(batch)
+        if progress:
+            progress(first + len(batch), total)
+    _bump_all()
+    return max(total - start, 0)
+
+
+def seed_contact_messages(total, seed=DEFAULT_SEED, batch_size=BATCH_SIZE):
+    """
+    Extends the contact inbox to `total` messages. Returns the number added.
+    """
+    brands = list(InsurerBrand.objects.order_by('id').values_list('name', flat=True))
+    start = ContactMessage.objects.count()
+    for first in range(start, total, batch_size):
+        batch = []
+        for index in range(first, min(first + batch_size, total)):
+            rng = _rng(seed, 'contact', index)
+            words = _words(rng, brands)
+            first_name = rng.choice(_FIRST_NAMES)
+            batch.append(ContactMessage(
+                name=f'{first_name} {rng.choice(_LAST_NAMES)}',
+                email=f'{first_name.lower()}{index}@example.com',
+                subject=f'Question about {words["topic"].lower()}',
+                message=' '.join(rng.choice(_SENTENCES).format(**words) for _ in range(rng.randint(1, 4))),
+                is_read=rng.random() < 0.6,
+            ))
+        ContactMessage.objects.bulk_create(batch)
+    return max(total - start, 0)
+
+
+def _bump_all():
+    content_cache.bump(*set(ns for namespaces in content_cache.MODEL_NAMESPACES.values() for ns in namespaces))
+
+
+def _companies_path():
+    path = BlogCategory.objects.filter(slug=COMPANIES_CATEGORY).values_list('path', flat=True).first()
+    return path or '-'
@@ -0,0 +1,111 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from .models import BlogPost, BlogCategory, ContactMessage, InsurerBrand, QuoteOffer, QuoteOfferFactor, Page, SiteConfiguration
+from . import brand_index, content_cache, metrics, related, search
+
+
+def receiver_for(signal, model):
+    """
+    Like django.dispatch.receiver, but also connects the proxies of `model`
+    (e.g. blog.BlogPost), since Django only signals the proxy class when a
+    proxy instance is saved from the admin.
+    """
+    def decorator(func):
+        for sender in apps.get_models():
+            if sender._meta.concrete_model is model:
+                signal.connect(func, sender=sender, dispatch_uid=f'{func.__name__}.{sender._meta.label}')
+        return func
+    return decorator
+
+
+# Brand mention index
+
+@receiver_for(post_save, BlogPost)
+def index_post_brand_mentions(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    brand_index.index_post(instance)
+
+
+@receiver_for(pre_save, InsurerBrand)
+def remember_brand_name(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        instance._previous_name = None
+        return
+    instance._previous_name = InsurerBrand.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver_for(post_save, InsurerBrand)
+def index_brand_mentions(sender, instance, created=False, raw=False, using=None, **kwargs):
+    # Ranking/visibility edits from the changelist don't touch the index; a
+    # new name re-scans every post after commit, outside the admin's request
+    # transaction (brands have no aliases, so the name is all that matches)
+    if raw:
+        return
+    if created or getattr(instance, '_previous_name', None) != instance.name:
+        transaction.on_commit(lambda: brand_index.index_brand(instance), using=using)
+
+
+# Full-text search index
+
+@receiver_for(post_save, BlogPost)
+def index_post_search(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_post(instance)
+
+
+@receiver_for(post_delete, BlogPost)
+def unindex_post_search(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+# Related posts
+
+@receiver_for(pre_save, BlogPost)
+def remember_related_source(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        instance._related_source = None
+        return
+    instance._related_source = BlogPost.objects.filter(pk=instance.pk).values_list(*related.SOURCE_FIELDS).first()
+
+
+@receiver_for(post_save, BlogPost)
+def update_related_posts(sender, instance, created=False, raw=False, using=None, **kwargs):
+    # Saves that don't touch the text, category or visibility leave the
+    # table as it is; the rest update it after commit, outside the admin's
+    # transaction
+    if raw:
+        return
+    source = tuple(getattr(instance, field) for field in related.SOURCE_FIELDS)
+    if not created and getattr(instance, '_related_source', None) == source:
+        return
+    transaction.on_commit(lambda: related.update_for_post(instance), using=using)
+
+
+# Content cache invalidation
+
+def bump_content_cache(sender, instance=None, using=None, **kwargs):
+    content_cache.bump_for_model(sender._meta.concrete_model, using=using)
+
+
+for _model in (BlogPost, BlogCategory, InsurerBrand, QuoteOffer, QuoteOfferFactor, Page, SiteConfiguration):
+    receiver_for(post_save, _model)(bump_content_cache)
+    receiver_for(post_delete, _model)(bump_content_cache)
+
+
+def bump_offer_brands(sender, instance=None, action=None, using=None, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        content_cache.bump_for_model(QuoteOffer, using=using)
+
+
+m2m_changed.connect(bump_offer_brands, sender=QuoteOffer.brands.through, dispatch_uid='bump_offer_brands')
+
+
+# Metrics
+
+@receiver_for(post_save, ContactMessage)
+def count_contact_message(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        metrics.inc('pi6_contact_messages_total')
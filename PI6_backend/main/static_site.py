@@ -0,0 +1,344 @@
+"""
+Static pre-rendering of the public site (render_static command).
+
+Every public, read-only URL (home, blog listings and posts, category and
+company listings, pages) is rendered through the normal Django stack and
+written to <output>/<path>/index.html, so StaticSiteMiddleware
+(SERVE_STATIC_SITE) or any static host can serve it without running a view.
+Rendering always goes to the views, never to previously written files.
+
+Static hosts ignore query strings, so query URLs get a path of their own:
+"/blog/?page=3" is written to "/blog/page/3/" and "/companies/?brand=4" to
+"/companies/brand/4/". Pagination and filter links in the rendered HTML are
+rewritten to those paths.
+
+Each rendered path is recorded in a manifest with the content it depends on
+("post:12", "category:3", ...). An incremental run re-renders only the paths
+whose dependencies changed since the previous run; changes to categories,
+brands, the site chrome or the templates re-render everything.
+"""
+import hashlib
+import html
+import json
+import math
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .context_processors import build_chrome
+from .models import BlogCategory, BlogPost, BrandMention, InsurerBrand, Page, RelatedPost
+from .pagination import decode_cursor, encode_cursor
+
+MANIFEST_NAME = '_manifest.json'
+MANIFEST_VERSION = 1
+PER_PAGE = 9  # matches the listing views
+
+_HREF_RE = re.compile(r'href="([^"#]*\?[^"#]*)"')
+# Renders go through the views even when the running site serves the output
+RENDER_SETTINGS = {'STATIC_SITE_SERVE': False, 'WHITENOISE_ROOT': None}
+
+
+def static_path(path, params=(), number=1):
+    """
+    Path a (path, query params, page number) URL is written under.
+    """
+    parts = [path.rstrip('/')]
+    parts += [f'{key}/{value}' for key, value in sorted(params)]
+    if number > 1:
+        parts.append(f'page/{number}')
+    return '/'.join(parts) + '/'
+
+
+class Target:
+    def __init__(self, url, path, deps):
+        self.url = url  # what is requested from Django
+        self.path = path  # where it is written
+        self.deps = sorted(deps)
+
+
+def _listing(path, params, queryset, deps):
+    """
+    Targets for every page of a keyset-paginated listing. Pages past
+    MAX_OFFSET_PAGE are requested by cursor, like the pagination links do.
+    """
+    keys = list(queryset.order_by('-published_at', '-id').values_list('published_at', 'id'))
+    pages = max(1, math.ceil(len(keys) / PER_PAGE))
+    targets = []
+    for number in range(1, pages + 1):
+        query = list(params)
+        if number > 1:
+            last_published_at, last_pk = keys[(number - 1) * PER_PAGE - 1]
+            query.append(('cursor', encode_cursor('n', number, last_published_at, last_pk)))
+        url = f'{path}?{urlencode(query)}' if query else path
+        targets.append(Target(url, static_path(path, params, number), deps))
+    return targets
+
+
+def post_affects(post_ids):
+    """
+    Returns {post_id: [tags]} of the listings each post appears in.
+    """
+    paths = dict(BlogCategory.objects.values_list('id', 'path'))
+    affects = {pk: {'posts'} for pk in post_ids}
+    for pk, category_id in BlogPost.objects.filter(pk__in=post_ids).values_list('id', 'category_id'):
+        for ancestor in (paths.get(category_id) or '').split('/'):
+            if ancestor:
+                affects[pk].add(f'category:{ancestor}')
+    for pk, brand_id in BrandMention.objects.filter(post_id__in=post_ids).values_list('post_id', 'brand_id'):
+        affects[pk].add(f'brand:{brand_id}')
+    return {pk: sorted(tags) for pk, tags in affects.items()}
+
+
+def plan():
+    """
+    Returns the list of Targets for every public page.
+    """
+    published = BlogPost.objects.filter(is_published=True)
+    targets = [Target(reverse('home'), reverse('home'), {'home'})]
+
+    blog_path = reverse('blog_list')
+    targets += _listing(blog_path, [], published, {'posts'})
+    for category in BlogCategory.objects.all():
+        family = published.filter(category__path__startswith=category.path)
+        targets += _listing(reverse('blog_category_list', args=[category.slug]), [], family, {f'category:{category.pk}'})
+
+    # Posts whose related list is short are topped up with recent posts
+    related = {}
+    for post_id, related_id in RelatedPost.objects.filter(related_post__is_published=True).values_list('post_id', 'related_post_id'):
+        related.setdefault(post_id, []).append(related_id)
+    for pk, slug in published.values_list('id', 'slug'):
+        deps = {f'post:{pk}'} | {f'post:{other}' for other in related.get(pk, [])}
+        if len(related.get(pk, [])) < 8:
+            deps.add('posts')
+        path = reverse('blog_detail', args=[slug])
+        targets.append(Target(path, path, deps))
+
+    for pk, slug in Page.objects.filter(is_active=True).values_list('id', 'slug'):
+        path = reverse('page_detail', args=[slug])
+        targets.append(Target(path, path, {f'page:{pk}'}))
+
+    companies_path = reverse('companies')
+    targets.append(Target(companies_path, companies_path, {'companies'}))
+    company_category = BlogCategory.objects.filter(slug='companies').first()
+    if company_category:
+        for sub in company_category.subcategories.all():
+            family = published.filter(category__path__startswith=sub.path)
+            targets += _listing(companies_path, [('category', sub.slug)], family, {f'category:{sub.pk}'})
+    for brand in InsurerBrand.objects.filter(is_active=True, show_in_companies=True, ranking__gt=0):
+        mentions = published.filter(brand_mentions__brand=brand)
+        deps = {f'brand:{brand.pk}'}
+        targets += _listing(companies_path, [('brand', str(brand.pk))], mentions, deps)
+        targets += _listing(reverse('company_blogs', args=[brand.pk]), [], mentions, deps)
+    return targets
+
+
+# Change detection
+
+def _jsonable(value):
+    if hasattr(value, 'get_prep_value'):  # CloudinaryResource
+        return value.get_prep_value()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, default=_jsonable, sort_keys=True).encode()).hexdigest()
+
+
+def _row(obj):
+    if isinstance(obj, BlogPost):
+        # Only what the navbar/footer show, so editing a post body doesn't
+        # count as a chrome change
+        return [obj._meta.label, obj.pk, obj.title, obj.slug, obj.category_id]
+    return [obj._meta.label, obj.pk] + [getattr(obj, f.attname) for f in obj._meta.concrete_fields]
+
+
+def site_signature():
+    """
+    Digest of everything that appears on (nearly) every page: the navbar and
+    footer data, category and brand tables, templates and static manifest.
+    A change here re-renders the whole site.
+    """
+    chrome = build_chrome()
+    navbar = [(_row(c), [_row(p) for p in getattr(c, 'family_posts', [])]) for c in chrome['navbar_categories']]
+    footer = {k: [_row(v) for v in (vals if isinstance(vals, list) else [vals]) if v is not None]
+              for k, vals in chrome['footer_links'].items()}
+    site = _row(chrome['site_config']) if chrome['site_config'] else None
+    tables = [list(model.objects.order_by('pk').values_list()) for model in (BlogCategory, InsurerBrand)]
+
+    names = [name for d in settings.TEMPLATES[0]['DIRS'] for name in sorted(Path(d).rglob('*.html'))]
+    names.append(Path(settings.STATIC_ROOT) / 'staticfiles.json')  # hashed CSS/JS names
+    files = [(str(name), hashlib.sha1(name.read_bytes()).hexdigest()) for name in names if name.is_file()]
+    return _digest([site, navbar, footer, tables, files])
+
+
+def changed_tags(manifest):
+    """
+    Returns the set of dependency tags touched since the manifest was written.
+    """
+    since = parse_datetime(manifest['rendered_at'])
+    previous_posts = {int(pk): tags for pk, tags in manifest.get('posts', {}).items()}
+    previous_pages = set(manifest.get('page_ids', []))
+
+    published = set(BlogPost.objects.filter(is_published=True).values_list('id', flat=True))
+    changed_posts = set(BlogPost.objects.filter(updated_at__gt=since).values_list('id', flat=True))
+    changed_posts |= published ^ set(previous_posts)  # published/new or unpublished/deleted
+
+    tags = set()
+    current = post_affects(changed_posts & published)
+    for pk in changed_posts:
+        tags.add(f'post:{pk}')
+        tags.update(current.get(pk, []))
+        tags.update(previous_posts.get(pk, []))
+
+    pages = set(Page.objects.filter(is_active=True).values_list('id', flat=True))
+    changed_pages = set(Page.objects.filter(updated_at__gt=since).values_list('id', flat=True)) | (pages ^ previous_pages)
+    tags.update(f'page:{pk}' for pk in changed_pages)
+    return tags
+
+
+# Rendering
+
+_client = None
+
+
+def _rewrite_links(content, page_url, paths):
+    """
+    Points query-string links at the static path they were written to, when
+    that path is part of the build.
+    """
+    base = urlsplit(page_url).path
+
+    def replace(match):
+        href = html.unescape(match.group(1))
+        parts = urlsplit(href)
+        if parts.scheme or parts.netloc:
+            return match.group(0)
+        params, number = [], 1
+        for key, value in parse_qsl(parts.query):
+            if key == 'cursor':
+                cursor = decode_cursor(value)
+                number = cursor[1] if cursor else 1
+            elif key == 'page':
+                number = int(value) if value.isdigit() else 1
+            else:
+                params.append((key, value))
+        target = static_path(parts.path or base, params, number)
+        return f'href="{target}"' if target in paths else match.group(0)
+
+    return _HREF_RE.sub(replace, content)
+
+
+def _init_worker(host, secure):
+    global _client
+    override_settings(**RENDER_SETTINGS).enable()
+    _client = Client(HTTP_HOST=host, secure=secure, raise_request_exception=False)
+
+
+def render_target(url, path, output, paths):
+    """
+    Renders one URL and writes it under `output`. Returns (path, digest) or
+    (path, None) when the page did not render with a 200.
+    """
+    response = _client.get(url)
+    if response.status_code != 200:
+        return path, None
+    content = _rewrite_links(response.content.decode(response.charset or 'utf-8'), url, paths)
+    destination = Path(output) / path.lstrip('/') / 'index.html'
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destination.with_suffix('.tmp')
+    tmp.write_text(content, encoding='utf-8')
+    os.replace(tmp, destination)
+    return path, hashlib.sha1(content.encode()).hexdigest()
+
+
+def _render_all(jobs, output, paths, host, secure, workers):
+    global _client
+    # Workers inherit the set-up Django app by forking (they never call
+    # django.setup()), so render in-process where fork is unavailable
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        with override_settings(**RENDER_SETTINGS):
+            _client = Client(HTTP_HOST=host, secure=secure, raise_request_exception=False)
+            for url, path in jobs:
+                yield render_target(url, path, output, paths)
+        return
+    # Forked workers must open their own database connections
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(host, secure)) as pool:
+        futures = [pool.submit(render_target, url, path, output, paths) for url, path in jobs]
+        for future in futures:
+            yield future.result()
+
+
+def build(output, base_url='http://localhost', full=False, workers=None, progress=None):
+    """
+    Renders the site into `output`. Returns a summary dict.
+    """
+    output = Path(output)
+    manifest_file = output / MANIFEST_NAME
+    manifest = json.loads(manifest_file.read_text()) if manifest_file.exists() else None
+    if manifest and manifest.get('version') != MANIFEST_VERSION:
+        manifest = None
+
+    started = timezone.now()
+    parts = urlsplit(base_url)
+    signature = site_signature()
+    targets = plan()
+    paths = {t.path for t in targets}
+    previous = manifest['paths'] if manifest else {}
+
+    rebuild_all = full or not manifest or manifest['signature'] != signature or manifest['base_url'] != base_url
+    tags = set() if rebuild_all else changed_tags(manifest)
+    jobs = [
+        t for t in targets
+        if rebuild_all or t.path not in previous or previous[t.path]['deps'] != t.deps
+        or tags.intersection(t.deps) or not (output / t.path.lstrip('/') / 'index.html').exists()
+    ]
+
+    entries = {path: entry for path, entry in previous.items() if path in paths}
+    by_path = {t.path: t for t in targets}
+    failed = []
+    workers = workers or os.cpu_count() or 1
+    rendered = _render_all([(t.url, t.path) for t in jobs], output, paths, parts.netloc, parts.scheme == 'https', workers)
+    for done, (path, digest) in enumerate(rendered, 1):
+        if digest is None:
+            failed.append(path)
+            entries.pop(path, None)
+        else:
+            entries[path] = {'url': by_path[path].url, 'deps': by_path[path].deps, 'sha1': digest}
+        if progress:
+            progress(done, len(jobs))
+
+    removed = [path for path in previous if path not in entries and path not in failed]
+    for path in removed + failed:
+        stale = output / path.lstrip('/') / 'index.html'
+        if stale.exists():
+            stale.unlink()
+
+    published = list(BlogPost.objects.filter(is_published=True).values_list('id', flat=True))
+    output.mkdir(parents=True, exist_ok=True)
+    manifest_file.write_text(json.dumps({
+        'version': MANIFEST_VERSION,
+        'rendered_at': started.isoformat(),
+        'base_url': base_url,
+        'signature': signature,
+        'posts': {str(pk): tags for pk, tags in post_affects(published).items()},
+        'page_ids': list(Page.objects.filter(is_active=True).values_list('id', flat=True)),
+        'paths': entries,
+    }, indent=1, sort_keys=True))
+    return {
+        'total': len(targets), 'rendered': len(jobs) - len(failed), 'failed': failed,
+        'removed': len(removed), 'full': rebuild_all,
+    }
@@ -0,0 +1,29 @@
+from django.template.backends.django import DjangoTemplates
+
+from . import request_timing
+
+
+class TimedTemplate:
+    """
+    Wraps a backend template so its render time shows up as the "tpl"
+    Server-Timing span.
+    """
+
+    def __init__(self, template):
+        self.template = template
+
+    @property
+    def origin(self):
+        return self.template.origin
+
+    def render(self, context=None, request=None):
+        with request_timing.span('tpl'):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
@@ -0,0 +1,39 @@
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from main.css_build import BUILT_CSS
+
+register = template.Library()
+
+TAILWIND_CDN = 'https://cdn.tailwindcss.com?plugins=typography,aspect-ratio'
+
+
+@lru_cache(maxsize=None)
+def _built_css_url():
+    if not finders.find(BUILT_CSS) and not staticfiles_storage.exists(BUILT_CSS):
+        return None
+    try:
+        return staticfiles_storage.url(BUILT_CSS)
+    except ValueError:  # not in the collectstatic manifest
+        return None
+
+
+@register.simple_tag
+def tailwind_css():
+    """
+    Links the stylesheet built by build_css. Until one has been built (fresh
+    checkout, no build step) it falls back to the in-browser CDN compiler.
+    Usage: {% tailwind_css %}
+    """
+    url = _built_css_url()
+    if url:
+        return format_html('<link rel="stylesheet" href="{}">', url)
+    return format_html(
+        '<script src="{}"></script>\n    <script src="{}"></script>',
+        TAILWIND_CDN, static('js/tailwind.theme.js'),
+    )
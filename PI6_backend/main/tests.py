@@ -1,3 +1,940 @@
-from django.test import TestCase
+import importlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection
+from django.db.models import F, Q, QuerySet
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from benchmarks import budgets
+from benchmarks.routes import build_routes
+from benchmarks.runner import benchmark_settings
+from main import brand_index, content_cache, content_io, health, metrics, models, pagination, quote_pricing, related, search, seeding, static_site, wizard
+from main.cache_backends import FileCache, TieredCache
+from main.models import (
+    BlogCategory, BlogPost, BrandMention, ContactMessage, InsurerBrand, Page, QuoteLead, QuoteOffer, QuoteOfferFactor,
+    RelatedPost, allocate_slugs,
+)
+from main.pagination import KeysetPaginator
+from main.wizard import WIZARDS
+
+BUDGET_POSTS = 200
+
+
+class PageTestCase(TestCase):
+    """
+    Runs under benchmark_settings(), so full pages render without built
+    static files or Cloudinary credentials and use a scratch cache.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Entered before setUpTestData so seeding never touches the real cache
+        cls._settings = benchmark_settings()
+        cls._settings.__enter__()
+        cls.addClassCleanup(cls._settings.__exit__, None, None, None)
+        super().setUpClass()
+
+    def setUp(self):
+        # Saves inside a TestCase never commit, so they never bump the
+        # content cache; start every test from an empty one instead.
+        cache.clear()
+
+
+class QueryBudgetTests(PageTestCase):
+    """
+    Every route must stay within its declared query and cache-miss budget
+    (benchmarks.budgets.BUDGETS), with cold and with warm caches.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seeding.seed_site()
+        seeding.seed_posts(BUDGET_POSTS)
+        seeding.seed_contact_messages(BUDGET_POSTS // 10)
+
+    def test_every_route_has_a_budget(self):
+        self.assertEqual({route.name for route in build_routes()}, set(budgets.BUDGETS))
+
+    def check_budgets(self, cold):
+        for route in build_routes():
+            with self.subTest(route=route.name):
+                failure = budgets.check(route, cold)
+                if failure:
+                    self.fail(failure)
+
+    def test_cold_cache_budgets(self):
+        self.check_budgets(cold=True)
+
+    def test_warm_cache_budgets(self):
+        self.check_budgets(cold=False)
+
+
+@override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-default'},
+    'l2': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-l2'},
+})
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.l2 = caches['l2']
+        self.l2.clear()
+        self.cache = TieredCache('tiered', {'OPTIONS': {'L2': 'l2', 'L1_MAX_ENTRIES': 2}})
+
+    def stats(self):
+        stats = self.cache.stats()
+        return tuple(stats[name] for name in ('l1_hits', 'l1_misses', 'l2_hits', 'l2_misses'))
+
+    def test_l1_hit_skips_l2(self):
+        self.cache.set('k', 1)
+        self.l2.set('k', 2)
+        self.assertEqual(self.cache.get('k'), 1)
+        self.assertEqual(self.stats(), (1, 0, 0, 0))
+
+    def test_l2_hit_fills_l1(self):
+        self.l2.set('k', 1)
+        self.assertEqual(self.cache.get('k'), 1)
+        self.assertEqual(self.cache.get('k'), 1)
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.stats(), (1, 2, 1, 1))
+
+    def test_generation_keys_bypass_l1(self):
+        self.cache.set('gen:pages', 1)
+        self.assertEqual(len(self.cache.l1), 0)
+        self.l2.set('gen:pages', 2)  # bumped by another worker
+        self.assertEqual(self.cache.get('gen:pages'), 2)
+        self.assertEqual(self.cache.get_many(['gen:pages', 'k']), {'gen:pages': 2})
+        self.assertEqual(self.stats(), (0, 1, 2, 1))
+
+    def test_l1_is_bounded_lru(self):
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, key)
+        self.l2.clear()
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'b': 'b', 'c': 'c'})
+
+    def test_file_cache_culls_every_n_sets(self):
+        with tempfile.TemporaryDirectory() as location:
+            file_cache = FileCache(location, {'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_EVERY': 3}})
+            with mock.patch.object(file_cache, '_list_cache_files', wraps=file_cache._list_cache_files) as listing:
+                for i in range(6):
+                    file_cache.set(f'k{i}', i)
+            self.assertEqual(listing.call_count, 2)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics.registry.counters.clear()
+        metrics.registry.histograms.clear()
+
+    def test_requests_are_counted_by_url_name(self):
+        self.client.get(reverse('health_live'))
+        self.client.get('/no-such-page/')
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('pi6_http_requests_total{route="health_live",method="GET",status="200"} 1', body)
+        self.assertIn('pi6_http_requests_total{route="unmatched",method="GET",status="404"} 1', body)
+        self.assertIn('pi6_http_request_duration_seconds_count{route="health_live"} 1', body)
+        self.assertIn('pi6_db_queries_total{route="health_live"} 0', body)
+
+    def test_wizard_steps_and_contact_messages(self):
+        self.client.post(reverse('start'), {'step': 'address', 'address': '1 Main St'})
+        ContactMessage.objects.create(name='A', email='a@example.com', subject='S', message='M')
+        body = metrics.render()
+        self.assertIn('pi6_wizard_steps_total{product="home",step="address"} 1', body)
+        self.assertIn('pi6_contact_messages_total 1', body)
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics.observe('pi6_template_render_seconds', 0.02, route='x')
+        metrics.observe('pi6_template_render_seconds', 20, route='x')
+        body = metrics.render()
+        self.assertIn('pi6_template_render_seconds_bucket{route="x",le="0.01"} 0', body)
+        self.assertIn('pi6_template_render_seconds_bucket{route="x",le="0.025"} 1', body)
+        self.assertIn('pi6_template_render_seconds_bucket{route="x",le="+Inf"} 2', body)
+        self.assertIn('pi6_template_render_seconds_sum{route="x"} 20.02', body)
+
+    def test_cache_hit_ratio(self):
+        metrics.inc('pi6_cache_requests_total', 3, family='navbar', result='hit')
+        metrics.inc('pi6_cache_requests_total', 1, family='navbar', result='miss')
+        self.assertIn('pi6_cache_hit_ratio{family="navbar"} 0.75', metrics.render())
+
+    def test_worker_snapshots_are_merged(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            other = metrics.Registry()
+            other.inc('pi6_contact_messages_total', 2)
+            with open(f'{directory}/1-other.json', 'w') as handle:
+                handle.write(metrics.json.dumps(other.snapshot()))
+            metrics.inc('pi6_contact_messages_total')
+            self.assertIn('pi6_contact_messages_total 3', metrics.render())
+
+    def write_snapshot(self, directory, name, **counters):
+        other = metrics.Registry()
+        for counter, value in counters.items():
+            other.inc(counter, value)
+        with open(f'{directory}/{name}.json', 'w') as handle:
+            handle.write(metrics.json.dumps(other.snapshot()))
+
+    def test_dead_workers_are_archived(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            self.write_snapshot(directory, '1-live', pi6_contact_messages_total=2)
+            self.write_snapshot(directory, '4000001-a', pi6_contact_messages_total=3)
+            self.write_snapshot(directory, '4000001-b', pi6_contact_messages_total=4)
+            metrics.mark_process_dead(4000001, directory)
+            self.assertEqual(sorted(os.listdir(directory)), ['.lock', '1-live.json', 'archive.json'])
+            self.write_snapshot(directory, '4000002-c', pi6_contact_messages_total=5)
+            metrics.mark_process_dead(4000002, directory)
+            self.assertIn('pi6_contact_messages_total 14', metrics.render())
+
+    def test_scrapes_archive_workers_that_are_gone(self):
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        gone = process.pid
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            self.write_snapshot(directory, f'{gone}-x', pi6_contact_messages_total=2)
+            self.assertIn('pi6_contact_messages_total 2', metrics.render())
+            self.assertNotIn(f'{gone}-x.json', os.listdir(directory))
+            self.assertIn('pi6_contact_messages_total 2', metrics.render())
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+
+class HealthTests(TestCase):
+    def setUp(self):
+        health.reset()
+        self.addCleanup(health.reset)
+
+    def test_live(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('health_live'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_ready(self):
+        response = self.client.get(reverse('health_ready'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'ok')
+        self.assertEqual(set(data['checks']), {'database', 'cache', 'migrations'})
+        self.assertTrue(all('ms' in check for check in data['checks'].values()))
+
+    def test_ready_result_is_reused(self):
+        self.client.get(reverse('health_ready'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('health_ready')).status_code, 200)
+
+    def test_failing_check_is_unavailable(self):
+        with mock.patch.dict(health.CHECKS, {'database': mock.Mock(side_effect=RuntimeError('down'))}):
+            response = self.client.get(reverse('health_ready'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['checks']['database'], {'ok': False, 'error': 'RuntimeError: down', 'ms': mock.ANY})
+
+    def test_pending_migrations(self):
+        with mock.patch.object(health.MigrationExecutor, 'migration_plan', return_value=[('main', False)]):
+            response = self.client.get(reverse('health_ready'))
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()['checks']['migrations']['ok'])
+
+    def test_hung_cache_is_cut_off(self):
+        with override_settings(HEALTH_CHECK_TIMEOUT=0.1), \
+                mock.patch.object(health, '_cache_round_trip', side_effect=lambda: time.sleep(1)):
+            started = time.monotonic()
+            response = self.client.get(reverse('health_ready'))
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()['checks']['cache']['ok'])
+
+    def test_api_health_keeps_its_payload(self):
+        InsurerBrand.objects.create(name='Acme')
+        response = self.client.get(reverse('api_health'))
+        self.assertEqual(response.json(), {'db': 'ok', 'brands_count': InsurerBrand.objects.count()})
+
+
+class QuoteWizardTests(PageTestCase):
+    ANSWERS = [
+        ('address', {'address': '708 Main Street, Houston'}),
+        ('coverage', {'coverage_tier': 'premium'}),
+        ('name', {'first_name': 'Ada', 'last_name': 'Lovelace'}),
+        ('email', {'email': 'ada@example.com'}),
+        ('phone', {'phone': '(713) 555-0100'}),
+    ]
+
+    def post(self, url_name, step, data):
+        return self.client.post(f'{reverse(url_name)}?step={step}', data)
+
+    def complete(self, url_name='start_auto'):
+        for step, data in self.ANSWERS:
+            response = self.post(url_name, step, data)
+        return response
+
+    def test_complete_flow_saves_one_lead_without_sessions(self):
+        for step, data in self.ANSWERS:
+            # The lead's update_or_create: a SELECT and an INSERT, in savepoints
+            with self.assertNumQueries(6 if step == 'phone' else 0):
+                response = self.post('start_auto', step, data)
+            self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(f"{reverse('start_auto')}?step=quotes&lead="))
+        self.assertNotIn('sessionid', self.client.cookies)
+        lead = QuoteLead.objects.get()
+        self.assertEqual((lead.product, lead.first_name, lead.email), ('auto', 'Ada', 'ada@example.com'))
+        self.assertEqual(lead.answers['address'], '708 Main Street, Houston')
+        self.assertEqual(self.client.get(response['Location']).status_code, 200)
+
+    def test_answers_stay_on_the_server(self):
+        self.post('start', 'address', {'address': '708 Main Street, Houston'})
+        cookie = self.client.cookies[WIZARDS['home'].cookie_name].value
+        self.assertRegex(cookie, r'^[A-Za-z0-9_-]{32}$')
+        self.assertEqual(self.client.get(f"{reverse('start')}?step=coverage").context['wizard']['address'], '708 Main Street, Houston')
+
+    def test_finishing_clears_the_answers(self):
+        flow = WIZARDS['auto']
+        self.post('start_auto', 'address', {'address': '708 Main Street, Houston'})
+        run_id = self.client.cookies[flow.cookie_name].value
+        response = self.complete()
+        self.assertEqual(response.cookies[flow.cookie_name].value, '')
+        self.assertIsNone(caches[wizard.STATE_CACHE].get(flow._state_key(run_id)))
+        # Another trip back to an earlier step starts over
+        response = self.client.get(f"{reverse('start_auto')}?step=email")
+        self.assertRedirects(response, f"{reverse('start_auto')}?step=address", fetch_redirect_response=False)
+
+    def test_resubmitted_last_step_keeps_one_lead(self):
+        self.complete()
+        self.assertEqual(QuoteLead.objects.count(), 1)
+        # A second POST of the phone step from the same run (e.g. a double
+        # click) arrives with the run's cookie before the first one cleared it
+        lead = QuoteLead.objects.get()
+        flow = WIZARDS['auto']
+        self.client.cookies[flow.cookie_name] = lead.run_id
+        caches[wizard.STATE_CACHE].set(flow._state_key(lead.run_id), dict(lead.answers))
+        self.post('start_auto', 'phone', {'phone': '(713) 555-0199'})
+        lead = QuoteLead.objects.get()
+        self.assertEqual(lead.phone, '(713) 555-0199')
+
+    def test_blank_answers_are_accepted(self):
+        for step, data in self.ANSWERS:
+            response = self.post('start', step, {field: '' for field in data})
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(QuoteLead.objects.get().email, '')
+
+    def test_invalid_step_is_shown_again(self):
+        self.post('start', 'address', {'address': '1 Main St'})
+        self.post('start', 'coverage', {'coverage_tier': 'basic'})
+        self.post('start', 'name', {'first_name': 'Ada', 'last_name': ''})
+        response = self.post('start', 'email', {'email': 'ada@'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['step'], 'email')
+        self.assertIn('email', response.context['form'].errors)
+        self.assertEqual(response.context['wizard']['first_name'], 'Ada')
+
+    def test_coverage_tier_prices_the_quotes(self):
+        QuoteOffer.objects.all().delete()
+        offer = QuoteOffer.objects.create(title='Tiered', base_premium=100)
+        QuoteOfferFactor.objects.create(offer=offer, kind=QuoteOfferFactor.TIER, key='premium', multiplier='1.5')
+        response = self.client.get(self.complete()['Location'])
+        self.assertEqual(QuoteLead.objects.get().answers['coverage_tier'], 'premium')
+        self.assertEqual([o.estimate for o in response.context['offers']], [Decimal('150.00')])
+
+    def test_skipped_steps_redirect_back(self):
+        response = self.post('start', 'phone', {'phone': '(713) 555-0100'})
+        self.assertRedirects(response, f"{reverse('start')}?step=address", fetch_redirect_response=False)
+        self.assertFalse(QuoteLead.objects.exists())
+
+    def test_unknown_run_or_lead_is_ignored(self):
+        self.client.cookies[WIZARDS['home'].cookie_name] = 'x' * 32
+        response = self.client.get(f"{reverse('start')}?step=name")
+        self.assertRedirects(response, f"{reverse('start')}?step=address", fetch_redirect_response=False)
+        response = self.client.get(f"{reverse('start')}?step=quotes&lead=1")
+        self.assertRedirects(response, f"{reverse('start')}?step=address", fetch_redirect_response=False)
+
+    def test_reset_clears_answers(self):
+        self.post('start', 'address', {'address': '1 Main St'})
+        run_id = self.client.cookies[WIZARDS['home'].cookie_name].value
+        response = self.post('start', 'reset', {})
+        self.assertRedirects(response, reverse('start'), fetch_redirect_response=False)
+        self.assertEqual(response.cookies[WIZARDS['home'].cookie_name].value, '')
+        self.assertIsNone(caches[wizard.STATE_CACHE].get(WIZARDS['home']._state_key(run_id)))
+
+
+class QuotePricingTests(PageTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        QuoteOffer.objects.all().delete()
+        cls.good = InsurerBrand.objects.create(name='Good Mutual', rating=5, complaint_score=0.5)
+        cls.poor = InsurerBrand.objects.create(name='Poor Casualty', rating=2, complaint_score=2.0)
+
+    def offer(self, title, base, brand=None, **factors):
+        offer = QuoteOffer.objects.create(title=title, base_premium=base)
+        if brand:
+            offer.brands.add(brand)
+        for kind, values in factors.items():
+            for key, multiplier in values.items():
+                QuoteOfferFactor.objects.create(offer=offer, kind=kind, key=key, multiplier=multiplier)
+        return offer
+
+    def ranked(self, product='home', zip_code='', tier='standard'):
+        profile = quote_pricing.Profile(product, zip_code, tier)
+        return [(offer.title, offer.estimate) for offer in quote_pricing.top_offers(profile)]
+
+    def test_factors(self):
+        self.offer('A', 100, product={'home': '1.2'}, zip={'77': '2', '770': '0.5'}, tier={'premium': '1.5'})
+        self.offer('B', 80, product={'auto': '1'})
+        self.assertEqual(self.ranked(), [('A', Decimal('120.00'))])
+        self.assertEqual(self.ranked(zip_code='77005'), [('A', Decimal('60.00'))])
+        self.assertEqual(self.ranked(zip_code='77305', tier='premium'), [('A', Decimal('360.00'))])
+        self.assertEqual(self.ranked('auto'), [('B', Decimal('80.00'))])
+
+    def test_ties_break_on_rating_then_complaints(self):
+        self.offer('Poor', 100, self.poor)
+        self.offer('Good', 100, self.good)
+        self.offer('Cheap', 90)
+        QuoteOffer.objects.create(title='Unpriced', premium='Call us')
+        self.assertEqual([title for title, _ in self.ranked()], ['Cheap', 'Good', 'Poor', 'Unpriced'])
+
+    def test_saving_a_factor_rebuilds_the_table(self):
+        offer = self.offer('A', 100)
+        self.assertEqual(self.ranked(), [('A', Decimal('100.00'))])
+        with self.captureOnCommitCallbacks(execute=True):
+            QuoteOfferFactor.objects.create(offer=offer, kind=QuoteOfferFactor.TIER, key='standard', multiplier='1.1')
+        self.assertEqual(self.ranked(), [('A', Decimal('110.00'))])
+
+    def test_lists_every_offer(self):
+        for n in range(12):
+            self.offer(f'Offer {n}', 100 + n)
+        self.assertEqual(len(self.ranked()), 12)
+        self.assertEqual(len(quote_pricing.top_offers(quote_pricing.Profile('home'), limit=3)), 3)
+
+    def test_profile_from_answers(self):
+        profile = quote_pricing.Profile.from_answers('auto', {'address': '708 Main St, Houston, TX 77002-1234'})
+        self.assertEqual((profile.product, profile.zip_code, profile.tier), ('auto', '77002', 'standard'))
+
+
+class BrandIndexTests(PageTestCase):
+    def test_renames_reindex_after_commit(self):
+        brand = InsurerBrand.objects.create(name='Lone Star Mutual')
+        post = BlogPost.objects.create(title='Acme Casualty review', content='x')
+        with mock.patch.object(brand_index, 'index_brand', wraps=brand_index.index_brand) as index:
+            with self.captureOnCommitCallbacks(execute=True):
+                brand.ranking = 3
+                brand.save()
+            index.assert_not_called()
+            with self.captureOnCommitCallbacks(execute=True):
+                brand.name = 'Acme Casualty'
+                brand.save()
+                index.assert_not_called()
+            index.assert_called_once_with(brand)
+        self.assertEqual(list(BrandMention.objects.filter(brand=brand).values_list('post_id', flat=True)), [post.pk])
+
+
+class CacheInvalidationTests(PageTestCase):
+    def test_generations_bump_only_on_commit(self):
+        before = content_cache.generation(content_cache.PAGES)
+        with self.captureOnCommitCallbacks() as callbacks:
+            BlogPost.objects.create(title='Bump', content='x')
+            offer = QuoteOffer.objects.create(title='Offer')
+            offer.brands.add(InsurerBrand.objects.create(name='Brand'))
+            self.assertEqual(content_cache.generation(content_cache.PAGES), before)
+        quotes = content_cache.generation(content_cache.QUOTES)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(content_cache.generation(content_cache.PAGES), before)
+        self.assertGreater(content_cache.generation(content_cache.QUOTES), quotes)
+
+    def test_rebuilds_bump_pages(self):
+        for rebuild in (brand_index.rebuild_all, related.rebuild_all):
+            before = content_cache.generation(content_cache.PAGES)
+            with self.captureOnCommitCallbacks(execute=True):
+                rebuild()
+            self.assertGreater(content_cache.generation(content_cache.PAGES), before)
+
+
+class PageCacheTests(PageTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = BlogPost.objects.create(title='Cached post', content='<p>Body</p>')
+
+    def get(self, **headers):
+        return self.client.get(reverse('blog_detail', args=[self.post.slug]), headers=headers)
+
+    def test_anonymous_pages_are_cached(self):
+        first, second = self.get(), self.get()
+        self.assertEqual((first['X-Page-Cache'], second['X-Page-Cache']), ('miss', 'hit'))
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(first.content, second.content)
+
+    def test_session_csrf_and_messages_cookies_skip_the_cache(self):
+        for name in (settings.SESSION_COOKIE_NAME, settings.CSRF_COOKIE_NAME, 'messages'):
+            with self.subTest(cookie=name):
+                self.client.cookies.clear()
+                self.client.cookies[name] = 'x'
+                response = self.get()
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('X-Page-Cache', response)
+                self.assertNotIn('ETag', response)
+
+    def test_other_hosts_are_not_cached(self):
+        with override_settings(ALLOWED_HOSTS=['*']):
+            response = self.client.get(reverse('blog_detail', args=[self.post.slug]), HTTP_HOST='attacker.example')
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('X-Page-Cache', response)
+        with override_settings(ALLOWED_HOSTS=['*'], STATIC_SITE_BASE_URL='https://testserver'):
+            self.assertEqual(self.get()['X-Page-Cache'], 'miss')
+
+    def test_matching_if_none_match_is_not_modified(self):
+        etag = self.get()['ETag']
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.get(if_none_match='"stale"').status_code, 200)
+
+    def test_saving_content_changes_the_etag(self):
+        before = self.get()
+        listing = self.client.get(reverse('blog_list'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Renamed post'
+            self.post.save()
+        after = self.get(if_none_match=before['ETag'])
+        self.assertEqual((after.status_code, after['X-Page-Cache']), (200, 'miss'))
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        self.assertContains(after, 'Renamed post')
+        # The list has no row timestamp; only the PAGES generation moved
+        listing_after = self.client.get(reverse('blog_list'), headers={'if_none_match': listing['ETag']})
+        self.assertEqual((listing_after.status_code, listing_after['X-Page-Cache']), (200, 'miss'))
+        self.assertContains(listing_after, 'Renamed post')
+
+
+class PaginationTests(PageTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.posts = [BlogPost.objects.create(title=f'Paged {i}', content='x') for i in range(5)]
+
+    def page(self, **params):
+        request = RequestFactory().get('/blog/', params)
+        return KeysetPaginator(BlogPost.objects.all(), 2).get_page(request)
+
+    def titles(self, page):
+        return [post.title for post in page]
+
+    def test_cursor_round_trip(self):
+        published_at = self.posts[0].published_at
+        token = pagination.encode_cursor('n', 3, published_at, 7)
+        self.assertEqual(pagination.decode_cursor(token), ('n', 3, published_at, 7))
+
+    def test_cursor_tokens_are_stable(self):
+        published_at = self.posts[0].published_at
+        self.assertEqual(pagination.encode_cursor('n', 3, published_at, 7), pagination.encode_cursor('n', 3, published_at, 7))
+        self.assertEqual(self.page().next_cursor, self.page().next_cursor)
+
+    def test_tampered_cursors_are_ignored(self):
+        token = pagination.encode_cursor('n', 2, self.posts[0].published_at, self.posts[0].pk)
+        forged = signing.Signer().sign_object(['n', 99, self.posts[0].published_at.isoformat(), self.posts[0].pk])
+        for bad in (token[:-1] + ('A' if token[-1] != 'A' else 'B'), forged, 'garbage'):
+            with self.subTest(token=bad):
+                self.assertIsNone(pagination.decode_cursor(bad))
+                page = self.page(cursor=bad)
+                self.assertEqual((page.number, self.titles(page)), (1, ['Paged 4', 'Paged 3']))
+
+    def test_cursors_walk_forward_and_back(self):
+        first = self.page()
+        second = self.page(cursor=first.next_cursor)
+        third = self.page(cursor=second.next_cursor)
+        self.assertEqual([self.titles(p) for p in (first, second, third)],
+                         [['Paged 4', 'Paged 3'], ['Paged 2', 'Paged 1'], ['Paged 0']])
+        self.assertEqual((third.number, third.has_next(), third.next_cursor), (3, False, ''))
+        back = self.page(cursor=third.previous_cursor)
+        self.assertEqual((back.number, self.titles(back)), (2, ['Paged 2', 'Paged 1']))
+
+    def test_offset_fallback(self):
+        self.assertEqual(self.titles(self.page(page=2)), ['Paged 2', 'Paged 1'])
+        self.assertEqual(self.page(page=9).number, 3)
+        self.assertEqual(self.page(page='x').number, 1)
+
+    def test_deep_offset_pages_404(self):
+        with self.assertRaises(Http404):
+            self.page(page=pagination.MAX_OFFSET_PAGE + 1)
+        response = self.client.get(reverse('blog_list'), {'page': pagination.MAX_OFFSET_PAGE + 1})
+        self.assertEqual(response.status_code, 404)
+
+
+class SlugTests(TestCase):
+    def test_collisions_get_the_lowest_free_suffix(self):
+        Page.objects.create(title='Same thing', content='x')
+        slugs = [Page.objects.create(title='Same', content='x').slug for _ in range(3)]
+        self.assertEqual(slugs, ['same', 'same-1', 'same-2'])
+        Page.objects.filter(slug='same-1').delete()
+        self.assertEqual(Page.objects.create(title='Same', content='x').slug, 'same-1')
+
+    def test_batches_are_unique_against_each_other(self):
+        Page.objects.create(title='Batch', content='x')
+        self.assertEqual(allocate_slugs(Page, ['Batch', 'Batch', 'Other']), ['batch-1', 'batch-2', 'other'])
+
+    def test_long_titles_leave_room_for_a_suffix(self):
+        max_length = Page._meta.get_field('slug').max_length
+        title = 'word ' * 20  # 100 characters
+        first, second = (Page.objects.create(title=title, content='x') for _ in range(2))
+        self.assertLessEqual(len(first.slug), max_length - models.SLUG_SUFFIX_ROOM)
+        self.assertFalse(first.slug.endswith('-'))
+        self.assertEqual(second.slug, f'{first.slug}-1')
+        self.assertLessEqual(len(second.slug), max_length)
+
+    def test_save_retries_after_losing_a_slug_race(self):
+        Page.objects.create(title='Raced', content='x')
+        real = models.generate_unique_slug
+        # The first allocation returns a slug another save has just taken
+        allocations = iter([lambda instance, source: 'raced', real])
+        with mock.patch('main.models.generate_unique_slug', side_effect=lambda *args: next(allocations)(*args)) as allocate:
+            page = Page.objects.create(title='Raced', content='x')
+        self.assertEqual(page.slug, 'raced-1')
+        self.assertEqual(allocate.call_count, 2)
+
+
+class RelatedPostsTests(PageTestCase):
+    WORDS = ['flood', 'storm', 'roof', 'hail', 'auto', 'collision', 'renters', 'deductible', 'premium', 'claims']
+
+    @classmethod
+    def setUpTestData(cls):
+        home = BlogCategory.objects.create(name='Related home')
+        roof = BlogCategory.objects.create(name='Related roof', parent=home)
+        auto = BlogCategory.objects.create(name='Related auto')
+        categories = [home, roof, auto, None]
+        cls.posts = [
+            BlogPost.objects.create(
+                title=f'{cls.WORDS[i % 10]} {cls.WORDS[(i * 3) % 10]} guide',
+                content=' '.join(cls.WORDS[(i + j) % 10] for j in range(i % 4 + 2)),
+                category=categories[i % 4],
+            )
+            for i in range(13)
+        ]
+        BlogPost.objects.create(title='Flood draft', content='flood storm', is_published=False)
+
+    def expected(self, limit):
+        posts, counts = related._load(related._published())
+        matrix = related._vectorize(counts)
+        cats, roots = related._category_arrays(posts)
+        scores = 0.7 * (matrix @ matrix.T) + 0.3 * related._affinity(cats, roots, cats, roots)
+        np.fill_diagonal(scores, -np.inf)
+        best = related._top_k(scores, limit)
+        return {
+            (posts[row].pk, posts[col].pk, rank): scores[row, col]
+            for row, columns in enumerate(best) for rank, col in enumerate(columns)
+        }
+
+    def test_blocked_sparse_rebuild_matches_dense_scoring(self):
+        with mock.patch.object(related, 'BLOCK_SIZE', 3), mock.patch.object(related, 'CANDIDATE_BLOCK_SIZE', 5):
+            written = related.rebuild_all(limit=4, category_weight=0.3)
+        expected = self.expected(4)
+        rows = {(r.post_id, r.related_post_id, r.rank): r.score for r in RelatedPost.objects.all()}
+        self.assertEqual(written, len(expected))
+        self.assertEqual(rows.keys(), expected.keys())
+        for key, score in expected.items():
+            self.assertAlmostEqual(rows[key], score, places=5)
+
+    def test_small_archives_never_relate_a_post_to_itself(self):
+        BlogPost.objects.exclude(pk__in=[p.pk for p in self.posts[:2]]).delete()
+        self.assertEqual(related.rebuild_all(), 2)
+        self.assertFalse(RelatedPost.objects.filter(post=F('related_post')).exists())
+
+    def assertListsIntact(self, limit):
+        ranks = {}
+        for post_id, rank in RelatedPost.objects.values_list('post_id', 'rank'):
+            ranks.setdefault(post_id, []).append(rank)
+        for post_id, post_ranks in ranks.items():
+            self.assertEqual(sorted(post_ranks), list(range(min(limit, len(self.posts) - 1))), post_id)
+
+    def test_update_keeps_the_post_in_lists_outside_the_pool(self):
+        related.rebuild_all(limit=4)
+        post = BlogPost.objects.select_related('category').get(pk=self.posts[0].pk)
+        listed_by = set(RelatedPost.objects.filter(related_post=post).values_list('post_id', flat=True))
+        related.update_for_post(post, limit=4, pool_size=1)
+        self.assertEqual(set(RelatedPost.objects.filter(related_post=post).values_list('post_id', flat=True)), listed_by)
+        self.assertListsIntact(4)
+
+    def test_unpublishing_closes_the_gaps(self):
+        related.rebuild_all(limit=4)
+        post = BlogPost.objects.get(pk=self.posts[0].pk)
+        post.is_published = False
+        related.update_for_post(post, limit=4)
+        self.assertFalse(RelatedPost.objects.filter(Q(post=post) | Q(related_post=post)).exists())
+        ranks = {}
+        for post_id, rank in RelatedPost.objects.values_list('post_id', 'rank'):
+            ranks.setdefault(post_id, []).append(rank)
+        self.assertTrue(all(sorted(r) == list(range(len(r))) for r in ranks.values()))
+
+    def test_concurrent_update_is_retried(self):
+        related.rebuild_all(limit=4)
+        post = BlogPost.objects.select_related('category').get(pk=self.posts[0].pk)
+        bulk_create = RelatedPost.objects.bulk_create
+        with mock.patch.object(RelatedPost.objects, 'bulk_create', wraps=bulk_create,
+                               side_effect=[IntegrityError('rank taken'), mock.DEFAULT]) as create:
+            related.update_for_post(post, limit=4)
+        self.assertEqual(create.call_count, 2)
+        self.assertListsIntact(4)
+
+    def test_only_relevant_saves_update_after_commit(self):
+        post = BlogPost.objects.get(pk=self.posts[0].pk)
+        with mock.patch.object(related, 'update_for_post') as update:
+            with self.captureOnCommitCallbacks(execute=True):
+                post.meta_title = 'SEO only'
+                post.save()
+            update.assert_not_called()
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                post.content = 'hail hail hail'
+                post.save()
+                update.assert_not_called()
+            self.assertEqual(len(callbacks), 2)  # the related update and the cache bump
+            update.assert_called_once_with(post)
+
+
+class ContentIOTests(PageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.brand = InsurerBrand.objects.create(name='Lone Star Mutual')
+        parent = BlogCategory.objects.create(name='Insurance')
+        child = BlogCategory.objects.create(name='Home insurance', parent=parent)
+        BlogPost.objects.create(
+            title='Storm claims', category=child, excerpt='Claims after a storm',
+            content='<p>Lone Star Mutual pays storm claims fast.</p>',
+        )
+        BlogPost.objects.create(title='Storm draft', category=parent, content='<p>Storm claims</p>', is_published=False)
+
+    def export(self, record_type, writer=content_io.write_jsonl):
+        stream = io.StringIO()
+        writer(stream, record_type, content_io.export_records(record_type))
+        return stream.getvalue()
+
+    def snapshot(self):
+        return {record_type: list(content_io.export_records(record_type)) for record_type in content_io.TYPES}
+
+    def test_jsonl_round_trip(self):
+        before = self.snapshot()
+        dump = ''.join(self.export(record_type) for record_type in content_io.TYPES)
+        BlogPost.objects.all().delete()
+        BlogCategory.objects.all().delete()
+        counts = content_io.ContentImporter(batch_size=1).run(content_io.read_jsonl(io.StringIO(dump)))
+        self.assertEqual(counts, {record_type: len(rows) for record_type, rows in before.items()})
+        self.assertEqual(self.snapshot(), before)
+        child = BlogCategory.objects.get(slug='home-insurance')
+        self.assertEqual(child.path, f'{child.parent_id}/{child.pk}/')
+
+    def test_csv_round_trip_updates_in_place(self):
+        before = self.snapshot()[content_io.POST]
+        dump = self.export(content_io.POST, content_io.write_csv)
+        importer = content_io.ContentImporter(update=True)
+        importer.run(content_io.read_csv(io.StringIO(dump), content_io.POST))
+        self.assertEqual(BlogPost.objects.count(), 2)
+        self.assertEqual(self.snapshot()[content_io.POST], before)
+
+    def test_import_refreshes_derived_data(self):
+        RelatedPost.objects.all().delete()
+        records = [
+            ('post', {'title': 'Hail claims', 'content': '<p>Lone Star Mutual storm claims for hail.</p>'}),
+        ]
+        content_io.ContentImporter().run(records)
+        post = BlogPost.objects.get(slug='hail-claims')
+        self.assertEqual(list(post.brand_mentions.values_list('brand', flat=True)), [self.brand.pk])
+        self.assertTrue(RelatedPost.objects.filter(post=post).exists())
+        if search._backend() == 'fts5':
+            self.assertIn(post, list(search.search_posts('hail')))
+
+    def test_invalid_rows(self):
+        cases = [
+            ('{"type": "comment", "title": "x"}\n', ValueError),
+            ('{"type": "post", "title": "x", "content": "", "is_published": true, "published_at": "not a date"}\n', ValueError),
+            ('{"type": "gallery_image", "post": "missing", "image": "x.jpg"}\n', ValueError),
+            ('{"type": "category", "name": "x", "home_sort_order": "first"}\n', ValueError),
+            ('{"type": "post", "content": "no title"}\n', KeyError),
+        ]
+        for line, error in cases:
+            with self.subTest(line=line), self.assertRaises(error):
+                content_io.ContentImporter().run(content_io.read_jsonl(io.StringIO(line)))
+
+
+class StaticSiteTests(PageTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(10):
+            BlogPost.objects.create(title=f'Static {i}', content='x')
+
+    def setUp(self):
+        super().setUp()
+        output = tempfile.TemporaryDirectory()
+        self.addCleanup(output.cleanup)
+        self.output = Path(output.name)
+        self.serving = override_settings(STATIC_SITE_SERVE=True, STATIC_SITE_ROOT=self.output)
+
+    def build(self, **kwargs):
+        return static_site.build(self.output, workers=1, **kwargs)
+
+    def test_rendered_pages_are_served_without_the_views(self):
+        self.build()
+        self.assertTrue((self.output / 'blog' / 'index.html').exists())
+        with self.serving, self.assertNumQueries(0):
+            response = self.client.get('/blog/')
+        self.assertEqual((response.status_code, response['X-Static-Site']), (200, 'hit'))
+        self.assertContains(response, 'Static 9')
+        with self.serving:
+            self.assertEqual(self.client.get('/blog/', headers={'if_none_match': response['ETag']}).status_code, 304)
+
+    def test_query_strings_and_sessions_reach_the_views(self):
+        self.build()
+        with self.serving:
+            for params in ({'page': 2}, {'cursor': 'x'}, {'utm_source': 'mail'}):
+                with self.subTest(params=params):
+                    self.assertNotIn('X-Static-Site', self.client.get('/blog/', params))
+            self.client.cookies[settings.SESSION_COOKIE_NAME] = 'x'
+            self.assertNotIn('X-Static-Site', self.client.get('/blog/'))
+
+    def test_new_files_are_served_without_a_restart(self):
+        with self.serving:
+            self.assertNotIn('X-Static-Site', self.client.get('/blog/'))
+            self.build()
+            self.assertEqual(self.client.get('/blog/')['X-Static-Site'], 'hit')
+
+    def test_rendering_never_reads_back_the_served_output(self):
+        self.build()
+        index = self.output / 'blog' / 'index.html'
+        index.write_text('stale')
+        with self.serving:
+            self.build(full=True)
+        self.assertIn('Static 9', index.read_text())
+
+    def test_paths_outside_the_root_are_not_served(self):
+        (self.output / 'secret').mkdir()
+        (self.output / 'secret' / 'index.html').write_text('nope')
+        with self.serving, override_settings(STATIC_SITE_ROOT=self.output / 'site'):
+            self.assertNotIn('X-Static-Site', self.client.get('/../secret/'))
+
+
+class CategoryTreeTests(PageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.a = BlogCategory.objects.create(name='Tree A')
+        self.b = BlogCategory.objects.create(name='Tree B', parent=self.a)
+        self.c = BlogCategory.objects.create(name='Tree C', parent=self.b)
+        self.d = BlogCategory.objects.create(name='Tree D')
+
+    def stored(self, category):
+        return BlogCategory.objects.values_list('path', 'depth').get(pk=category.pk)
+
+    def test_paths(self):
+        self.assertEqual(self.stored(self.c), (f'{self.a.pk}/{self.b.pk}/{self.c.pk}/', 2))
+
+    def test_move_rewrites_subtree(self):
+        self.b.parent = self.d
+        self.b.save()
+        self.assertEqual(self.stored(self.c), (f'{self.d.pk}/{self.b.pk}/{self.c.pk}/', 2))
+
+    def test_move_with_stale_instance(self):
+        stale_b = BlogCategory.objects.get(pk=self.b.pk)
+        self.a.parent = self.d
+        self.a.save()
+        stale_b.parent = None
+        stale_b.save()
+        self.assertEqual(self.stored(self.b), (f'{self.b.pk}/', 0))
+        self.assertEqual(self.stored(self.c), (f'{self.b.pk}/{self.c.pk}/', 1))
+
+    def test_cycles_are_rejected(self):
+        self.a.parent = self.c
+        with self.assertRaises(ValidationError):
+            self.a.clean()
+        with self.assertRaises(ValidationError):
+            self.a.save()
+        self.assertEqual(self.stored(self.a), (f'{self.a.pk}/', 0))
+
+    def test_descendants(self):
+        descendants = self.a.get_descendants()
+        self.assertIsInstance(descendants, QuerySet)
+        self.assertEqual(list(descendants), [self.b, self.c])
+        self.assertEqual(list(self.c.get_descendants()), [])
+
+    def test_family_posts_cover_the_subtree(self):
+        post = BlogPost.objects.create(title='Deep post', content='x', category=self.c)
+        BlogPost.objects.create(title='Elsewhere', content='x', category=self.d)
+        self.assertEqual(list(self.a.get_family_posts()), [post])
+        self.assertEqual(BlogCategory.get_family_posts_for([self.a, self.b, self.d])[self.b.pk], [post])
+
+    def test_labels_need_no_query_per_category(self):
+        self.assertEqual(str(self.c), 'Tree A -> Tree B -> Tree C')
+        categories = list(BlogCategory.objects.filter(pk__in=[self.b.pk, self.c.pk]))
+        with self.assertNumQueries(0):
+            [str(category) for category in categories]
+
+
+class SearchTests(PageTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.flood = BlogPost.objects.create(
+            title='Flood coverage explained', excerpt='What a flood policy pays for',
+            content='<p>Fish &amp; chips &mdash; the <b>deductible</b>&nbsp;matters.</p>',
+        )
+        cls.body = BlogPost.objects.create(title='Storm season', content='<p>Buy flood insurance early.</p>')
+        cls.draft = BlogPost.objects.create(title='Flood draft', content='x', is_published=False)
+
+    def setUp(self):
+        super().setUp()
+        if search._backend() != 'fts5':
+            self.skipTest('SQLite without FTS5')
+
+    def titles(self, query):
+        return [post.title for post in search.search_posts(query)[:10]]
+
+    def fts_row(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT title, excerpt, body FROM {search.FTS_TABLE} WHERE rowid = %s', [post.pk])
+            return cursor.fetchone()
+
+    def test_html_and_entities_are_stripped(self):
+        self.assertEqual(self.fts_row(self.flood)[2], 'Fish & chips — the deductible matters.')
+        self.assertEqual(self.titles('chips'), ['Flood coverage explained'])
+        self.assertEqual(self.titles('amp'), [])
+
+    def test_ranking_prefix_and_drafts(self):
+        self.assertEqual(self.titles('flood'), ['Flood coverage explained', 'Storm season'])
+        self.assertEqual(self.titles('deduct'), ['Flood coverage explained'])
+        self.assertEqual(search.search_posts('flood').count(), 2)
+
+    def test_save_and_delete_keep_the_index_in_sync(self):
+        self.body.title = 'Hurricane season'
+        self.body.save()
+        self.assertEqual(self.titles('hurricane'), ['Hurricane season'])
+        self.body.delete()
+        self.assertEqual(self.titles('hurricane'), [])
+
+    def test_backfill_matches_indexing_on_save(self):
+        saved = self.fts_row(self.flood)
+        search.rebuild_index()
+        self.assertEqual(self.fts_row(self.flood), saved)
+
+    def test_migration_backfill_matches_indexing_on_save(self):
+        migration = importlib.import_module('main.migrations.0032_blogpost_search_index')
+        saved = self.fts_row(self.flood)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        migration.backfill_fts(BlogPost, connection)
+        self.assertEqual(self.fts_row(self.flood), saved)
+
+    def test_index_posts_is_one_statement_per_batch(self):
+        posts = list(BlogPost.objects.all())
+        with self.assertNumQueries(2):
+            search.index_posts(posts)
+
+    def test_admin_search(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(user)
+        response = self.client.get(reverse('admin:blog_blogpost_changelist'), {'q': 'chips'})
+        self.assertEqual(list(response.context['cl'].result_list), [BlogPost.objects.get(pk=self.flood.pk)])
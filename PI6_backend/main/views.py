@@ -1,15 +1,20 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.core.paginator import Paginator
 from django.contrib import messages
-from django.db.models import Q
-from django.core.cache import cache
-from .models import Page, BlogPost, BlogCategory, InsurerBrand, QuoteOffer
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils.crypto import constant_time_compare
+from django.conf import settings
+from .models import Page, BlogPost, BlogCategory, InsurerBrand
 from .forms import ContactForm
+from . import content_cache, health, metrics, placeholders, quote_pricing, related, search, wizard
+from .page_cache import cache_anonymous_page
+from .pagination import KeysetPaginator
 
 # Create your views here.
 def home(request):
-    featured_categories = cache.get('home_featured_categories')
+    featured_categories = content_cache.get(content_cache.HOME, 'home_featured_categories')
     if featured_categories is None:
         try:
             featured_categories = list(
@@ -18,29 +23,36 @@ def home(request):
             )
         except Exception:
             featured_categories = []
-        cache.set('home_featured_categories', featured_categories, 300)
+        content_cache.set(content_cache.HOME, 'home_featured_categories', featured_categories)
     try:
-        brands = cache.get('home_brands')
+        brands = content_cache.get(content_cache.HOME, 'home_brands')
         if brands is None:
             brands_qs = InsurerBrand.objects.filter(is_active=True, show_on_home=True, ranking__gt=0)
             brands = sorted(list(brands_qs), key=lambda b: (b.ranking or 999999, b.name.lower()))
-            cache.set('home_brands', brands, 300)
+            content_cache.set(content_cache.HOME, 'home_brands', brands)
     except Exception:
         brands = []
     return render(request, 'home.html', {'featured_categories': featured_categories, 'brands': brands})
 
+def _page_updated_at(request, slug):
+    return Page.objects.filter(slug=slug, is_active=True).values_list('updated_at', flat=True).first()
+
+def _post_updated_at(request, slug):
+    return BlogPost.objects.filter(slug=slug, is_published=True).values_list('updated_at', flat=True).first()
+
+@cache_anonymous_page(last_modified=_page_updated_at)
 def page_detail(request, slug):
     page = get_object_or_404(Page, slug=slug, is_active=True)
     return render(request, 'page_detail.html', {'page': page})
 
+@cache_anonymous_page()
 def blog_list(request):
     posts_list = BlogPost.objects.filter(is_published=True).select_related('category').order_by('-published_at')
     # Get only top-level categories and prefetch subcategories
-    categories = BlogCategory.objects.filter(parent__isnull=True).prefetch_related('subcategories')
+    categories = BlogCategory.sidebar_categories()
     
-    paginator = Paginator(posts_list, 9) # Show 9 posts per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(posts_list, 9) # Show 9 posts per page
+    page_obj = paginator.get_page(request)
     
     return render(request, 'blog/blog_list.html', {
         'page_obj': page_obj,
@@ -48,24 +60,21 @@ def blog_list(request):
         'title': 'Latest Articles'
     })
 
+@cache_anonymous_page()
 def blog_category_list(request, category_slug):
     category = get_object_or_404(BlogCategory, slug=category_slug)
     
-    # Get posts from this category AND all its sub-categories (recursive)
-    descendants = category.get_descendants()
-    category_ids = [category.id] + [c.id for c in descendants]
-    
+    # Get posts from this category AND all its sub-categories (materialized path)
     posts_list = BlogPost.objects.filter(
         is_published=True, 
-        category__id__in=category_ids
-    ).select_related('category').order_by('-published_at')
+        category__path__startswith=category.path
+    ).select_related('category')
     
     # Get only top-level categories and prefetch subcategories for sidebar
-    categories = BlogCategory.objects.filter(parent__isnull=True).prefetch_related('subcategories')
+    categories = BlogCategory.sidebar_categories()
     
-    paginator = Paginator(posts_list, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(posts_list, 9)
+    page_obj = paginator.get_page(request)
     
     return render(request, 'blog/blog_list.html', {
         'page_obj': page_obj,
@@ -74,27 +83,12 @@ def blog_category_list(request, category_slug):
         'title': category.name  # Just the name, or "All Products" if you prefer
     })
 
+@cache_anonymous_page(last_modified=_post_updated_at)
 def blog_detail(request, slug):
-    post = get_object_or_404(BlogPost, slug=slug, is_published=True)
-    
-    # 1. Primary Strategy: Same Category
-    same_category_posts = BlogPost.objects.filter(
-        category=post.category, 
-        is_published=True
-    ).exclude(id=post.id).select_related('category').order_by('-published_at')
-    
-    # 2. Secondary Strategy: Other Categories (Recent)
-    other_posts = BlogPost.objects.filter(
-        is_published=True
-    ).exclude(id=post.id).exclude(category=post.category).select_related('category').order_by('-published_at')
+    post = get_object_or_404(BlogPost.objects.select_related('category'), slug=slug, is_published=True)
     
-    # Combine results
-    # We want up to 8 posts total (3 for cards, 5 for links)
-    recommended_posts = list(same_category_posts[:8])
-    
-    if len(recommended_posts) < 8:
-        needed = 8 - len(recommended_posts)
-        recommended_posts.extend(list(other_posts[:needed]))
+    # Precomputed by main.related; up to 8 posts total (3 for cards, 5 for links)
+    recommended_posts = related.related_posts(post)
     
     related_posts = recommended_posts[:3]
     related_links = recommended_posts[3:8]
@@ -105,6 +99,44 @@ def blog_detail(request, slug):
         'related_links': related_links
     })
 
+def blog_search(request):
+    query = (request.GET.get('q') or '').strip()
+    results = search.search_posts(query)
+    categories = BlogCategory.sidebar_categories()
+    
+    paginator = Paginator(results, 9)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    
+    return render(request, 'blog/blog_list.html', {
+        'page_obj': page_obj,
+        'categories': categories,
+        'search_query': query,
+        'base_query': urlencode({'q': query}) if query else '',
+        'title': f'Search results for "{query}"' if query else 'Search Articles'
+    })
+
+def api_blog_search(request):
+    query = (request.GET.get('q') or '').strip()
+    paginator = Paginator(search.search_posts(query), 10)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    results = [{
+        'id': post.id,
+        'title': post.title,
+        'slug': post.slug,
+        'url': reverse('blog_detail', args=[post.slug]),
+        'excerpt': post.excerpt,
+        'category': post.category.name if post.category else None,
+        'published_at': post.published_at.isoformat(),
+    } for post in page_obj]
+    return JsonResponse({
+        'query': query,
+        'count': paginator.count,
+        'page': page_obj.number,
+        'num_pages': paginator.num_pages,
+        'results': results,
+    })
+
 def contact(request):
     if request.method == 'POST':
         form = ContactForm(request.POST)
@@ -119,80 +151,58 @@ def contact(request):
     
     return render(request, 'contact.html', {'form': form})
 
-def start(request):
-    # Simple session-based wizard
-    wizard = request.session.get('wizard', {})
-    step = request.GET.get('step') or request.POST.get('step') or 'address'
-    if request.method == 'POST':
-        if step == 'address':
-            wizard['address'] = (request.POST.get('address') or '').strip()
-            request.session['wizard'] = wizard
-            return redirect('/start/?step=name')
-        elif step == 'name':
-            wizard['first_name'] = (request.POST.get('first_name') or '').strip()
-            wizard['last_name'] = (request.POST.get('last_name') or '').strip()
-            request.session['wizard'] = wizard
-            return redirect('/start/?step=email')
-        elif step == 'email':
-            wizard['email'] = (request.POST.get('email') or '').strip()
-            request.session['wizard'] = wizard
-            return redirect('/start/?step=phone')
-        elif step == 'phone':
-            wizard['phone'] = (request.POST.get('phone') or '').strip()
-            request.session['wizard'] = wizard
-            return redirect('/start/?step=quotes')
-        elif step == 'reset':
-            request.session['wizard'] = {}
-            return redirect('/start/')
-    try:
-        brands = InsurerBrand.objects.filter(is_active=True, show_on_home=True).order_by('ranking', 'name')
-    except Exception:
-        brands = []
-    offers = []
-    if step == 'quotes':
-        try:
-            offers = QuoteOffer.objects.filter(is_active=True).order_by('order', 'id').prefetch_related('brands')
-        except Exception:
-            offers = []
-    return render(request, 'start.html', {'brands': brands, 'step': step, 'wizard': wizard, 'offers': offers, 'product': 'home'})
-
-def start_auto(request):
-    # Auto flow reusing the same wizard pattern
-    wizard = request.session.get('wizard_auto', {})
-    step = request.GET.get('step') or request.POST.get('step') or 'address'
-    if request.method == 'POST':
-        if step == 'address':
-            wizard['address'] = (request.POST.get('address') or '').strip()
-            request.session['wizard_auto'] = wizard
-            return redirect('/start-auto/?step=name')
-        elif step == 'name':
-            wizard['first_name'] = (request.POST.get('first_name') or '').strip()
-            wizard['last_name'] = (request.POST.get('last_name') or '').strip()
-            request.session['wizard_auto'] = wizard
-            return redirect('/start-auto/?step=email')
-        elif step == 'email':
-            wizard['email'] = (request.POST.get('email') or '').strip()
-            request.session['wizard_auto'] = wizard
-            return redirect('/start-auto/?step=phone')
-        elif step == 'phone':
-            wizard['phone'] = (request.POST.get('phone') or '').strip()
-            request.session['wizard_auto'] = wizard
-            return redirect('/start-auto/?step=quotes')
-        elif step == 'reset':
-            request.session['wizard_auto'] = {}
-            return redirect('/start-auto/')
-    try:
-        brands = InsurerBrand.objects.filter(is_active=True, show_on_home=True).order_by('ranking', 'name')
-    except Exception:
-        brands = []
+def quote_wizard(request, product):
+    flow = wizard.WIZARDS[product]
+    answers = flow.load(request)
+    requested = request.GET.get('step') or request.POST.get('step')
+    if request.method == 'POST' and requested == 'reset':
+        response = redirect(flow.url)
+        flow.clear(request, response)
+        return response
+    step = flow.step(requested)
+    lead = flow.finished_lead(request) if step.form_class is None else None
+    if lead is not None:
+        answers = lead.answers
+    else:
+        missing = flow.missing_step(step, answers)
+        if missing is not None:
+            return redirect(flow.step_url(missing))
+    form = None
+    values = answers
+    if step.form_class is not None:
+        form = step.form_class()
+        if request.method == 'POST':
+            form = step.form_class(request.POST)
+            # Re-shown with what was submitted if invalid
+            values = {**answers, **{field: request.POST.get(field, '') for field in step.fields}}
+            if form.is_valid():
+                answers.update(form.cleaned_data)
+                metrics.inc('pi6_wizard_steps_total', product=product, step=step.name)
+                next_step = flow.next_step(step, answers)
+                if next_step.form_class is None:
+                    # Finished: the answers now live only in the lead
+                    lead = flow.complete(answers, flow.run_id(request))
+                    response = redirect(flow.result_url(next_step, lead))
+                    flow.clear(request, response)
+                    return response
+                response = redirect(flow.step_url(next_step))
+                flow.save(request, response, answers)
+                return response
+    brands = InsurerBrand.objects.filter(is_active=True, show_on_home=True).order_by('ranking', 'name')
     offers = []
-    if step == 'quotes':
-        try:
-            offers = QuoteOffer.objects.filter(is_active=True).order_by('order', 'id').prefetch_related('brands')
-        except Exception:
-            offers = []
-    return render(request, 'start.html', {'brands': brands, 'step': step, 'wizard': wizard, 'offers': offers, 'product': 'auto'})
+    if step.form_class is None:
+        offers = quote_pricing.top_offers(quote_pricing.Profile.from_answers(product, answers))
+    return render(request, 'start.html', {
+        'flow': flow,
+        'brands': brands,
+        'step': step.name,
+        'form': form,
+        'wizard': values,
+        'offers': offers,
+        'product': product,
+    })
 
+@cache_anonymous_page()
 def companies(request):
     company_category = BlogCategory.objects.filter(slug='companies').first()
     if not company_category:
@@ -222,30 +232,26 @@ def companies(request):
     if category_slug:
         category = BlogCategory.objects.filter(slug=category_slug).first()
         if category:
-            descendants = category.get_descendants()
-            category_ids = [category.id] + [c.id for c in descendants]
             posts_list = BlogPost.objects.filter(
                 is_published=True,
-                category__id__in=category_ids
-            ).order_by('-published_at')
+                category__path__startswith=category.path
+            ).select_related('category').order_by('-published_at')
             selected_title = category.name
             base_query = f'category={category_slug}'
     elif brand_id:
         try:
             brand = InsurerBrand.objects.get(id=brand_id)
             posts_list = BlogPost.objects.filter(
-                is_published=True
-            ).filter(
-                Q(title__icontains=brand.name) | Q(content__icontains=brand.name)
-            ).order_by('-published_at')
+                is_published=True,
+                brand_mentions__brand=brand
+            ).select_related('category').order_by('-published_at', '-id')
             selected_title = brand.name
             base_query = f'brand={brand_id}'
         except InsurerBrand.DoesNotExist:
             pass
     if posts_list is not None:
-        paginator = Paginator(posts_list, 9)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        paginator = KeysetPaginator(posts_list, 9)
+        page_obj = paginator.get_page(request)
     return render(request, 'companies.html', {
         'brands': brands,
         'company_category': company_category,
@@ -258,23 +264,49 @@ def companies(request):
 def company_blogs(request, brand_id):
     brand = get_object_or_404(InsurerBrand, id=brand_id)
     posts_list = BlogPost.objects.filter(
-        is_published=True
-    ).select_related('category').filter(
-        Q(title__icontains=brand.name) | Q(content__icontains=brand.name)
-    ).order_by('-published_at')
-    categories = BlogCategory.objects.filter(parent__isnull=True).prefetch_related('subcategories')
-    paginator = Paginator(posts_list, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        is_published=True,
+        brand_mentions__brand=brand
+    ).select_related('category').order_by('-published_at', '-id')
+    categories = BlogCategory.sidebar_categories()
+    paginator = KeysetPaginator(posts_list, 9)
+    page_obj = paginator.get_page(request)
     return render(request, 'blog/blog_list.html', {
         'page_obj': page_obj,
         'categories': categories,
         'title': f'{brand.name} Articles'
     })
 
+def health_live(request):
+    response = JsonResponse({'status': 'ok'})
+    response['Cache-Control'] = 'no-store'
+    return response
+
+def health_ready(request):
+    report = health.readiness()
+    response = JsonResponse(dict(report, status='ok' if report['ok'] else 'unavailable'), status=200 if report['ok'] else 503)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+# The original health URL and payload, kept for existing monitors; probes
+# should use health_live / health_ready
 def api_health(request):
     try:
         count = InsurerBrand.objects.count()
         return JsonResponse({'db': 'ok', 'brands_count': count})
     except Exception:
         return JsonResponse({'db': 'error', 'brands_count': 0})
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    response = HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    response['Cache-Control'] = 'no-store'
+    return response
+
+def placeholder_image(request, version, theme, lock):
+    if version != placeholders.VERSION or theme not in placeholders.THEMES or not 1 <= lock <= placeholders.VARIANTS:
+        raise Http404("Unknown placeholder")
+    response = HttpResponse(placeholders.get_image(theme, lock), content_type='image/svg+xml')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
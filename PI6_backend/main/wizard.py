@@ -0,0 +1,176 @@
+"""
+Declarative quote wizards (served by main.views.quote_wizard).
+
+A Wizard is a list of Steps for one product. A step with a form collects
+answers; the first step without one (the quotes page) is where the wizard
+ends. Which step follows another is the next one in the list unless the
+step names it, either directly or through a function of the answers so far.
+
+Answers live in the shared cache under a random run id; the browser only
+holds that id, in a cookie scoped to the wizard's URL. Stepping through
+costs no database or session writes. Submitting the last form step saves
+the run's QuoteLead (once per run, however often it is resubmitted), drops
+the answers and the cookie, and sends the browser to the quotes page with
+a signed reference to the lead. Adding a product is one WIZARDS entry and
+one URL pattern.
+"""
+import re
+import secrets
+
+from django.core import signing
+from django.core.cache import caches
+from django.urls import reverse
+
+from .forms import AddressStepForm, CoverageStepForm, EmailStepForm, NameStepForm, PhoneStepForm
+from .models import QuoteLead
+
+STATE_CACHE = 'shared'
+STATE_TIMEOUT = 24 * 60 * 60
+LEAD_SALT = 'main.wizard.lead'
+LEAD_FIELDS = ('first_name', 'last_name', 'email', 'phone', 'address')
+
+_RUN_ID_RE = re.compile(r'[A-Za-z0-9_-]{32}')
+
+
+class Step:
+    def __init__(self, name, label, form_class=None, next=None):
+        self.name = name
+        self.label = label
+        self.form_class = form_class
+        # Name of the following step, or a callable(answers) returning one;
+        # None means the next step in the wizard's list
+        self.next = next
+
+    @property
+    def fields(self):
+        return tuple(self.form_class.base_fields) if self.form_class else ()
+
+
+class Wizard:
+    def __init__(self, product, title, url_name, steps):
+        self.product = product
+        self.title = title
+        self.url_name = url_name
+        self.steps = steps
+        self._by_name = {step.name: step for step in steps}
+
+    @property
+    def first(self):
+        return self.steps[0]
+
+    @property
+    def url(self):
+        return reverse(self.url_name)
+
+    @property
+    def cookie_name(self):
+        return f'wizard_{self.product}'
+
+    def step(self, name):
+        """
+        The step called `name`, or the first step for an unknown name.
+        """
+        return self._by_name.get(name, self.first)
+
+    def next_step(self, step, answers):
+        target = step.next(answers) if callable(step.next) else step.next
+        if target is None:
+            target = self.steps[self.steps.index(step) + 1].name
+        return self._by_name[target]
+
+    def step_url(self, step):
+        return f'{self.url}?step={step.name}'
+
+    def missing_step(self, step, answers):
+        """
+        The first step on the way to `step` whose answers are missing, or
+        None when everything before it has been answered.
+        """
+        current = self.first
+        while current is not step and current.form_class is not None:
+            if any(field not in answers for field in current.fields):
+                return current
+            current = self.next_step(current, answers)
+        return None
+
+    # State
+
+    def run_id(self, request):
+        """
+        The id of the browser's run through this wizard, or None.
+        """
+        value = request.COOKIES.get(self.cookie_name, '')
+        return value if _RUN_ID_RE.fullmatch(value) else None
+
+    def _state_key(self, run_id):
+        return f'wizard:{self.product}:{run_id}'
+
+    def load(self, request):
+        run_id = self.run_id(request)
+        answers = caches[STATE_CACHE].get(self._state_key(run_id)) if run_id else None
+        return answers if isinstance(answers, dict) else {}
+
+    def save(self, request, response, answers):
+        run_id = self.run_id(request) or secrets.token_urlsafe(24)
+        caches[STATE_CACHE].set(self._state_key(run_id), answers, STATE_TIMEOUT)
+        response.set_cookie(
+            self.cookie_name, run_id, max_age=STATE_TIMEOUT, path=self.url,
+            secure=request.is_secure(), httponly=True, samesite='Lax',
+        )
+
+    def clear(self, request, response):
+        run_id = self.run_id(request)
+        if run_id:
+            caches[STATE_CACHE].delete(self._state_key(run_id))
+        response.delete_cookie(self.cookie_name, path=self.url, samesite='Lax')
+
+    def complete(self, answers, run_id=None):
+        """
+        Saves the run's lead. A run that is submitted again (a double click,
+        or a retry before the redirect arrives) updates its lead instead of
+        adding another.
+        """
+        lead, _ = QuoteLead.objects.update_or_create(
+            run_id=run_id or secrets.token_urlsafe(24),
+            defaults={
+                'product': self.product,
+                'answers': answers,
+                **{field: str(answers.get(field, '')) for field in LEAD_FIELDS},
+            },
+        )
+        return lead
+
+    # The finished wizard
+
+    def result_url(self, step, lead):
+        return f"{self.step_url(step)}&lead={signing.dumps(lead.pk, salt=LEAD_SALT)}"
+
+    def finished_lead(self, request):
+        """
+        The lead a result_url() refers to, or None.
+        """
+        try:
+            pk = signing.loads(request.GET.get('lead', ''), salt=LEAD_SALT, max_age=STATE_TIMEOUT)
+        except signing.BadSignature:
+            return None
+        return QuoteLead.objects.filter(pk=pk, product=self.product).first()
+
+
+def quote_steps():
+    """
+    Address, coverage tier, name, email and phone, then the quotes page.
+    """
+    return [
+        Step('address', 'Address', AddressStepForm),
+        Step('coverage', 'Coverage', CoverageStepForm),
+        Step('name', 'Name', NameStepForm),
+        Step('email', 'Email', EmailStepForm),
+        Step('phone', 'Phone', PhoneStepForm),
+        Step('quotes', 'Quotes'),
+    ]
+
+
+WIZARDS = {
+    'home': Wizard('home', 'Compare Insurance Quotes', 'start', quote_steps()),
+    'auto': Wizard('auto', 'Compare Auto Quotes', 'start_auto', quote_steps()),
+}
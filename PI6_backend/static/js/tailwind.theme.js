@@ -0,0 +1,74 @@
+// Site theme for Tailwind. Used by tailwind/tailwind.config.js for the CSS
+// build, and by the CDN fallback in base.html when no built CSS exists.
+(function (root) {
+    var theme = {
+        extend: {
+            colors: {
+                'brand-blue': '#003366',
+                'brand-red': '#cc0000',
+                'brand-light-blue': '#0088ff',
+            },
+            fontFamily: {
+                sans: [
+                    'ui-sans-serif',
+                    'system-ui',
+                    '-apple-system',
+                    'Segoe UI',
+                    'Roboto',
+                    'Noto Sans',
+                    'Ubuntu',
+                    'Cantarell',
+                    'Helvetica Neue',
+                    'Arial',
+                    'Apple Color Emoji',
+                    'Segoe UI Emoji',
+                    'Segoe UI Symbol'
+                ],
+            },
+            typography: {
+                DEFAULT: {
+                    css: {
+                        color: '#374151', // gray-700
+                        maxWidth: 'none',
+                        h1: {
+                            color: '#003366',
+                            fontWeight: '700',
+                        },
+                        h2: {
+                            color: '#003366',
+                            fontWeight: '600',
+                            marginTop: '2em',
+                        },
+                        h3: {
+                            color: '#003366',
+                            fontWeight: '600',
+                        },
+                        strong: {
+                            color: '#003366',
+                        },
+                        a: {
+                            color: '#0088ff',
+                            '&:hover': {
+                                color: '#003366',
+                            },
+                        },
+                        blockquote: {
+                            borderLeftColor: '#ffcc00',
+                            color: '#003366',
+                            fontStyle: 'italic',
+                        },
+                        'ul > li::marker': {
+                            color: '#ffcc00',
+                        },
+                    },
+                },
+            },
+        }
+    };
+
+    if (typeof module !== 'undefined' && module.exports) {
+        module.exports = theme;
+    } else {
+        root.tailwind.config = { theme: theme };
+    }
+})(this);
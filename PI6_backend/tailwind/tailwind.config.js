@@ -0,0 +1,19 @@
+// Build config for static/css/site.css (manage.py build_css, Tailwind v3 CLI).
+module.exports = {
+    content: {
+        relative: true,
+        files: [
+            '../templates/**/*.html',
+            '../*/templates/**/*.html',
+            '../static/js/**/*.js',
+            '../main/**/*.py',
+            // Classes used inside CKEditor content, extracted from the database by build_css
+            './content-classes.html',
+        ],
+    },
+    theme: require('../static/js/tailwind.theme.js'),
+    plugins: [
+        require('@tailwindcss/typography'),
+        require('@tailwindcss/aspect-ratio'),
+    ],
+};